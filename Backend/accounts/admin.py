@@ -3,19 +3,61 @@ from .models import *
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
+from django.conf import settings
+from django.contrib import messages
+from django.utils import timezone
 
 User = get_user_model()
 
 # Register your models here.
 
 
-admin.site.register(Ward)
 admin.site.register(CitizenProfile)
 admin.site.register(StaffProfile)
 admin.site.register(AdminProfile)
 admin.site.register(Department)
 
 
+@admin.register(Ward)
+class WardAdmin(admin.ModelAdmin):
+    list_display = ("name",)
+    search_fields = ("name",)
+    actions = ("issue_local_tax_bills", "issue_city_rate_bills")
+
+    def _issue(self, request, queryset, service_type, amount):
+        from billing.issuance import issue_annual_bills_summary
+
+        year = timezone.now().year
+        totals = issue_annual_bills_summary(service_type, year, amount, ward_ids=list(queryset.values_list("id", flat=True)))
+        self.message_user(
+            request,
+            f"{year} {service_type} bills: {totals['created']} created, "
+            f"{totals['skipped']} already billed across {totals['wards']} ward(s).",
+            messages.SUCCESS,
+        )
+
+    @admin.action(description="Issue this year's Local Tax bills for selected wards")
+    def issue_local_tax_bills(self, request, queryset):
+        from billing.issuance import LOCAL_TAX_AMOUNT
+        from billing.models import ServiceType
+
+        self._issue(request, queryset, ServiceType.LOCAL_TAX, LOCAL_TAX_AMOUNT)
+
+    @admin.action(description="Issue this year's City Rate bills for selected wards")
+    def issue_city_rate_bills(self, request, queryset):
+        from billing.models import ServiceType
+
+        amount = getattr(settings, "CITY_RATE_ANNUAL_AMOUNT", None)
+        if not amount:
+            self.message_user(
+                request,
+                "Set CITY_RATE_ANNUAL_AMOUNT, or use: manage.py issue_annual_bills city-rate --amount <SLE>",
+                messages.ERROR,
+            )
+            return
+        self._issue(request, queryset, ServiceType.CITY_RATE, amount)
+
+
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
     model = User
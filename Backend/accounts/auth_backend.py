@@ -1,29 +1,38 @@
 from django.contrib.auth import get_user_model
-from phonenumber_field.phonenumber import PhoneNumber
+from django.db.models.functions import Lower
+
+from .validators import normalize_phone
 
 User = get_user_model()
 
+
+def user_lookup(identifier):
+    """
+    Users matching a login identifier (email or phone), or None if it cannot match anyone.
+
+    One index probe either way: lower(email) is indexed (user_email_lower_idx) and
+    phone_number holds E.164 (PHONENUMBER_DB_FORMAT), the form normalize_phone() returns.
+    """
+    identifier = str(identifier).strip()
+    if "@" in identifier:
+        return User.objects.annotate(email_lower=Lower("email")).filter(email_lower=identifier.lower())
+
+    phone = normalize_phone(identifier)
+    if phone is None:
+        return None
+    return User.objects.filter(phone_number=phone)
+
+
 class EmailOrPhoneBackend:
     def authenticate(self, request, identifier=None, password=None, **kwargs):
         if not identifier or not password:
             return None
 
-        identifier = str(identifier).strip()
-
-        user = None
-
-        # Email path
-        if "@" in identifier:
-            user = User.objects.filter(email__iexact=identifier).first()
-        else:
-            # Phone path: normalize to PhoneNumber (E.164)
-            try:
-                phone = PhoneNumber.from_string(phone_number=identifier, region="SL")
-                # Some versions need .as_e164, others str(phone) is E.164
-                user = User.objects.filter(phone_number=phone).first()
-            except Exception:
-                # fallback - try raw string (in case DB has raw)
-                user = User.objects.filter(phone_number=identifier).first()
+        users = user_lookup(identifier)
+        if users is None:
+            return None
+        # [:1] rather than first(): no ORDER BY, the index answers on its own
+        user = next(iter(users[:1]), None)
 
         if not user:
             return None
@@ -0,0 +1,170 @@
+"""
+Knox token authentication for the REST API, with the lookup cached.
+
+knox.auth.TokenAuthentication costs three queries per request (token by prefix,
+its user, and the user's other tokens for expiry cleanup) before the view runs.
+CachedTokenAuthentication remembers a verified token by its digest:
+
+- in this process: a bounded LRU, trusted for AUTH_TOKEN_LOCAL_SECONDS
+- in the shared cache (CACHE_URL): for AUTH_TOKEN_CACHE_SECONDS, so other workers
+  skip the queries too
+
+An entry never outlives the token's expiry. A miss (or AUTO_REFRESH) falls back
+to knox, which also does the expiry cleanup and the inactive-user check.
+
+Invalidation (accounts/signals.py):
+- a deleted AuthToken (knox logout / logoutall, admin, expiry cleanup) drops its entry
+- saving a user (e.g. is_active=False) drops the entries of all their tokens
+
+Both clear the shared cache and this process; other processes drop their local
+copy within AUTH_TOKEN_LOCAL_SECONDS.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.models import AuthToken
+from knox.settings import knox_settings
+
+User = get_user_model()
+
+# kept out of the cache; loads lazily if something reads it
+UNCACHED_USER_FIELDS = ("password",)
+
+
+def _shared_key(digest: str) -> str:
+    return f"knox-auth:{digest}"
+
+
+# ----------------------------
+# PROCESS-LOCAL LRU
+# ----------------------------
+class _LocalTokens:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # digest -> (entry, stored_at)
+
+    def get(self, digest: str):
+        max_age = getattr(settings, "AUTH_TOKEN_LOCAL_SECONDS", 5)
+        with self._lock:
+            row = self._entries.get(digest)
+            if row is None:
+                return None
+            if time.monotonic() - row[1] > max_age:
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return row[0]
+
+    def put(self, digest: str, entry: dict):
+        with self._lock:
+            self._entries[digest] = (entry, time.monotonic())
+            self._entries.move_to_end(digest)
+            while len(self._entries) > getattr(settings, "AUTH_TOKEN_LOCAL_SIZE", 1024):
+                self._entries.popitem(last=False)
+
+    def discard(self, digest: str):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def discard_user(self, user_id):
+        with self._lock:
+            for digest in [d for d, (e, _) in self._entries.items() if e["user"]["id"] == user_id]:
+                del self._entries[digest]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local = _LocalTokens()
+
+
+# ----------------------------
+# ENTRIES
+# ----------------------------
+def _fields(instance, exclude=()) -> dict:
+    return {
+        f.attname: getattr(instance, f.attname)
+        for f in type(instance)._meta.concrete_fields
+        if f.attname not in exclude
+    }
+
+
+def _rebuild(model, values: dict):
+    # from_db() wants the values in model field order
+    names = [f.attname for f in model._meta.concrete_fields if f.attname in values]
+    return model.from_db("default", names, [values[n] for n in names])
+
+
+def _entry(user, auth_token) -> dict:
+    return {"user": _fields(user, exclude=UNCACHED_USER_FIELDS), "token": _fields(auth_token)}
+
+
+def _from_entry(entry: dict):
+    """
+    Fresh (user, auth_token) instances per request, so views can change them freely.
+    """
+    user = _rebuild(User, entry["user"])
+    auth_token = _rebuild(AuthToken, entry["token"])
+    auth_token.user = user
+    return user, auth_token
+
+
+def forget_api_token(digest: str):
+    _local.discard(digest)
+    cache.delete(_shared_key(digest))
+
+
+def forget_api_user(user_id):
+    _local.discard_user(user_id)
+    digests = AuthToken.objects.filter(user_id=user_id).values_list("digest", flat=True)
+    cache.delete_many([_shared_key(d) for d in digests])
+
+
+# ----------------------------
+# AUTHENTICATION CLASS
+# ----------------------------
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, token):
+        if knox_settings.AUTO_REFRESH:
+            # every request moves the expiry, nothing stable to cache
+            return super().authenticate_credentials(token)
+
+        try:
+            digest = hash_token(token.decode("utf-8"))
+        except (TypeError, ValueError):
+            return super().authenticate_credentials(token)
+
+        entry = _local.get(digest)
+        if entry is None:
+            entry = cache.get(_shared_key(digest))
+            if entry is not None:
+                _local.put(digest, entry)
+
+        if entry is not None:
+            expiry = entry["token"]["expiry"]
+            if entry["user"]["is_active"] and (expiry is None or expiry > timezone.now()):
+                return _from_entry(entry)
+            forget_api_token(digest)
+
+        user, auth_token = super().authenticate_credentials(token)
+        self._remember(digest, user, auth_token)
+        return user, auth_token
+
+    def _remember(self, digest, user, auth_token):
+        timeout = getattr(settings, "AUTH_TOKEN_CACHE_SECONDS", 60)
+        if auth_token.expiry is not None:
+            timeout = min(timeout, int((auth_token.expiry - timezone.now()).total_seconds()))
+        if timeout <= 0:
+            return
+        entry = _entry(user, auth_token)
+        cache.set(_shared_key(digest), entry, timeout=timeout)
+        _local.put(digest, entry)
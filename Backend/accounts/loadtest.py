@@ -0,0 +1,162 @@
+"""
+Login throughput under a credential-stuffing load.
+
+Legitimate citizens (each from their own IP) log in through /api/citizens/login/
+while attacker threads, spread over a few IPs, send wrong passwords for real (victim)
+accounts to the same endpoint at a fixed total rate, so every unthrottled attempt
+costs a full PBKDF2 hash. The run is repeated three ways:
+
+- baseline      legitimate logins only
+- unthrottled   with the attack, LOGIN_THROTTLE_ENABLED=False
+- throttled     with the attack and the login token buckets on; the attacker IPs
+                start with empty buckets, i.e. the attack has been running for a while
+                (a short run would otherwise spend most of its time inside the bursts)
+
+Reports legitimate logins/s and latency per phase, plus how many attack attempts
+reached the hasher (401) and how many were turned away (429).
+
+Used by `manage.py bench_login_throttle`.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from core.loadtest import LatencyRecorder, run_concurrently
+from .throttling import login_limiter, reset_login_throttles
+
+User = get_user_model()
+
+BENCH_PASSWORD = "Bench-Login-2026"
+LOGIN_URL = "/api/citizens/login/"
+
+PHASES = ("baseline", "unthrottled", "throttled")
+
+
+def seed_accounts(count: int, label: str) -> list:
+    """
+    `count` active citizens sharing one (real PBKDF2) password hash; returns their emails.
+    """
+    password = make_password(BENCH_PASSWORD)
+    User.objects.bulk_create(
+        [
+            User(
+                email=f"{label}{i}@logintest.local",
+                first_name=label.title(),
+                last_name=str(i),
+                user_type="CITIZEN",
+                password=password,
+            )
+            for i in range(count)
+        ],
+        batch_size=500,
+    )
+    return [f"{label}{i}@logintest.local" for i in range(count)]
+
+
+def _run_phase(legit, victims, attackers: int, attacker_ips: int, attack_rate: float, concurrency: int,
+               logins_per_user: int, drain_attacker_buckets: bool = False) -> dict:
+    recorder = LatencyRecorder()
+    statuses = Counter()
+    statuses_lock = threading.Lock()
+    done = threading.Event()
+
+    def legit_login(item):
+        index, email = item
+        client = Client(REMOTE_ADDR=f"10.1.{index // 250}.{index % 250 + 1}")
+        with recorder.measure("legit") as result:
+            resp = client.post(LOGIN_URL, {"identifier": email, "password": BENCH_PASSWORD}, content_type="application/json")
+            result["ok"] = resp.status_code == 200
+
+    def attack(n):
+        client = Client(REMOTE_ADDR=f"203.0.113.{n % max(1, attacker_ips) + 1}")
+        attempt = n
+        interval = attackers / attack_rate
+        next_at = time.monotonic()
+        try:
+            while not done.wait(max(0.0, next_at - time.monotonic())):
+                next_at += interval
+                with recorder.measure("attack"):
+                    resp = client.post(
+                        LOGIN_URL,
+                        {"identifier": victims[attempt % len(victims)], "password": f"guess-{attempt}"},
+                        content_type="application/json",
+                    )
+                with statuses_lock:
+                    statuses[resp.status_code] += 1
+                attempt += attackers
+        finally:
+            connections.close_all()
+
+    if drain_attacker_buckets:
+        limiter = login_limiter("IP")
+        for n in range(max(1, attacker_ips)):
+            while not limiter.take(f"203.0.113.{n + 1}"):
+                pass
+
+    attack_threads = [threading.Thread(target=attack, args=(n,), name=f"attacker-{n}") for n in range(attackers)]
+    items = [(i, email) for i, email in enumerate(legit) for _ in range(logins_per_user)]
+
+    recorder.start()
+    for t in attack_threads:
+        t.start()
+    try:
+        errors = run_concurrently(legit_login, items, concurrency)
+        recorder.stop()
+    finally:
+        done.set()
+        for t in attack_threads:
+            t.join()
+
+    summary = recorder.summary()
+    return {
+        "legit": summary.get("legit", {}),
+        "attack": {
+            "attempts": sum(statuses.values()),
+            "hashed": statuses.get(401, 0),
+            "throttled": statuses.get(429, 0),
+            "other": sum(n for code, n in statuses.items() if code not in (401, 429)),
+        },
+        "exceptions": [repr(e) for e in errors[:10]],
+    }
+
+
+def run_login_benchmark(users: int = 50, logins_per_user: int = 2, concurrency: int = 4, attackers: int = 16,
+                        attacker_ips: int = 4, attack_rate: float = 100.0, victims: int = 50) -> dict:
+    """
+    Seeds the accounts (call inside a test database) and runs the three phases.
+    """
+    legit = seed_accounts(users, "resident")
+    victim_emails = seed_accounts(victims, "victim")
+
+    phases = {}
+    for phase in PHASES:
+        reset_login_throttles()
+        with override_settings(LOGIN_THROTTLE_ENABLED=(phase == "throttled")):
+            phases[phase] = _run_phase(
+                legit,
+                victim_emails,
+                attackers=0 if phase == "baseline" else attackers,
+                attacker_ips=attacker_ips,
+                attack_rate=attack_rate,
+                concurrency=concurrency,
+                logins_per_user=logins_per_user,
+                drain_attacker_buckets=(phase == "throttled"),
+            )
+    reset_login_throttles()
+
+    return {
+        "users": users,
+        "logins_per_user": logins_per_user,
+        "concurrency": concurrency,
+        "attackers": attackers,
+        "attacker_ips": attacker_ips,
+        "attack_rate": attack_rate,
+        "victims": victims,
+        "phases": phases,
+    }
@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import temporary_test_database
+from accounts.loadtest import PHASES, run_login_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure legitimate citizen logins while attacker threads credential-stuff the login API, "
+        "with and without the login throttle. Runs in a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50, help="Legitimate citizens, one IP each.")
+        parser.add_argument("--logins-per-user", type=int, default=2)
+        parser.add_argument("--concurrency", type=int, default=4, help="Threads sending legitimate logins.")
+        parser.add_argument("--attackers", type=int, default=16, help="Threads sending wrong passwords.")
+        parser.add_argument("--attacker-ips", type=int, default=4)
+        parser.add_argument("--attack-rate", type=float, default=100.0, help="Attack attempts per second, all threads.")
+        parser.add_argument("--victims", type=int, default=50, help="Real accounts the attack guesses at.")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database between runs.")
+        parser.add_argument("--json", action="store_true", help="Print the raw report as JSON.")
+
+    def handle(self, *args, **opts):
+        for name in ("users", "logins_per_user", "concurrency", "attacker_ips", "victims"):
+            if opts[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1.")
+        if opts["attackers"] < 0:
+            raise CommandError("--attackers cannot be negative.")
+        if opts["attack_rate"] <= 0:
+            raise CommandError("--attack-rate must be positive.")
+
+        with temporary_test_database(keepdb=opts["keepdb"]):
+            report = run_login_benchmark(
+                users=opts["users"],
+                logins_per_user=opts["logins_per_user"],
+                concurrency=opts["concurrency"],
+                attackers=opts["attackers"],
+                attacker_ips=opts["attacker_ips"],
+                attack_rate=opts["attack_rate"],
+                victims=opts["victims"],
+            )
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{report['users']} citizens x {report['logins_per_user']} logins on {report['concurrency']} threads; "
+            f"attack: {report['attack_rate']}/s from {report['attackers']} threads, {report['attacker_ips']} IPs, "
+            f"{report['victims']} accounts"
+        )
+        self.stdout.write(
+            f"{'phase':<13}{'logins':>7}{'failed':>8}{'rps':>8}{'p50 ms':>9}{'p99 ms':>9}"
+            f"{'attacks':>9}{'hashed':>8}{'429s':>8}"
+        )
+        for phase in PHASES:
+            row = report["phases"][phase]
+            legit, attack = row["legit"], row["attack"]
+            self.stdout.write(
+                f"{phase:<13}{legit.get('count', 0):>7}{legit.get('errors', 0):>8}{legit.get('rps', 0):>8}"
+                f"{legit.get('p50_ms', 0):>9}{legit.get('p99_ms', 0):>9}"
+                f"{attack['attempts']:>9}{attack['hashed']:>8}{attack['throttled']:>8}"
+            )
+            for err in row["exceptions"]:
+                self.stderr.write(err)
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.purge import (
+    DEFAULT_PURGE_BATCH_SIZE,
+    DEFAULT_PURGE_PAUSE_SECONDS,
+    purge_expired_sessions,
+    purge_expired_tokens,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired Knox tokens and Django sessions in small throttled batches "
+        "(run hourly, e.g. cron `20 * * * *`). Prints the rows removed per table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_PURGE_BATCH_SIZE)
+        parser.add_argument(
+            "--pause", type=float, default=DEFAULT_PURGE_PAUSE_SECONDS,
+            help="Seconds to sleep between batches (0 to run flat out, e.g. off-peak).",
+        )
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many rows per table.")
+        parser.add_argument("--skip-tokens", action="store_true")
+        parser.add_argument("--skip-sessions", action="store_true")
+
+    def handle(self, *args, **opts):
+        if opts["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if opts["pause"] < 0:
+            raise CommandError("--pause cannot be negative.")
+
+        now = timezone.now()
+        sweeps = []
+        if not opts["skip_tokens"]:
+            sweeps.append(("auth tokens", purge_expired_tokens))
+        if not opts["skip_sessions"]:
+            sweeps.append(("sessions", purge_expired_sessions))
+
+        for label, purge in sweeps:
+            started = time.monotonic()
+            removed = batches = 0
+            for deleted in purge(now=now, batch_size=opts["batch_size"], pause=opts["pause"], limit=opts["limit"]):
+                removed += deleted
+                batches += 1
+                if opts["verbosity"] > 1:
+                    self.stdout.write(f"  {label}: removed {deleted} (total {removed})")
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"Removed {removed} expired {label} in {batches} batches ({elapsed:.1f}s)."
+            ))
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 18:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; logins keep working meanwhile
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0002_alter_customuser_options_customuser_date_joined_and_more'),
+        ('knox', '0009_extend_authtoken_field'),
+    ]
+
+    operations = [
+        # knox's AuthToken.expiry has no index and the model belongs to knox, so plain SQL:
+        # lets purge_expired_auth find expired tokens without scanning the table
+        migrations.RunSQL(
+            sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS knox_authtoken_expiry_idx "
+                "ON knox_authtoken (expiry) WHERE expiry IS NOT NULL",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS knox_authtoken_expiry_idx",
+        ),
+    ]
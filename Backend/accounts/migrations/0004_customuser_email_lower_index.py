@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 19:25
+
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; logins keep working meanwhile
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0003_knox_authtoken_expiry_index'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='user_email_lower_idx'),
+        ),
+    ]
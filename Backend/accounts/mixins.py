@@ -1,7 +1,85 @@
+"""
+Session mixins for the staff/admin template views.
+
+Every staff page used to run two lookups before the view itself: the Knox token
+behind the session (still valid?) and the User row. Both answers are kept in the
+shared cache for at most STAFF_SESSION_CACHE_SECONDS:
+
+- a token entry never outlives the token's own expiry
+- deleting an AuthToken (logout, logoutall, admin) drops its entry, and saving or
+  deleting a user drops theirs (accounts/signals.py)
+
+With a process-local cache (the locmem default) other workers only notice a
+revocation when their entry times out; point CACHE_URL at Redis/Memcached to
+make it immediate everywhere.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.shortcuts import redirect
 from knox.models import AuthToken
 from django.utils import timezone
 
+User = get_user_model()
+
+# enough for the views, templates and filters; anything else loads on first access
+SESSION_USER_FIELDS = ("id", "email", "first_name", "last_name", "user_type", "ward_id", "is_active")
+
+
+def _ttl() -> int:
+    return getattr(settings, "STAFF_SESSION_CACHE_SECONDS", 60)
+
+
+def _token_key(token_key) -> str:
+    return f"staff-session:token:{token_key}"
+
+
+def _user_key(user_id) -> str:
+    return f"staff-session:user:{user_id}"
+
+
+def forget_token(token_key):
+    cache.delete(_token_key(token_key))
+
+
+def forget_user(user_id):
+    cache.delete(_user_key(user_id))
+
+
+def token_is_valid(token_key) -> bool:
+    now = timezone.now()
+    expiry = cache.get(_token_key(token_key))
+    if expiry is not None and expiry > now:
+        return True
+
+    # ✅ Token must exist and not be expired
+    expiry = AuthToken.objects.filter(
+        token_key=str(token_key),
+        expiry__gt=now
+    ).values_list("expiry", flat=True).first()
+    if expiry is None:
+        return False
+
+    timeout = min(_ttl(), int((expiry - now).total_seconds()))
+    if timeout > 0:
+        cache.set(_token_key(token_key), expiry, timeout=timeout)
+    return True
+
+
+def session_user(user_id):
+    """
+    The session's User, built from cached fields when possible (no query).
+    """
+    values = cache.get(_user_key(user_id))
+    if values is None:
+        values = User.objects.filter(id=user_id).values(*SESSION_USER_FIELDS).first()
+        if values is None:
+            return None
+        cache.set(_user_key(user_id), values, timeout=_ttl())
+    # from_db() wants the values in model field order
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    return User.from_db("default", names, [values[n] for n in names])
+
 
 class KnoxSessionRequiredMixin:
     login_url = "staff_login"
@@ -12,15 +90,7 @@ class KnoxSessionRequiredMixin:
             request.session.flush()
             return redirect(self.login_url)
 
-            print("SESSION:", dict(request.session))
-
-        # ✅ Token must exist and not be expired
-        is_valid = AuthToken.objects.filter(
-            token_key=str(token_key),
-            expiry__gt=timezone.now()
-        ).exists()
-
-        if not is_valid:
+        if not token_is_valid(token_key):
             AuthToken.objects.filter(token_key=str(token_key)).delete()
             request.session.flush()
             return redirect(self.login_url)
@@ -42,9 +112,24 @@ class RoleRequiredMixin:
         return super().dispatch(request, *args, **kwargs)
 
 
-class SessionUserMixin:
+class SessionStaffUserMixin:
+    """
+    Attaches the logged-in staff/admin user object to request.user
+    using session staff_user_id saved at login.
+
+    Requires in staff login view:
+        request.session["staff_user_id"] = data["user_id"]
+    """
     def dispatch(self, request, *args, **kwargs):
-        uid = request.session.get("staff_user_id")
-        if uid:
-            request.user = User.objects.filter(id=uid).first()  # attach
-        return super().dispatch(request, *args, **kwargs)
\ No newline at end of file
+        staff_user_id = request.session.get("staff_user_id")
+        if not staff_user_id:
+            request.session.flush()
+            return redirect("staff_login")
+
+        user = session_user(staff_user_id)
+        if not user:
+            request.session.flush()
+            return redirect("staff_login")
+
+        request.user = user
+        return super().dispatch(request, *args, **kwargs)
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from phonenumber_field.modelfields import PhoneNumberField
 from .validators import validate_sierra_leone_number, validate_nin, validate_passport
@@ -97,6 +98,12 @@ class CustomUser(AbstractUser):
 
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # login by email is case-insensitive (accounts/auth_backend.py)
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.user_type})"
 
@@ -0,0 +1,56 @@
+"""
+Purging expired login state.
+
+Every citizen and staff login inserts a Knox AuthToken (REST_KNOX TOKEN_TTL) and
+staff logins also create a DB session; neither table is ever cleaned up by the app.
+purge_expired_tokens() and purge_expired_sessions() are the scheduled sweep
+(`manage.py purge_expired_auth`).
+
+Rows go in small batches picked off the expiry indexes (knox_authtoken_expiry_idx,
+django_session.expire_date), one short delete per batch with a pause in between,
+so the sweep never holds locks or I/O long enough to be felt by logins.
+"""
+import time
+
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+from knox.models import AuthToken
+
+DEFAULT_PURGE_BATCH_SIZE = 500
+DEFAULT_PURGE_PAUSE_SECONDS = 0.2
+
+
+def _purge(model, expiry_field: str, now, batch_size: int, pause: float, limit=None):
+    """
+    Generator: deletes expired rows of `model` batch by batch, yielding the rows
+    removed by each batch.
+    """
+    removed = 0
+    while limit is None or removed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - removed)
+        pks = list(
+            model.objects.filter(**{f"{expiry_field}__lt": now})
+            .order_by(expiry_field)
+            .values_list("pk", flat=True)[:size]
+        )
+        if not pks:
+            return
+
+        # AuthToken deletes send post_delete, which clears the cached token checks
+        deleted = model.objects.filter(pk__in=pks).delete()[1].get(model._meta.label, 0)
+        removed += deleted
+        yield deleted
+
+        if len(pks) < size:
+            return
+        if pause:
+            time.sleep(pause)
+
+
+def purge_expired_tokens(now=None, batch_size=DEFAULT_PURGE_BATCH_SIZE, pause=DEFAULT_PURGE_PAUSE_SECONDS, limit=None):
+    # tokens with expiry NULL never expire and are left alone
+    return _purge(AuthToken, "expiry", now or timezone.now(), batch_size, pause, limit)
+
+
+def purge_expired_sessions(now=None, batch_size=DEFAULT_PURGE_BATCH_SIZE, pause=DEFAULT_PURGE_PAUSE_SECONDS, limit=None):
+    return _purge(Session, "expire_date", now or timezone.now(), batch_size, pause, limit)
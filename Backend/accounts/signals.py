@@ -1,6 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import CustomUser, CitizenProfile, StaffProfile, AdminProfile
+from knox.models import AuthToken
+from core import reference
+from .authentication import forget_api_token, forget_api_user
+from .mixins import forget_token, forget_user
+from .models import CustomUser, CitizenProfile, StaffProfile, AdminProfile, Ward
 
 
 @receiver(post_save, sender=CustomUser)
@@ -34,6 +38,28 @@ def save_user_profile(sender, instance, **kwargs):
             AdminProfile.objects.create(user=instance)
 
 
+# ----------------------------
+# REFERENCE DATA (core/reference.py)
+# ----------------------------
+def _build_wards():
+    from .serializers import WardSerializer
+    return WardSerializer(Ward.objects.order_by("name"), many=True).data
 
 
+reference.register("wards", _build_wards, models=[Ward])
 
+
+# ----------------------------
+# CACHED TOKEN CHECKS (accounts/mixins.py, accounts/authentication.py)
+# ----------------------------
+@receiver(post_delete, sender=AuthToken)
+def forget_deleted_token(sender, instance, **kwargs):
+    forget_token(instance.token_key)
+    forget_api_token(instance.digest)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_changed_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+    forget_api_user(instance.pk)
@@ -1,3 +1,211 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from knox.models import AuthToken
+
+from core.loadtest import analyze_tables, seq_scanned_tables
+
+from .auth_backend import user_lookup
+from .models import Ward
+from . import throttling
+from .throttling import reset_login_throttles
+
+
+class StaffSessionCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.staff = get_user_model().objects.create_user(
+            email="officer@fcc.local", phone_number=None, user_type="STAFF",
+            ward=Ward.objects.create(name="Session Ward"),
+        )
+        self.token = AuthToken.objects.create(self.staff)[0]
+        session = self.client.session
+        session["staff_user_id"] = self.staff.id
+        session["staff_token_key"] = self.token.token_key
+        session["user_type"] = "STAFF"
+        session.save()
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/core/staff/complaints/")
+        self.assertEqual(resp.status_code, 200)
+        tables = ('FROM "knox_authtoken"', 'FROM "accounts_customuser"')
+        return [q["sql"] for q in ctx.captured_queries if any(t in q["sql"] for t in tables)]
+
+    def test_repeat_page_loads_skip_token_and_user_queries(self):
+        self.assertEqual(len(self.auth_queries()), 2)
+        self.assertEqual(self.auth_queries(), [])
+
+    def test_deleted_token_is_rejected_at_once(self):
+        self.auth_queries()
+        self.token.delete()
+
+        resp = self.client.get("/core/staff/complaints/")
+
+        self.assertRedirects(resp, reverse("staff_login"), fetch_redirect_response=False)
+
+    def test_user_changes_are_picked_up(self):
+        self.auth_queries()
+        self.staff.ward = Ward.objects.create(name="New Ward")
+        self.staff.save()
+
+        self.assertEqual(len(self.auth_queries()), 1)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.citizen = get_user_model().objects.create_user(email="resident@fcc.local", phone_number=None)
+        _, token = AuthToken.objects.create(self.citizen)
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {token}"}
+
+    def get_complaints(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/core/citizens/complaints/", **self.headers)
+        auth = [q for q in ctx.captured_queries if 'FROM "knox_authtoken"' in q["sql"]]
+        return resp.status_code, len(auth)
+
+    def test_repeat_calls_skip_the_token_lookup(self):
+        self.assertEqual(self.get_complaints()[0], 200)
+        self.assertEqual(self.get_complaints(), (200, 0))
+
+    def test_logout_revokes_the_cached_token(self):
+        self.get_complaints()
+
+        self.assertEqual(self.client.post("/api/logout/", **self.headers).status_code, 204)
+        self.assertEqual(self.get_complaints()[0], 401)
+
+    def test_deactivation_revokes_the_cached_token(self):
+        self.get_complaints()
+        self.citizen.is_active = False
+        self.citizen.save()
+
+        self.assertEqual(self.get_complaints()[0], 401)
+
+
+class ExpiredAuthPurgeTests(TestCase):
+
+    def test_purge_removes_only_expired_rows(self):
+        user = get_user_model().objects.create_user(email="old-logins@fcc.local", phone_number=None)
+        for _ in range(5):
+            AuthToken.objects.create(user, expiry=timedelta(hours=-1))
+        live, _ = AuthToken.objects.create(user)
+        AuthToken.objects.create(user, expiry=None)
+
+        now = timezone.now()
+        Session.objects.create(session_key="expired", session_data="", expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key="live", session_data="", expire_date=now + timedelta(days=1))
+
+        out = StringIO()
+        call_command("purge_expired_auth", batch_size=2, pause=0, stdout=out)
+
+        self.assertIn("Removed 5 expired auth tokens in 3 batches", out.getvalue())
+        self.assertIn("Removed 1 expired sessions in 1 batches", out.getvalue())
+        self.assertEqual(AuthToken.objects.count(), 2)
+        self.assertTrue(AuthToken.objects.filter(pk=live.pk).exists())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["live"])
+
+
+@override_settings(
+    LOGIN_THROTTLE_ENABLED=True,
+    LOGIN_THROTTLE_IP_BURST=2,
+    LOGIN_THROTTLE_IP_PER_MINUTE=1,
+    LOGIN_THROTTLE_IDENTIFIER_BURST=1,
+    LOGIN_THROTTLE_IDENTIFIER_PER_MINUTE=1,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        reset_login_throttles()
+        self.addCleanup(reset_login_throttles)
+
+    def citizen_login(self, identifier, ip):
+        return self.client.post(
+            "/api/citizens/login/", {"identifier": identifier, "password": "wrong"},
+            content_type="application/json", REMOTE_ADDR=ip,
+        )
+
+    def test_ip_bucket_answers_429_with_retry_after(self):
+        self.assertEqual(self.citizen_login("a@fcc.local", "198.51.100.7").status_code, 401)
+        self.assertEqual(self.citizen_login("b@fcc.local", "198.51.100.7").status_code, 401)
+
+        resp = self.citizen_login("c@fcc.local", "198.51.100.7")
+
+        self.assertEqual(resp.status_code, 429)
+        self.assertGreaterEqual(int(resp["Retry-After"]), 1)
+        self.assertEqual(self.citizen_login("c@fcc.local", "198.51.100.8").status_code, 401)
+
+    def test_identifier_bucket_spans_ips(self):
+        self.assertEqual(self.citizen_login("Target@fcc.local", "198.51.100.1").status_code, 401)
+        self.assertEqual(self.citizen_login("target@fcc.local ", "198.51.100.2").status_code, 429)
+
+    def test_limits_hold_across_worker_processes(self):
+        self.assertEqual(self.citizen_login("a@fcc.local", "198.51.100.9").status_code, 401)
+        self.assertEqual(self.citizen_login("b@fcc.local", "198.51.100.9").status_code, 401)
+        # another worker: fresh in-process buckets, same shared cache
+        throttling._limiters.clear()
+
+        resp = self.citizen_login("c@fcc.local", "198.51.100.9")
+
+        self.assertEqual(resp.status_code, 429)
+        self.assertGreaterEqual(int(resp["Retry-After"]), 1)
+
+    def test_reset_clears_the_shared_counts(self):
+        self.assertEqual(self.citizen_login("target@fcc.local", "198.51.100.1").status_code, 401)
+
+        reset_login_throttles()
+
+        self.assertEqual(self.citizen_login("target@fcc.local", "198.51.100.2").status_code, 401)
+
+    def test_staff_login_page_is_throttled(self):
+        form = {"email": "officer@fcc.local", "password": "wrong"}
+        self.assertEqual(self.client.post(reverse("staff_login"), form).status_code, 200)
+
+        resp = self.client.post(reverse("staff_login"), form)
+
+        self.assertEqual(resp.status_code, 429)
+        self.assertIn("Retry-After", resp)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class LoginLookupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        User.objects.bulk_create(
+            User(email=f"Resident{i}@Volume.local", phone_number=f"+2327{i:07d}", password="!")
+            for i in range(5000)
+        )
+        cls.user = User.objects.create_user(email="Aminata.K@FCC.local", phone_number="076 123456", password="pw-2026")
+        analyze_tables(User)
+
+    def test_phone_is_stored_in_e164(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT phone_number FROM accounts_customuser WHERE id = %s", [self.user.pk])
+            self.assertEqual(cursor.fetchone()[0], "+23276123456")
+
+    def test_login_is_one_indexed_query(self):
+        for identifier in ("aminata.k@fcc.local", " AMINATA.K@fcc.LOCAL", "076123456", "+232 76 123 456"):
+            with self.subTest(identifier=identifier), CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(authenticate(identifier=identifier, password="pw-2026"), self.user)
+            self.assertEqual(len(ctx.captured_queries), 1)
+
+            self.assertNotIn("accounts_customuser", seq_scanned_tables(user_lookup(identifier)[:1]))
+
+    def test_unparseable_phone_skips_the_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertIsNone(authenticate(identifier="not-a-number", password="pw-2026"))
+        self.assertEqual(ctx.captured_queries, [])
@@ -0,0 +1,205 @@
+"""
+Login rate limiting, checked before any password hashing.
+
+Each login attempt runs PBKDF2 (check_password), tens of milliseconds of CPU, for
+whatever identifier is posted, so a credential-stuffing burst can keep every worker
+busy hashing. Attempts are charged against two token buckets first:
+
+- per client IP          LOGIN_THROTTLE_IP_BURST, refilled LOGIN_THROTTLE_IP_PER_MINUTE
+- per identifier         LOGIN_THROTTLE_IDENTIFIER_BURST, refilled LOGIN_THROTTLE_IDENTIFIER_PER_MINUTE
+  (email / phone, lower-cased)
+
+An empty bucket answers 429 with Retry-After (seconds until the next token) without
+touching the database or the hasher. The API logins use LoginRateThrottle (DRF turns
+it into the 429); the staff login page calls login_throttle_wait() itself.
+
+The limits hold across gunicorn workers: each attempt is counted in the shared cache
+(CACHE_URL, which core/checks.py requires once WEB_CONCURRENCY > 1) with an atomic
+add + incr, BURST attempts per window of BURST / PER_MINUTE minutes, i.e. the same
+long-run rate as the bucket (up to twice the burst can pass across a window boundary).
+A token bucket in this process is checked first, so a client that is already over
+its limit here is turned away without the cache round trip.
+
+Behind a reverse proxy set LOGIN_THROTTLE_PROXY_COUNT so the client IP is taken
+from X-Forwarded-For instead of REMOTE_ADDR.
+
+`manage.py bench_login_throttle` measures legitimate logins under an attack load.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+# ----------------------------
+# TOKEN BUCKETS
+# ----------------------------
+class TokenBucketLimiter:
+    """
+    One token bucket per key: holds up to `burst` tokens, refills `per_minute`
+    tokens a minute, each attempt takes one. Least recently used keys are dropped
+    past `max_keys` (a dropped key starts again with a full bucket).
+    """
+    def __init__(self, burst: int, per_minute: float, max_keys: int = 100_000):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key -> [tokens, last refill (monotonic)]
+
+    def take(self, key: str) -> float:
+        """
+        Takes a token for `key`. Returns 0.0 when allowed, otherwise the seconds
+        until a token is available (nothing is taken then).
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                self._buckets.move_to_end(key)
+
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return 0.0
+            if self.rate <= 0:
+                return 60.0  # no refill configured: ask again in a minute
+            return (1.0 - bucket[0]) / self.rate
+
+
+GENERATION_KEY = "login-throttle:generation"
+
+
+class SharedWindowLimiter:
+    """
+    `burst` attempts per key and window of burst / per_minute minutes, counted in
+    the shared cache so every worker sees the same count. Refused attempts count too.
+    """
+    def __init__(self, kind: str, burst: int, per_minute: float):
+        self.kind = kind
+        self.burst = burst
+        # no refill configured: one window a day
+        self.window = burst * 60.0 / per_minute if per_minute > 0 else 86_400.0
+
+    def take(self, key: str) -> float:
+        """
+        Same contract as TokenBucketLimiter.take: 0.0 when allowed, otherwise the
+        seconds until the window ends.
+        """
+        now = time.time()
+        index = int(now // self.window)
+        # hashed: identifiers are emails / phone numbers, and keys stay memcached-safe
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        cache_key = f"login-throttle:{cache.get(GENERATION_KEY, 0)}:{self.kind}:{digest}:{index}"
+        timeout = int(self.window) + 1
+
+        cache.add(cache_key, 0, timeout=timeout)
+        try:
+            count = cache.incr(cache_key)
+        except ValueError:  # expired between add and incr
+            cache.add(cache_key, 1, timeout=timeout)
+            count = 1
+
+        if count <= self.burst:
+            return 0.0
+        return max((index + 1) * self.window - now, 0.001)
+
+
+class LoginLimiter:
+    """
+    The in-process bucket as a cheap front filter, then the shared count.
+    """
+    def __init__(self, kind: str, burst: int, per_minute: float, max_keys: int):
+        self.local = TokenBucketLimiter(burst, per_minute, max_keys)
+        self.shared = SharedWindowLimiter(kind, burst, per_minute)
+
+    def take(self, key: str) -> float:
+        return self.local.take(key) or self.shared.take(key)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def login_limiter(kind: str) -> LoginLimiter:
+    """
+    The limiter for "IP" or "IDENTIFIER", rebuilt when its settings change.
+    """
+    config = (
+        getattr(settings, f"LOGIN_THROTTLE_{kind}_BURST", 10),
+        getattr(settings, f"LOGIN_THROTTLE_{kind}_PER_MINUTE", 10),
+        getattr(settings, "LOGIN_THROTTLE_MAX_KEYS", 100_000),
+    )
+    with _limiters_lock:
+        current = _limiters.get(kind)
+        if current is None or current[0] != config:
+            current = _limiters[kind] = (config, LoginLimiter(kind, *config))
+        return current[1]
+
+
+def reset_login_throttles():
+    """
+    Empties every bucket: this process's, and the shared counts of all workers
+    (by moving them to a new key generation).
+    """
+    with _limiters_lock:
+        _limiters.clear()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+
+
+def client_ip(request) -> str:
+    proxies = getattr(settings, "LOGIN_THROTTLE_PROXY_COUNT", 0)
+    if proxies:
+        forwarded = [p.strip() for p in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if p.strip()]
+        if forwarded:
+            # the entry our outermost trusted proxy appended
+            return forwarded[-min(proxies, len(forwarded))]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def login_throttle_wait(request, identifier) -> float:
+    """
+    Charges one login attempt to the client IP and to `identifier`.
+    0.0 means go ahead; otherwise the seconds the client should wait.
+    """
+    if not getattr(settings, "LOGIN_THROTTLE_ENABLED", True):
+        return 0.0
+
+    wait = login_limiter("IP").take(client_ip(request))
+    if wait:
+        return wait
+
+    identifier = str(identifier or "").strip().lower()
+    if identifier:
+        return login_limiter("IDENTIFIER").take(identifier)
+    return 0.0
+
+
+# ----------------------------
+# DRF
+# ----------------------------
+class LoginRateThrottle(BaseThrottle):
+    """
+    For login viewsets; the view names the identifier field with
+    `throttle_identifier_field` (default "identifier").
+    """
+    def allow_request(self, request, view):
+        field = getattr(view, "throttle_identifier_field", "identifier")
+        data = request.data if hasattr(request.data, "get") else {}
+        self._wait = login_throttle_wait(request, data.get(field))
+        return not self._wait
+
+    def wait(self):
+        return self._wait
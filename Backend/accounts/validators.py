@@ -1,4 +1,5 @@
 from django.core.exceptions import ValidationError
+from phonenumber_field.phonenumber import PhoneNumber
 import re
 
 def validate_sierra_leone_number(value):
@@ -8,6 +9,18 @@ def validate_sierra_leone_number(value):
         raise ValidationError("Phone number must follow +232XXXXXXXX format.")
 
 
+def normalize_phone(value):
+    """
+    "076 123456" / "+232 76 123456" -> "+23276123456", or None if it is not a valid number.
+    Same E.164 form PhoneNumberField stores, so it can be matched against phone_number.
+    """
+    try:
+        phone = PhoneNumber.from_string(phone_number=str(value).strip(), region="SL")
+    except Exception:
+        return None
+    return phone.as_e164 if phone.is_valid() else None
+
+
 def validate_nin(value):
     """
     Sierra Leone NIN format:
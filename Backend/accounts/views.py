@@ -1,3 +1,5 @@
+import math
+
 from rest_framework import viewsets, permissions
 from rest_framework.response import Response
 from knox.models import AuthToken
@@ -5,13 +7,14 @@ from django.contrib import messages
 from django.shortcuts import render, redirect
 from django.views.generic import TemplateView
 from .serializers import CitizenRegisterSerializer, CitizenLoginSerializer, StaffAdminLoginSerializer, WardSerializer, UserPublicSerializer
-from .mixins import KnoxSessionRequiredMixin, RoleRequiredMixin
+from .mixins import KnoxSessionRequiredMixin, RoleRequiredMixin, SessionStaffUserMixin
+from .throttling import LoginRateThrottle, login_throttle_wait
 from .notifications import send_welcome_email, send_welcome_sms
 from django.contrib.auth import get_user_model, authenticate
 from .forms import StaffAdminLoginForm
 from core.models import Complaint, ComplaintCategory
 from .models import Ward, Department
-from core.views import SessionStaffUserMixin
+from core.reference import ReferenceListMixin
 
 
 
@@ -46,6 +49,7 @@ class CitizenRegisterViewset(viewsets.ViewSet):
 
 class CitizenLoginViewset(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginRateThrottle]
     serializer_class = CitizenLoginSerializer
 
     def create(self, request):
@@ -79,6 +83,8 @@ class CitizenLoginViewset(viewsets.ViewSet):
 
 class StaffAdminLoginViewset(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginRateThrottle]
+    throttle_identifier_field = "email"
     serializer_class = StaffAdminLoginSerializer
 
     def create(self, request):
@@ -95,6 +101,14 @@ def staff_admin_login_view(request):
     form = StaffAdminLoginForm(request.POST or None)
 
     if request.method == "POST" and form.is_valid():
+        # before the serializer: it runs the password hash
+        wait = login_throttle_wait(request, form.cleaned_data["email"])
+        if wait:
+            messages.error(request, "Too many login attempts. Please try again shortly.")
+            response = render(request, "accounts/login.html", {"form": form}, status=429)
+            response["Retry-After"] = str(math.ceil(wait))
+            return response
+
         serializer = StaffAdminLoginSerializer(
             data=form.cleaned_data,
             context={"request": request}
@@ -138,7 +152,7 @@ class StaffDashboardView(
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
 
-        qs = Complaint.objects.filter(citizen__ward=self.request.user.ward)
+        qs = Complaint.objects.filter(citizen__ward_id=self.request.user.ward_id)
 
         ctx["categories"] = ComplaintCategory.objects.all().order_by("category_name")
         ctx["recent_complaints"] = qs.select_related("category", "citizen").order_by("-created_at")[:5]
@@ -173,7 +187,8 @@ class AdminDashboardView(KnoxSessionRequiredMixin, RoleRequiredMixin, TemplateVi
         }
         return ctx
 
-class WardViewSet(viewsets.ReadOnlyModelViewSet):
+class WardViewSet(ReferenceListMixin, viewsets.ReadOnlyModelViewSet):
+    reference_name = "wards"
     queryset = Ward.objects.all().order_by("name")
     serializer_class = WardSerializer
     permission_classes = [permissions.AllowAny]
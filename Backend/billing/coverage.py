@@ -0,0 +1,142 @@
+"""
+Waste collection coverage periods.
+
+Coverage is stored as [start_date, end_date) (WasteCoverage.period, a Postgres
+daterange) and a GiST exclusion constraint keeps one household's ACTIVE periods
+from overlapping. An EXPIRED row (swept, or expired early by an admin) is left out,
+so a renewal may start inside it. Renewals append after the household's last active period while
+holding a per-user advisory lock, so two concurrent renewals queue up instead of
+both extending from the same end_date.
+
+expire_waste_coverages() is the scheduled sweep (`manage.py expire_waste_coverage`)
+that flips lapsed periods to EXPIRED so ACTIVE only ever means live rows.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import CoverageStatus, WasteCoverage, WasteInterval
+
+# First key of the two-key advisory lock; the second is the user id.
+COVERAGE_LOCK_NAMESPACE = 3001
+
+DEFAULT_EXPIRY_CHUNK_SIZE = 1000
+
+
+def coverage_period(plan, base_date):
+    """
+    (start_date, end_date) for one plan period starting at base_date.
+    """
+    if plan.interval == WasteInterval.WEEK:
+        return base_date, base_date + timedelta(days=7)
+    return base_date, base_date + timedelta(days=30)
+
+
+def _lock_user_coverage(user_id: int):
+    # Released automatically at commit/rollback of the surrounding transaction
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [COVERAGE_LOCK_NAMESPACE, user_id])
+
+
+def extend_waste_coverage(*, user, plan, payment, block=None, provider=None, today=None) -> WasteCoverage:
+    """
+    Appends one plan period to the household's coverage and returns it.
+
+    - starts at the end of the current active coverage, or today if none
+    - idempotent per payment (a second verify of the same payment returns the same row)
+    """
+    today = today or timezone.now().date()
+
+    with transaction.atomic():
+        _lock_user_coverage(user.id)
+
+        existing = WasteCoverage.objects.filter(user=user, last_payment=payment).first()
+        if existing:
+            return existing
+
+        active_cov = WasteCoverage.objects.filter(
+            user=user,
+            status=CoverageStatus.ACTIVE,
+            end_date__gte=today,
+        ).order_by("-end_date").first()
+
+        base_start = active_cov.end_date if active_cov else today
+        start_date, end_date = coverage_period(plan, base_start)
+
+        return WasteCoverage.objects.create(
+            user=user,
+            ward_id=user.ward_id,
+            block=block,
+            provider=provider,
+            plan=plan,
+            start_date=start_date,
+            end_date=end_date,
+            status=CoverageStatus.ACTIVE,
+            last_payment=payment,
+        )
+
+
+def coverage_on(user, on_date=None):
+    """
+    The active coverage that includes on_date (default today), or None.
+    Served by the (user, period) GiST index behind the exclusion constraint.
+    """
+    on_date = on_date or timezone.now().date()
+    return WasteCoverage.objects.filter(
+        user=user,
+        status=CoverageStatus.ACTIVE,
+        period__contains=on_date,
+    ).first()
+
+
+def is_covered(user, on_date=None) -> bool:
+    return coverage_on(user, on_date) is not None
+
+
+def expire_waste_coverages(today=None, chunk_size: int = DEFAULT_EXPIRY_CHUNK_SIZE):
+    """
+    Marks ACTIVE coverages whose period ended (end_date <= today) as EXPIRED.
+
+    Works in id chunks off the partial (status=ACTIVE) end_date index, one short
+    transaction per chunk. Generator: yields after every chunk
+        {"expired": int, "by_block_provider": Counter{(block_id, provider_id): n}, "lapsed": [coverage ids]}
+    where "lapsed" are households left without any later active coverage (renewal reminder candidates).
+    """
+    today = today or timezone.now().date()
+
+    while True:
+        with transaction.atomic():
+            rows = list(
+                WasteCoverage.objects.filter(status=CoverageStatus.ACTIVE, end_date__lte=today)
+                .order_by("end_date", "id")
+                .select_for_update(skip_locked=True)
+                .values_list("id", "user_id", "block_id", "provider_id")[:chunk_size]
+            )
+            if not rows:
+                return
+
+            ids = [r[0] for r in rows]
+            WasteCoverage.objects.filter(id__in=ids).update(status=CoverageStatus.EXPIRED)
+
+            user_ids = {r[1] for r in rows}
+            renewed = set(
+                WasteCoverage.objects.filter(
+                    user_id__in=user_ids,
+                    status=CoverageStatus.ACTIVE,
+                    end_date__gt=today,
+                ).values_list("user_id", flat=True)
+            )
+
+        # latest lapsed period per household (a chunk can hold several of one user's rows)
+        lapsed = {}
+        for cov_id, user_id, _, _ in rows:
+            if user_id not in renewed:
+                lapsed[user_id] = cov_id
+
+        yield {
+            "expired": len(rows),
+            "by_block_provider": Counter((r[2], r[3]) for r in rows),
+            "lapsed": list(lapsed.values()),
+        }
@@ -0,0 +1,159 @@
+"""
+In-memory index of households that are covered today, for the provider lookup API.
+
+One compact snapshot per process, rebuilt from the database:
+- at most every COVERAGE_INDEX_TTL_SECONDS (so a new payment shows up within that window)
+- sooner, but at most every COVERAGE_INDEX_MIN_REBUILD_SECONDS, after a coverage
+  change bumps the shared version token (billing/signals.py)
+- on the first lookup of a new day
+
+Lookups are plain dict probes, so one worker answers thousands per second with no queries.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from accounts.validators import normalize_phone
+from .models import CoverageStatus, WasteCoverage
+
+VERSION_CACHE_KEY = "billing:coverage_index:version"
+
+LOOKUP_TYPES = ("phone", "nin", "coverage_id")
+
+# how often a worker reads the shared version token (seconds)
+VERSION_CHECK_SECONDS = 1
+
+
+class CoverageIndex:
+    def __init__(self, day, households: dict, by_phone: dict, by_nin: dict, by_coverage: dict):
+        self.day = day
+        self.households = households      # user_id -> (covered_until, block_id, current coverage_id)
+        self.by_phone = by_phone          # "+232..." -> user_id
+        self.by_nin = by_nin              # "NIN" -> user_id
+        self.by_coverage = by_coverage    # coverage_id -> user_id (every active period, incl. queued renewals)
+
+    @classmethod
+    def build(cls, day) -> "CoverageIndex":
+        # Active periods never overlap (exclusion constraint) and renewals append, so
+        # "covered until" is the last end_date of a household whose earliest live period has started.
+        live = WasteCoverage.objects.filter(status=CoverageStatus.ACTIVE, end_date__gt=day)
+
+        spans = {
+            row["user_id"]: (row["first_start"], row["last_end"])
+            for row in live.values("user_id").annotate(first_start=Min("start_date"), last_end=Max("end_date"))
+        }
+
+        households, by_phone, by_nin, by_coverage = {}, {}, {}, {}
+        rows = live.values_list(
+            "id", "user_id", "block_id", "start_date", "user__phone_number", "user__nin"
+        ).iterator(chunk_size=5000)
+
+        for cov_id, user_id, block_id, start_date, phone, nin in rows:
+            first_start, last_end = spans[user_id]
+            if first_start > day:
+                continue  # paid ahead but not started yet
+
+            by_coverage[cov_id] = user_id
+            if start_date <= day:
+                households[user_id] = (last_end, block_id, cov_id)
+            if phone:
+                by_phone[getattr(phone, "as_e164", str(phone))] = user_id
+            if nin:
+                by_nin[nin.upper()] = user_id
+
+        return cls(day, households, by_phone, by_nin, by_coverage)
+
+    def __len__(self):
+        return len(self.households)
+
+    def _user_id(self, lookup_type: str, value):
+        if lookup_type == "phone":
+            phone = normalize_phone(value)
+            return self.by_phone.get(phone) if phone else None
+        if lookup_type == "nin":
+            return self.by_nin.get(str(value).strip().upper())
+        try:
+            return self.by_coverage.get(int(value))
+        except (TypeError, ValueError):
+            return None
+
+    def lookup(self, lookup_type: str, value, block_ids: set) -> dict:
+        """
+        {"query", "covered", "covered_until", "coverage_id"} for one household.
+        Households outside block_ids are reported as not covered.
+        """
+        user_id = self._user_id(lookup_type, value)
+        household = self.households.get(user_id) if user_id else None
+
+        if not household or household[1] not in block_ids:
+            return {"query": value, "covered": False, "covered_until": None, "coverage_id": None}
+
+        covered_until, _, coverage_id = household
+        return {"query": value, "covered": True, "covered_until": covered_until, "coverage_id": coverage_id}
+
+
+_lock = threading.Lock()
+_index = None
+_version = None
+_built_at = 0.0
+_checked_at = 0.0
+
+
+def _shared_version():
+    return cache.get(VERSION_CACHE_KEY)
+
+
+def get_coverage_index() -> CoverageIndex:
+    global _index, _version, _built_at, _checked_at
+
+    ttl = getattr(settings, "COVERAGE_INDEX_TTL_SECONDS", 60)
+    min_rebuild = getattr(settings, "COVERAGE_INDEX_MIN_REBUILD_SECONDS", 5)
+    now = time.monotonic()
+    today = timezone.now().date()
+
+    index = _index
+    if index is not None and index.day == today and now - _built_at < ttl and now - _checked_at < VERSION_CHECK_SECONDS:
+        return index
+
+    with _lock:
+        version = _shared_version()
+        _checked_at = now
+
+        stale = (
+            _index is None
+            or _index.day != today
+            or now - _built_at >= ttl
+            or (_version != version and now - _built_at >= min_rebuild)
+        )
+        if stale:
+            _index = CoverageIndex.build(today)
+            _version = version
+            _built_at = now
+        return _index
+
+
+def _bump_shared_version():
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate():
+    """
+    Marks every worker's index as out of date once the coverage change commits.
+    Rebuilds stay rate-limited by COVERAGE_INDEX_MIN_REBUILD_SECONDS.
+    """
+    transaction.on_commit(_bump_shared_version)
+
+
+def reset():
+    """
+    Drops this process's index (tests / benchmarks).
+    """
+    global _index
+    with _lock:
+        _index = None
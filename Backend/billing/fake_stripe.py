@@ -0,0 +1,258 @@
+"""
+Local Stripe stand-in for load tests and offline CI.
+
+Implements just enough of the Stripe API for the billing flows:
+- POST /v1/checkout/sessions            (Checkout Session create, honours Idempotency-Key)
+- GET  /v1/checkout/sessions/<id>       (retrieve, supports expand[]=payment_intent)
+- webhook payload signing compatible with stripe.Webhook.construct_event
+
+Latency and failure rate are configurable so the Stripe client's timeouts,
+retries and circuit breaker can be exercised without network access.
+
+Usage:
+    with FakeStripeServer(latency_ms=80, failure_rate=0.01) as fake:
+        settings.STRIPE_API_BASE = fake.url
+"""
+import hashlib
+import hmac
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_{secrets.token_hex(12)}"
+
+
+# ----------------------------
+# WEBHOOK SIGNING
+# ----------------------------
+def sign_webhook_payload(payload: str, secret: str, timestamp: int | None = None) -> str:
+    """
+    Returns a Stripe-Signature header value for payload (t=<ts>,v1=<hmac>).
+    """
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    signed = f"{timestamp}.{payload}".encode("utf-8")
+    signature = hmac.new(secret.encode("utf-8"), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def build_webhook_event(event_type: str, data_object: dict) -> str:
+    """
+    Serialised Stripe event, e.g. build_webhook_event("checkout.session.completed", session).
+    """
+    return json.dumps({
+        "id": _new_id("evt"),
+        "object": "event",
+        "type": event_type,
+        "created": int(time.time()),
+        "livemode": False,
+        "data": {"object": data_object},
+    })
+
+
+# ----------------------------
+# FORM DECODING
+# ----------------------------
+def _decode_form(body: str) -> dict:
+    """
+    Stripe SDKs send nested params as metadata[payment_id]=1, line_items[0][quantity]=1.
+    Only the parts the fake needs (flat keys + metadata) are decoded.
+    """
+    params = {"metadata": {}}
+    for key, values in parse_qs(body, keep_blank_values=True).items():
+        value = values[-1]
+        if key.startswith("metadata[") and key.endswith("]"):
+            params["metadata"][key[len("metadata["):-1]] = value
+        elif "[" not in key:
+            params[key] = value
+        else:
+            params.setdefault(key, value)
+    return params
+
+
+# ----------------------------
+# SERVER
+# ----------------------------
+class FakeStripeState:
+    def __init__(self, latency_ms=0.0, latency_jitter_ms=0.0, failure_rate=0.0, auto_pay=True):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.failure_rate = failure_rate
+        self.auto_pay = auto_pay
+
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.idempotency = {}
+        self.request_count = 0
+        self.failure_count = 0
+
+    def mark_paid(self, session_id: str):
+        with self.lock:
+            session = self.sessions[session_id]
+            session["payment_status"] = "paid"
+            session["status"] = "complete"
+            session["payment_intent"] = session["payment_intent"] or _new_id("pi")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeStripe/1.0"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    @property
+    def state(self) -> FakeStripeState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        # keep benchmark output clean
+        pass
+
+    def _send(self, status_code: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Request-Id", _new_id("req"))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _simulate_network(self) -> bool:
+        """
+        Sleeps for the configured latency. Returns False when this call should fail.
+        """
+        state = self.state
+        with state.lock:
+            state.request_count += 1
+
+        delay_ms = state.latency_ms
+        if state.latency_jitter_ms:
+            delay_ms += random.uniform(-state.latency_jitter_ms, state.latency_jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+        if state.failure_rate and random.random() < state.failure_rate:
+            with state.lock:
+                state.failure_count += 1
+            self._send(500, {"error": {"type": "api_error", "message": "Injected failure (fake Stripe)."}})
+            return False
+        return True
+
+    def _session_payload(self, session: dict, expand: list) -> dict:
+        payload = dict(session)
+        if "payment_intent" in expand and session["payment_intent"]:
+            payload["payment_intent"] = {
+                "id": session["payment_intent"],
+                "object": "payment_intent",
+                "status": "succeeded",
+                "amount": session["amount_total"],
+                "currency": session["currency"],
+            }
+        return payload
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8")
+
+        if urlparse(self.path).path.rstrip("/") != "/v1/checkout/sessions":
+            return self._send(404, {"error": {"type": "invalid_request_error", "message": "Unrecognized request URL."}})
+
+        if not self._simulate_network():
+            return
+
+        state = self.state
+        idem_key = self.headers.get("Idempotency-Key")
+        with state.lock:
+            replay = state.sessions[state.idempotency[idem_key]] if idem_key in state.idempotency else None
+        if replay:
+            return self._send(200, replay)
+
+        params = _decode_form(body)
+        unit_amount = int(params.get("line_items[0][price_data][unit_amount]") or 0)
+        quantity = int(params.get("line_items[0][quantity]") or 1)
+        session_id = _new_id("cs_test")
+        base_url = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+
+        session = {
+            "id": session_id,
+            "object": "checkout.session",
+            "mode": params.get("mode", "payment"),
+            "status": "open",
+            "payment_status": "unpaid",
+            "payment_intent": None,
+            "amount_total": unit_amount * quantity,
+            "currency": params.get("line_items[0][price_data][currency]", "usd"),
+            "metadata": params["metadata"],
+            "success_url": params.get("success_url", "").replace("{CHECKOUT_SESSION_ID}", session_id),
+            "cancel_url": params.get("cancel_url", ""),
+            "url": f"{base_url}/pay/{session_id}",
+            "livemode": False,
+        }
+        with state.lock:
+            state.sessions[session_id] = session
+            if idem_key:
+                state.idempotency[idem_key] = session_id
+
+        if state.auto_pay:
+            state.mark_paid(session_id)
+
+        self._send(200, state.sessions[session_id])
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        prefix = "/v1/checkout/sessions/"
+        if not parsed.path.startswith(prefix):
+            return self._send(404, {"error": {"type": "invalid_request_error", "message": "Unrecognized request URL."}})
+
+        if not self._simulate_network():
+            return
+
+        session_id = parsed.path[len(prefix):].strip("/")
+        query = parse_qs(parsed.query)
+        expand = query.get("expand[]", []) + query.get("expand[0]", [])
+
+        with self.state.lock:
+            session = self.state.sessions.get(session_id)
+            if not session:
+                return self._send(404, {
+                    "error": {"type": "invalid_request_error", "message": f"No such checkout.session: '{session_id}'"}
+                })
+            payload = self._session_payload(session, expand)
+
+        self._send(200, payload)
+
+
+class FakeStripeServer:
+    """
+    Runs the fake API on a background thread. Port 0 picks a free port.
+    """
+    def __init__(self, host="127.0.0.1", port=0, **state_kwargs):
+        self.state = FakeStripeState(**state_kwargs)
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-stripe", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
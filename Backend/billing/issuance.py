@@ -0,0 +1,162 @@
+"""
+Annual bill issuance for Local Tax and City Rate.
+
+Bills are issued ward by ward in chunks with bulk_create(ignore_conflicts=True),
+relying on the (user, service_type, period_year) unique constraint on Bill, so
+re-running for the same year only fills in citizens that are missing a bill.
+
+Used by `manage.py issue_annual_bills` and the Ward admin actions.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+
+from accounts.models import Ward
+from .models import Bill, BillStatus, ServiceType
+
+User = get_user_model()
+
+
+LOCAL_TAX_AMOUNT = Decimal("10.00")  # SLE, fixed per citizen per year
+
+ANNUAL_SERVICE_TYPES = (ServiceType.LOCAL_TAX, ServiceType.CITY_RATE)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def annual_bill_fields(service_type: str, year: int, amount_due: Decimal) -> dict:
+    """
+    Field values for a fresh annual bill (shared by bulk issuance and lazy checkout).
+    """
+    if service_type not in ANNUAL_SERVICE_TYPES:
+        raise ValueError(f"{service_type} is not an annual service.")
+
+    fields = {
+        "service_type": service_type,
+        "period_year": year,
+        "amount_due": amount_due,  # stored in SLE
+        "amount_paid": Decimal("0.00"),
+        "status": BillStatus.PENDING,
+        "installment_count": 0,
+    }
+
+    if service_type == ServiceType.CITY_RATE:
+        # City Rate: up to 3 installments, due 30 September
+        fields.update(allow_installments=True, max_installments=3, due_date=date(year, 9, 30))
+    else:
+        fields.update(allow_installments=False, max_installments=1, due_date=None)
+
+    return fields
+
+
+def get_or_create_annual_bill(user, service_type: str, year: int, amount_due: Decimal | None) -> Bill:
+    """
+    Race-free get-or-create for checkout.
+
+    1) single probe on the (user, service_type, period_year) unique index
+    2) on a miss: INSERT ... ON CONFLICT DO NOTHING, then read back whichever
+       row won (ours, or a concurrent checkout's) -> never two bills
+    """
+    lookup = {"user": user, "service_type": service_type, "period_year": year}
+
+    bill = Bill.objects.filter(**lookup).first()
+    if bill:
+        return bill
+
+    if amount_due is None:
+        raise ValueError(f"amount_due is required for the first {service_type} payment.")
+
+    Bill.objects.bulk_create(
+        [Bill(user=user, **annual_bill_fields(service_type, year, amount_due))],
+        ignore_conflicts=True,
+    )
+    return Bill.objects.get(**lookup)
+
+
+def payable_annual_bill(user, service_type: str, year: int, amount_due: Decimal | None) -> Bill:
+    """
+    The bill a checkout pays: the oldest still-open (PENDING / PARTIAL) annual bill up to
+    `year`, so arrears are settled before the current year; otherwise `year`'s bill
+    (created if missing). Bills from before period_year existed count as oldest.
+    """
+    oldest_open = (
+        Bill.objects.filter(
+            user=user,
+            service_type=service_type,
+            status__in=(BillStatus.PENDING, BillStatus.PARTIAL),
+        )
+        .exclude(period_year__gt=year)
+        .order_by(F("period_year").asc(nulls_first=True), "created_at")
+        .first()
+    )
+    if oldest_open:
+        return oldest_open
+    return get_or_create_annual_bill(user, service_type, year, amount_due)
+
+
+def eligible_citizens():
+    return User.objects.filter(user_type="CITIZEN", is_active=True, ward__isnull=False)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def issue_annual_bills(service_type: str, year: int, amount_due: Decimal, ward_ids=None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Issues `year` bills for every eligible citizen, ward by ward.
+
+    Generator: yields a progress dict after every chunk so callers can stream it:
+        {"ward_id", "ward", "chunk_size", "created", "skipped", "ward_done", "ward_total"}
+    """
+    fields = annual_bill_fields(service_type, year, amount_due)
+
+    wards = Ward.objects.order_by("id")
+    if ward_ids:
+        wards = wards.filter(id__in=ward_ids)
+
+    for ward in wards:
+        user_ids = list(
+            eligible_citizens().filter(ward=ward).order_by("id").values_list("id", flat=True)
+        )
+        done = 0
+
+        for chunk in _chunks(user_ids, chunk_size):
+            chunk_bills = Bill.objects.filter(user_id__in=chunk, service_type=service_type, period_year=year)
+            with transaction.atomic():
+                before = chunk_bills.count()
+                # ignore_conflicts returns no ids, so the rows inserted are counted afterwards
+                Bill.objects.bulk_create(
+                    [Bill(user_id=user_id, **fields) for user_id in chunk],
+                    batch_size=chunk_size,
+                    ignore_conflicts=True,
+                )
+                created = chunk_bills.count() - before
+
+            done += len(chunk)
+            yield {
+                "ward_id": ward.id,
+                "ward": ward.name,
+                "chunk_size": len(chunk),
+                "created": created,
+                "skipped": len(chunk) - created,
+                "ward_done": done,
+                "ward_total": len(user_ids),
+            }
+
+
+def issue_annual_bills_summary(service_type: str, year: int, amount_due: Decimal, ward_ids=None) -> dict:
+    """
+    Runs issuance to completion and returns totals (for the admin actions).
+    """
+    totals = {"wards": set(), "created": 0, "skipped": 0}
+    for progress in issue_annual_bills(service_type, year, amount_due, ward_ids=ward_ids):
+        totals["wards"].add(progress["ward_id"])
+        totals["created"] += progress["created"]
+        totals["skipped"] += progress["skipped"]
+    totals["wards"] = len(totals["wards"])
+    return totals
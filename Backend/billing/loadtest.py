@@ -0,0 +1,182 @@
+"""
+Checkout -> verify load test for the citizen billing flows.
+
+Drives N concurrent citizens through POST .../checkout/ and GET .../verify/
+against billing.fake_stripe.FakeStripeServer, so it runs offline (CI, laptops).
+Reports throughput, p50/p99 latency and queries per request per endpoint.
+
+Used by `manage.py bench_checkout` and by billing/tests.py.
+"""
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import Client
+from django.test.utils import override_settings
+from knox.models import AuthToken
+
+from accounts.models import Ward
+from core.loadtest import LatencyRecorder, run_concurrently
+from .fake_stripe import FakeStripeServer
+from .models import (
+    WastePlan,
+    WasteInterval,
+    WasteBlock,
+    WasteServiceProvider,
+    WasteBlockProvider,
+    WasteWardMeta,
+    Business,
+    BusinessCategory,
+    BusinessLicenseDemandNotice,
+    DemandNoticeStatus,
+)
+from .stripe_client import stripe_client
+
+User = get_user_model()
+
+
+# url prefix under /billing/ for each flow
+SERVICES = {
+    "local-tax": "local-tax",
+    "city-rate": "city-rate",
+    "waste": "waste-collection",
+    "business-license": "business-license/payment",
+}
+
+
+# ----------------------------
+# SEED DATA
+# ----------------------------
+def seed_citizens(count: int, service: str, label: str = "bench"):
+    """
+    Creates `count` citizens in one ward with knox tokens, plus whatever
+    reference data the chosen flow needs. Returns [(user, token, checkout_payload)].
+    """
+    ward = Ward.objects.create(name=f"{label.title()} Ward")
+
+    users = User.objects.bulk_create([
+        User(
+            email=f"{label}{i}@loadtest.local",
+            first_name="Bench",
+            last_name=f"Citizen {i}",
+            user_type="CITIZEN",
+            ward=ward,
+            password=make_password(None),
+        )
+        for i in range(count)
+    ])
+
+    payloads = [{} for _ in users]
+
+    if service == "city-rate":
+        payloads = [{"amount_due": "300.00", "pay_amount": "100.00"} for _ in users]
+
+    elif service == "waste":
+        block = WasteBlock.objects.create(block_number=90, name=f"{label.title()} Block")
+        provider = WasteServiceProvider.objects.create(name=f"{label.title()} Provider")
+        WasteBlockProvider.objects.create(block=block, provider=provider)
+        WasteWardMeta.objects.create(ward=ward, block=block)
+        plan = WastePlan.objects.create(name="Monthly", interval=WasteInterval.MONTH, price=Decimal("100.00"))
+        payloads = [{"plan_id": plan.id} for _ in users]
+
+    elif service == "business-license":
+        businesses = Business.objects.bulk_create([
+            Business(owner=u, business_name=f"Bench Shop {u.id}", category=BusinessCategory.OTHER, ward=ward)
+            for u in users
+        ])
+        notices = BusinessLicenseDemandNotice.objects.bulk_create([
+            BusinessLicenseDemandNotice(
+                owner=b.owner,
+                business=b,
+                notice_number=f"BENCH-{b.id}",
+                license_year=2026,
+                amount_due=Decimal("250.00"),
+                status=DemandNoticeStatus.VERIFIED,
+            )
+            for b in businesses
+        ])
+        payloads = [{"notice_id": n.id} for n in notices]
+
+    tokens = [AuthToken.objects.create(u)[1] for u in users]
+    return list(zip(users, tokens, payloads))
+
+
+# ----------------------------
+# RUNNER
+# ----------------------------
+def run_checkout_benchmark(
+    service: str = "local-tax",
+    citizens: int = 50,
+    concurrency: int = 10,
+    stripe_latency_ms: float = 50.0,
+    stripe_jitter_ms: float = 0.0,
+    stripe_failure_rate: float = 0.0,
+) -> dict:
+    if service not in SERVICES:
+        raise ValueError(f"Unknown service '{service}'. Choose from: {', '.join(SERVICES)}")
+
+    prefix = f"/billing/{SERVICES[service]}"
+    recorder = LatencyRecorder()
+    seeded = seed_citizens(citizens, service)
+
+    def citizen_flow(item):
+        user, token, payload = item
+        client = Client(HTTP_AUTHORIZATION=f"Token {token}")
+
+        with recorder.measure("checkout") as result:
+            resp = client.post(f"{prefix}/checkout/", data=payload, content_type="application/json")
+            result["ok"] = resp.status_code == 200
+        if resp.status_code != 200:
+            return
+
+        session_id = resp.json()["session_id"]
+        with recorder.measure("verify") as result:
+            resp = client.get(f"{prefix}/verify/", {"session_id": session_id})
+            body = resp.json()
+            result["ok"] = resp.status_code == 200 and "error" not in body and body.get("status") != "NOT_PAID"
+
+    fake = FakeStripeServer(
+        latency_ms=stripe_latency_ms,
+        latency_jitter_ms=stripe_jitter_ms,
+        failure_rate=stripe_failure_rate,
+    )
+
+    with fake, tempfile.TemporaryDirectory() as media_root, override_settings(
+        STRIPE_API_BASE=fake.url,
+        STRIPE_SECRET_KEY="sk_test_loadtest",
+        EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+        MEDIA_ROOT=media_root,
+    ):
+        stripe_client.reset()
+        try:
+            recorder.start()
+            errors = run_concurrently(citizen_flow, seeded, concurrency)
+            recorder.stop()
+            client_stats = stripe_client.stats.snapshot()
+            breaker_state = stripe_client.breaker.state if stripe_client.breaker else None
+        finally:
+            stripe_client.reset()
+
+    endpoints = recorder.summary()
+    wall = recorder.finished_at - recorder.started_at
+    completed = endpoints.get("verify", {}).get("count", 0) - endpoints.get("verify", {}).get("errors", 0)
+
+    return {
+        "service": service,
+        "citizens": citizens,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "completed_flows": completed,
+        "flows_per_second": round(completed / wall, 2) if wall > 0 else 0.0,
+        "endpoints": endpoints,
+        "stripe": {
+            "latency_ms": stripe_latency_ms,
+            "failure_rate": stripe_failure_rate,
+            "requests": fake.state.request_count,
+            "injected_failures": fake.state.failure_count,
+            "client": client_stats,
+            "breaker_state": breaker_state,
+        },
+        "exceptions": [repr(e) for e in errors[:10]],
+    }
@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import temporary_test_database
+from billing.loadtest import SERVICES, run_checkout_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test checkout -> verify for N concurrent citizens against a local fake Stripe. "
+        "Runs in a throwaway test database, so it is safe offline and in CI."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--service", choices=sorted(SERVICES), default="local-tax")
+        parser.add_argument("--citizens", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--stripe-latency-ms", type=float, default=50.0)
+        parser.add_argument("--stripe-jitter-ms", type=float, default=0.0)
+        parser.add_argument("--stripe-failure-rate", type=float, default=0.0)
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database between runs.")
+        parser.add_argument("--json", action="store_true", help="Print the raw report as JSON.")
+
+    def handle(self, *args, **opts):
+        if opts["citizens"] < 1 or opts["concurrency"] < 1:
+            raise CommandError("--citizens and --concurrency must be at least 1.")
+
+        with temporary_test_database(keepdb=opts["keepdb"]):
+            report = run_checkout_benchmark(
+                service=opts["service"],
+                citizens=opts["citizens"],
+                concurrency=opts["concurrency"],
+                stripe_latency_ms=opts["stripe_latency_ms"],
+                stripe_jitter_ms=opts["stripe_jitter_ms"],
+                stripe_failure_rate=opts["stripe_failure_rate"],
+            )
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{report['service']}: {report['citizens']} citizens x {report['concurrency']} threads, "
+            f"Stripe latency {report['stripe']['latency_ms']}ms, failure rate {report['stripe']['failure_rate']}"
+        )
+        self.stdout.write(
+            f"Completed flows: {report['completed_flows']} in {report['wall_seconds']}s "
+            f"({report['flows_per_second']} flows/s)"
+        )
+        self.stdout.write(f"{'endpoint':<10}{'count':>7}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p99 ms':>9}{'queries':>9}")
+        for label, row in report["endpoints"].items():
+            self.stdout.write(
+                f"{label:<10}{row['count']:>7}{row['errors']:>8}{row['rps']:>9}"
+                f"{row['p50_ms']:>9}{row['p99_ms']:>9}{row['queries_per_request']:>9}"
+            )
+        self.stdout.write(f"Stripe breaker: {report['stripe']['breaker_state']}")
+        for err in report["exceptions"]:
+            self.stderr.write(err)
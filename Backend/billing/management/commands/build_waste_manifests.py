@@ -0,0 +1,49 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from billing.manifests import MANIFEST_FORMATS, precompute_manifest, prune_manifests
+from billing.models import WasteBlockProvider
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the daily collection manifests (CSV + PDF) for every block with a provider. "
+        "Run nightly, e.g. cron `30 2 * * *`; defaults to tomorrow's date. Deletes the files of past days."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", default=None, help="Manifest date YYYY-MM-DD (default: tomorrow).")
+        parser.add_argument("--block", type=int, action="append", dest="blocks", help="Limit to block id (repeatable).")
+        parser.add_argument("--format", choices=MANIFEST_FORMATS, action="append", dest="formats")
+
+    def handle(self, *args, **opts):
+        if opts["date"]:
+            try:
+                on_date = date.fromisoformat(opts["date"])
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD.")
+        else:
+            on_date = timezone.now().date() + timedelta(days=1)
+
+        mappings = WasteBlockProvider.objects.select_related("block", "provider").order_by("block__block_number")
+        if opts["blocks"]:
+            mappings = mappings.filter(block_id__in=opts["blocks"])
+
+        formats = opts["formats"] or MANIFEST_FORMATS
+        started = time.monotonic()
+        built = 0
+
+        for m in mappings:
+            for fmt in formats:
+                path = precompute_manifest(m.block_id, on_date, fmt)
+                built += 1
+                self.stdout.write(f"  {m.block} ({m.provider}): {path}")
+
+        pruned = prune_manifests(before=timezone.now().date())
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {built} manifests for {on_date} in {time.monotonic() - started:.1f}s; "
+            f"removed {pruned} from past days."
+        ))
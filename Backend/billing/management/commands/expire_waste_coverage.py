@@ -0,0 +1,87 @@
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from billing.coverage import DEFAULT_EXPIRY_CHUNK_SIZE, expire_waste_coverages
+from billing.models import WasteBlock, WasteCoverage, WasteServiceProvider
+from billing.notifications import notify_citizen_waste_coverage_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark lapsed waste collection coverages as EXPIRED (run daily, e.g. cron `15 0 * * *`). "
+        "Prints counts per block/provider and can email renewal reminders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", default=None, help="Treat this day (YYYY-MM-DD) as today.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_EXPIRY_CHUNK_SIZE)
+        parser.add_argument("--remind", action="store_true", help="Email households left without coverage.")
+        parser.add_argument(
+            "--remind-within-days", type=int, default=7,
+            help="Only remind for coverages that ended within this many days (skips an old backlog).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["date"]:
+            try:
+                today = date.fromisoformat(opts["date"])
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD.")
+        else:
+            today = timezone.now().date()
+
+        started = time.monotonic()
+        expired = 0
+        by_block_provider = Counter()
+        lapsed_ids = []
+
+        for progress in expire_waste_coverages(today=today, chunk_size=opts["chunk_size"]):
+            expired += progress["expired"]
+            by_block_provider.update(progress["by_block_provider"])
+            lapsed_ids.extend(progress["lapsed"])
+            self.stdout.write(f"  expired {progress['expired']} (total {expired})")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} coverages up to {today} in {elapsed:.1f}s."))
+
+        if by_block_provider:
+            self._write_breakdown(by_block_provider)
+
+        if opts["remind"] and lapsed_ids:
+            self._send_reminders(lapsed_ids, today - timedelta(days=opts["remind_within_days"]))
+
+    def _write_breakdown(self, counts):
+        blocks = dict(WasteBlock.objects.filter(id__in={b for b, _ in counts}).values_list("id", "name"))
+        providers = dict(WasteServiceProvider.objects.filter(id__in={p for _, p in counts}).values_list("id", "name"))
+
+        self.stdout.write(f"{'Block':<30} {'Provider':<30} {'Expired':>8}")
+        for (block_id, provider_id), n in counts.most_common():
+            self.stdout.write(
+                f"{blocks.get(block_id, '-'):<30} {providers.get(provider_id, '-'):<30} {n:>8}"
+            )
+
+    def _send_reminders(self, coverage_ids, not_before):
+        coverages = (
+            WasteCoverage.objects.select_related("user", "plan")
+            .filter(id__in=coverage_ids, end_date__gte=not_before)
+            .order_by("user_id", "-end_date")
+        )
+
+        sent = failed = 0
+        reminded = set()
+        for coverage in coverages:
+            if coverage.user_id in reminded:
+                continue
+            reminded.add(coverage.user_id)
+            try:
+                notify_citizen_waste_coverage_expired(coverage, coverage.user)
+                sent += 1
+            except Exception as e:
+                failed += 1
+                print("[WASTE REMINDER EMAIL ERROR]", coverage.user_id, e)
+
+        self.stdout.write(f"Renewal reminders: {sent} sent, {failed} failed.")
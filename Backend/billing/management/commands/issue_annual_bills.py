@@ -0,0 +1,63 @@
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from billing.issuance import LOCAL_TAX_AMOUNT, DEFAULT_CHUNK_SIZE, issue_annual_bills
+from billing.models import ServiceType
+
+
+SERVICE_CHOICES = {
+    "local-tax": ServiceType.LOCAL_TAX,
+    "city-rate": ServiceType.CITY_RATE,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Issue the year's Local Tax or City Rate bills for every eligible citizen, ward by ward. "
+        "Safe to re-run: citizens that already have a bill for the year are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("service", choices=sorted(SERVICE_CHOICES))
+        parser.add_argument("--year", type=int, default=None, help="Billing year (default: current year).")
+        parser.add_argument("--amount", default=None, help="Amount due in SLE (required for city-rate).")
+        parser.add_argument("--ward", type=int, action="append", dest="wards", help="Limit to ward id (repeatable).")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **opts):
+        service_type = SERVICE_CHOICES[opts["service"]]
+        year = opts["year"] or timezone.now().year
+
+        if opts["amount"] is not None:
+            try:
+                amount = Decimal(opts["amount"])
+            except InvalidOperation:
+                raise CommandError("--amount must be a number.")
+        elif service_type == ServiceType.LOCAL_TAX:
+            amount = LOCAL_TAX_AMOUNT
+        else:
+            raise CommandError("--amount is required for city-rate.")
+
+        if amount <= 0:
+            raise CommandError("--amount must be greater than 0.")
+
+        self.stdout.write(f"Issuing {service_type} bills for {year} at SLE {amount:,.2f} ...")
+
+        started = time.monotonic()
+        created = skipped = 0
+        for progress in issue_annual_bills(service_type, year, amount, ward_ids=opts["wards"], chunk_size=opts["chunk_size"]):
+            created += progress["created"]
+            skipped += progress["skipped"]
+            self.stdout.write(
+                f"  {progress['ward']}: {progress['ward_done']}/{progress['ward_total']} "
+                f"(+{progress['created']} new, {progress['skipped']} already billed)"
+            )
+
+        elapsed = time.monotonic() - started
+        rate = (created + skipped) / elapsed if elapsed > 0 else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {created} bills created, {skipped} skipped in {elapsed:.1f}s ({rate:,.0f} citizens/s)."
+        ))
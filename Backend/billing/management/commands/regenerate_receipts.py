@@ -0,0 +1,125 @@
+import os
+import time
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Ward
+from billing.models import ServiceType
+from core.processes import django_process_pool
+from core.tracing import continue_trace, inject
+from billing.receipt_regeneration import (
+    DEFAULT_BATCH_SIZE,
+    batched_ids,
+    regenerate_batch,
+    regeneration_queryset,
+)
+
+
+def _parse_date(value, option):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        raise CommandError(f"{option} must be YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenerate stored PDF receipts (e.g. after a template change) for paid payments matching "
+        "a date range / service / ward, using a pool of worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", default=None, help="First payment day (YYYY-MM-DD).")
+        parser.add_argument("--to", dest="date_to", default=None, help="Last payment day (YYYY-MM-DD).")
+        parser.add_argument(
+            "--service", action="append", choices=ServiceType.values, default=[],
+            help="Service type; repeat for several (default: all).",
+        )
+        parser.add_argument("--ward", action="append", default=[], help="Ward id or name; repeat for several.")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="Worker processes (1 renders in this process; also the fallback if a pool cannot start).",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Only count the matching payments.")
+
+    def handle(self, *args, **opts):
+        if opts["workers"] < 1 or opts["batch_size"] < 1:
+            raise CommandError("--workers and --batch-size must be at least 1.")
+
+        date_from = _parse_date(opts["date_from"], "--from")
+        date_to = _parse_date(opts["date_to"], "--to")
+        ward_ids = self._ward_ids(opts["ward"])
+
+        qs = regeneration_queryset(date_from, date_to, opts["service"], ward_ids)
+        total = qs.count()
+        self.stdout.write(f"{total} paid payments match.")
+        if opts["dry_run"] or not total:
+            return
+
+        with continue_trace(None, "regenerate_receipts", payments=total, workers=opts["workers"]):
+            self._regenerate(qs, total, opts)
+
+    def _regenerate(self, qs, total, opts):
+        started = time.monotonic()
+        totals = {"regenerated": 0, "failed": 0, "missing": 0, "bytes": 0}
+        errors = []
+
+        def collect(result):
+            for key in totals:
+                totals[key] += result[key]
+            errors.extend(result["errors"])
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"  {totals['regenerated'] + totals['failed']}/{total} "
+                f"({totals['regenerated'] / elapsed:.1f} receipts/s)"
+            )
+
+        batches = list(batched_ids(qs, opts["batch_size"]))
+        pool = django_process_pool(opts["workers"]) if opts["workers"] > 1 else None
+        if pool is None:
+            opts["workers"] = 1
+            for batch in batches:
+                collect(regenerate_batch(batch, inject()))
+        else:
+            unfinished = []
+            with pool:
+                futures = {pool.submit(regenerate_batch, batch, inject()): batch for batch in batches}
+                for future in as_completed(futures):
+                    try:
+                        collect(future.result())
+                    except BrokenProcessPool:
+                        unfinished.append(futures[future])
+            if unfinished:
+                # a worker could not start or died; batches are idempotent, so redo them here
+                self.stderr.write(f"Worker pool failed; regenerating {len(unfinished)} batches in this process.")
+                for batch in unfinished:
+                    collect(regenerate_batch(batch, inject()))
+
+        elapsed = time.monotonic() - started
+        rate = totals["regenerated"] / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Regenerated {totals['regenerated']} receipts ({totals['bytes'] / 1024 / 1024:.1f} MB) "
+            f"in {elapsed:.1f}s with {opts['workers']} workers: {rate:.1f} receipts/s."
+        ))
+        if totals["missing"]:
+            self.stdout.write(f"{totals['missing']} payments disappeared while running.")
+        if errors:
+            self.stderr.write(f"{totals['failed']} failed:")
+            for err in errors[:50]:
+                self.stderr.write(f"  {err}")
+
+    def _ward_ids(self, values):
+        ward_ids = []
+        for value in values:
+            if value.isdigit():
+                ward_ids.append(int(value))
+                continue
+            ward = Ward.objects.filter(name__iexact=value).first()
+            if not ward:
+                raise CommandError(f"Unknown ward: {value}")
+            ward_ids.append(ward.id)
+        return ward_ids
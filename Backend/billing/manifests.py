@@ -0,0 +1,265 @@
+"""
+Daily collection manifests: every household a provider must serve in one block on one date.
+
+- manifest_rows() streams the households off a server-side cursor (QuerySet.iterator)
+- write_csv()/write_pdf() render without holding the whole list in memory
+- precomputed files (`manage.py build_waste_manifests`, nightly) are reused until a
+  row in that block changes: each block has a version token in the shared cache,
+  bumped by billing/signals.py on commit when a coverage, or the citizen, profile,
+  ward or plan a manifest row is read from, is saved
+
+Manifests list citizens' names, phones and addresses, so the files live under
+MANIFEST_ROOT, outside MEDIA_ROOT: nothing serves that directory, they only leave
+through the provider-authenticated manifest view. Saving a new version deletes the
+block's superseded ones; prune_manifests() drops past days.
+"""
+import csv
+import tempfile
+import uuid
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfgen import canvas
+
+from .models import CoverageStatus, WasteCoverage
+
+MANIFEST_FORMATS = ("csv", "pdf")
+
+COLUMNS = [
+    ("coverage_id", "Coverage #"),
+    ("name", "Household"),
+    ("phone", "Phone"),
+    ("ward", "Ward"),
+    ("address", "Address"),
+    ("plan", "Plan"),
+    ("covered_until", "Covered Until"),
+]
+
+CURSOR_CHUNK_SIZE = 2000
+
+# rendered manifests stay in memory up to this size, then spill to a temp file
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+# ----------------------------
+# ROWS
+# ----------------------------
+def manifest_queryset(block_id: int, on_date):
+    return (
+        WasteCoverage.objects.filter(block_id=block_id, status=CoverageStatus.ACTIVE, period__contains=on_date)
+        .order_by("ward__name", "user__last_name", "user__first_name", "id")
+        .values_list(
+            "id",
+            "user__first_name",
+            "user__last_name",
+            "user__phone_number",
+            "ward__name",
+            "user__citizenprofile__address",
+            "plan__name",
+            "end_date",
+        )
+    )
+
+
+def manifest_rows(block_id: int, on_date):
+    """
+    Yields one dict per covered household (keys = COLUMNS), streamed from a server-side cursor.
+    """
+    for cov_id, first, last, phone, ward, address, plan, end_date in manifest_queryset(block_id, on_date).iterator(
+        chunk_size=CURSOR_CHUNK_SIZE
+    ):
+        yield {
+            "coverage_id": cov_id,
+            "name": f"{first} {last}".strip(),
+            "phone": getattr(phone, "as_e164", phone) or "",
+            "ward": ward or "",
+            "address": (address or "").replace("\n", ", "),
+            "plan": plan or "",
+            "covered_until": end_date.isoformat(),
+        }
+
+
+# ----------------------------
+# RENDERERS
+# ----------------------------
+class _Echo:
+    """csv.writer target that hands each line back instead of buffering it."""
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([label for _, label in COLUMNS])
+    for row in rows:
+        yield writer.writerow([row[key] for key, _ in COLUMNS])
+
+
+def write_csv(rows, fileobj):
+    for line in iter_csv(rows):
+        fileobj.write(line.encode("utf-8"))
+
+
+def write_pdf(rows, fileobj, title: str):
+    """
+    Landscape A4 table, page by page. Rows are drawn as they arrive from the cursor.
+    """
+    page_w, page_h = landscape(A4)
+    p = canvas.Canvas(fileobj, pagesize=landscape(A4))
+    margin = 28
+    line_h = 14
+    col_x = [margin, margin + 70, margin + 230, margin + 330, margin + 440, margin + 640, margin + 720]
+
+    def header(page_no):
+        y = page_h - margin
+        p.setFont("Helvetica-Bold", 13)
+        p.drawString(margin, y, title)
+        p.setFont("Helvetica", 8)
+        p.drawRightString(page_w - margin, y, f"Page {page_no}")
+        y -= 22
+        p.setFont("Helvetica-Bold", 9)
+        for x, (_, label) in zip(col_x, COLUMNS):
+            p.drawString(x, y, label)
+        p.line(margin, y - 4, page_w - margin, y - 4)
+        p.setFont("Helvetica", 8)
+        return y - line_h - 2
+
+    page_no = 1
+    count = 0
+    y = header(page_no)
+    for row in rows:
+        if y < margin + line_h:
+            p.showPage()
+            page_no += 1
+            y = header(page_no)
+
+        for x, (key, _) in zip(col_x, COLUMNS):
+            p.drawString(x, y, str(row[key])[:45])
+        y -= line_h
+        count += 1
+
+    p.setFont("Helvetica-Oblique", 8)
+    p.drawString(margin, max(y - 6, margin), f"Households: {count}")
+    p.showPage()
+    p.save()
+
+
+def render_manifest(block_id: int, on_date, fmt: str, fileobj, title: str = ""):
+    rows = manifest_rows(block_id, on_date)
+    if fmt == "pdf":
+        write_pdf(rows, fileobj, title or f"Waste Collection Manifest - {on_date}")
+    else:
+        write_csv(rows, fileobj)
+
+
+# ----------------------------
+# PRECOMPUTED FILES
+# ----------------------------
+def _block_version_key(block_id) -> str:
+    return f"billing:manifest:block:{block_id}:version"
+
+
+def _entry_key(block_id, on_date, fmt) -> str:
+    return f"billing:manifest:{on_date.isoformat()}:{block_id}:{fmt}"
+
+
+def block_version(block_id) -> str:
+    key = _block_version_key(block_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_block(block_id):
+    """
+    A coverage in this block changed: precomputed manifests for it are stale once that commits.
+    """
+    if block_id:
+        transaction.on_commit(lambda: cache.set(_block_version_key(block_id), uuid.uuid4().hex, timeout=None))
+
+
+def invalidate_blocks_of(**coverage_filter):
+    """
+    Invalidates every block with an active coverage matching the filter, e.g. user_id=...
+    after the citizen's name, phone or address changed.
+    """
+    block_ids = (
+        WasteCoverage.objects.filter(status=CoverageStatus.ACTIVE, block__isnull=False, **coverage_filter)
+        .values_list("block_id", flat=True)
+        .distinct()
+    )
+    for block_id in block_ids:
+        invalidate_block(block_id)
+
+
+def manifest_storage() -> FileSystemStorage:
+    return FileSystemStorage(location=settings.MANIFEST_ROOT, base_url=None)
+
+
+def precompute_manifest(block_id: int, on_date, fmt: str) -> str:
+    """
+    Renders one manifest to storage and remembers it against the block's current version.
+    Returns the storage path.
+    """
+    storage = manifest_storage()
+    version = block_version(block_id)
+    prefix = f"block-{block_id}-"
+    path = f"{on_date.isoformat()}/{prefix}{version[:12]}.{fmt}"
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as buffer:
+        render_manifest(block_id, on_date, fmt, buffer)
+        buffer.seek(0)
+        if storage.exists(path):
+            storage.delete(path)
+        saved = storage.save(path, File(buffer))
+
+    # earlier versions of this block's manifest for the day are stale now
+    for name in storage.listdir(on_date.isoformat())[1]:
+        if name.startswith(prefix) and name.endswith(f".{fmt}") and f"{on_date.isoformat()}/{name}" != saved:
+            storage.delete(f"{on_date.isoformat()}/{name}")
+
+    # keep for two days: tonight's run covers tomorrow, crews may still fetch today's
+    cache.set(_entry_key(block_id, on_date, fmt), {"version": version, "path": saved}, timeout=2 * 86400)
+    return saved
+
+
+def cached_manifest_path(block_id: int, on_date, fmt: str):
+    """
+    manifest_storage() path of an up-to-date precomputed manifest, or None.
+    """
+    entry = cache.get(_entry_key(block_id, on_date, fmt))
+    if not entry or entry["version"] != block_version(block_id):
+        return None
+    if not manifest_storage().exists(entry["path"]):
+        return None
+    return entry["path"]
+
+
+def prune_manifests(before) -> int:
+    """
+    Deletes the precomputed manifests for days before `before`. Returns the files removed.
+    """
+    storage = manifest_storage()
+    if not storage.exists(""):
+        return 0
+
+    removed = 0
+    for day in storage.listdir("")[0]:
+        try:
+            if date.fromisoformat(day) >= before:
+                continue
+        except ValueError:
+            continue
+        for name in storage.listdir(day)[1]:
+            storage.delete(f"{day}/{name}")
+            removed += 1
+        storage.delete(day)  # the emptied directory
+    return removed
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+# Give existing Local Tax / City Rate bills a billing year. Where a citizen already
+# has several bills for the same service in one year, only one (a PAID one if any,
+# otherwise the newest) gets the year so the unique constraint in 0006 can be added.
+BACKFILL_PERIOD_YEAR = """
+UPDATE billing_bill AS b
+SET period_year = EXTRACT(YEAR FROM b.created_at)::int
+FROM (
+    SELECT DISTINCT ON (user_id, service_type, EXTRACT(YEAR FROM created_at)) id
+    FROM billing_bill
+    WHERE service_type IN ('LOCAL_TAX', 'CITY_RATE')
+    ORDER BY user_id, service_type, EXTRACT(YEAR FROM created_at), (status = 'PAID') DESC, created_at DESC
+) AS latest
+WHERE b.id = latest.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_business_businesslicensedemandnotice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='period_year',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_PERIOD_YEAR, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0005_bill_period_year'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='bill',
+            constraint=models.UniqueConstraint(condition=models.Q(('service_type__in', ['LOCAL_TAX', 'CITY_RATE'])), fields=('user', 'service_type', 'period_year'), name='uniq_annual_bill_per_year'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-19 10:40
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import django.db.models.expressions
+from django.conf import settings
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+def shift_overlapping_coverages(apps, schema_editor):
+    """
+    Concurrent renewals could extend from the same end_date and overlap.
+    Re-chain each household's active periods (keeping their length) so the exclusion constraint can be added.
+    """
+    WasteCoverage = apps.get_model("billing", "WasteCoverage")
+
+    prev_user_id, prev_end = None, None
+    active = WasteCoverage.objects.filter(status="ACTIVE").order_by("user_id", "start_date", "id")
+    for cov in active.iterator(chunk_size=2000):
+        if cov.user_id != prev_user_id:
+            prev_user_id, prev_end = cov.user_id, None
+
+        if prev_end and cov.start_date < prev_end:
+            shift = prev_end - cov.start_date
+            cov.start_date += shift
+            cov.end_date += shift
+            cov.save(update_fields=["start_date", "end_date"])
+
+        prev_end = max(prev_end, cov.end_date) if prev_end else cov.end_date
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_bill_uniq_annual_bill_per_year'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.RunPython(shift_overlapping_coverages, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='wastecoverage',
+            name='period',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.Func(models.F('start_date'), models.F('end_date'), models.Value('[)'), function='daterange', output_field=django.contrib.postgres.fields.ranges.DateRangeField()), output_field=django.contrib.postgres.fields.ranges.DateRangeField()),
+        ),
+        migrations.AddConstraint(
+            model_name='wastecoverage',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status', 'ACTIVE')), expressions=[('user', '='), ('period', '&&')], name='excl_waste_coverage_overlap'),
+        ),
+    ]
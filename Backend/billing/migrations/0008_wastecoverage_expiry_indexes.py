@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0007_wastecoverage_period'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wastecoverage',
+            index=models.Index(fields=['user', 'status', 'end_date'], name='wastecov_user_status_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wastecoverage',
+            index=models.Index(condition=models.Q(('status', 'ACTIVE')), fields=['end_date'], name='wastecov_active_end_idx'),
+        ),
+    ]
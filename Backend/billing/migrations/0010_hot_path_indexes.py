@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-19 14:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; tables stay writable meanwhile
+    atomic = False
+
+    dependencies = [
+        ('billing', '0009_wasteserviceprovider_user'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='bill',
+            index=models.Index(fields=['user', 'service_type', 'status', '-created_at'], name='bill_user_svc_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='bill',
+            index=models.Index(fields=['-created_at'], name='bill_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('stripe_checkout_session_id__isnull', False)), fields=['stripe_checkout_session_id'], name='payment_checkout_session_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(fields=['status', '-paid_at'], name='payment_status_paid_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(fields=['-created_at'], name='payment_created_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeOperators
 from django.utils import timezone
 from datetime import timedelta
 from accounts.models import Ward 
@@ -37,6 +39,9 @@ class Bill(models.Model):
 
     due_date = models.DateField(null=True, blank=True)
 
+    # Billing year for annual services (Local Tax / City Rate). Null for per-purchase bills.
+    period_year = models.PositiveIntegerField(null=True, blank=True)
+
     allow_installments = models.BooleanField(default=False)
     max_installments = models.PositiveSmallIntegerField(default=1)
     installment_count = models.PositiveSmallIntegerField(default=0)
@@ -44,6 +49,22 @@ class Bill(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # One Local Tax / City Rate bill per citizen per year (bulk issuance relies on this)
+            models.UniqueConstraint(
+                fields=["user", "service_type", "period_year"],
+                condition=models.Q(service_type__in=["LOCAL_TAX", "CITY_RATE"]),
+                name="uniq_annual_bill_per_year",
+            ),
+        ]
+        indexes = [
+            # citizen bills list, pending total on the dashboard: one citizen's bills, newest first
+            models.Index(fields=["user", "service_type", "status", "-created_at"], name="bill_user_svc_status_idx"),
+            # admin bills list (newest first, paginated)
+            models.Index(fields=["-created_at"], name="bill_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.service_type} - {self.status}"
 
@@ -64,6 +85,20 @@ class Payment(models.Model):
 
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # checkout verify: lookup by Stripe Checkout Session id (set once a session exists)
+            models.Index(
+                fields=["stripe_checkout_session_id"],
+                condition=models.Q(stripe_checkout_session_id__isnull=False),
+                name="payment_checkout_session_idx",
+            ),
+            # dashboard stats / recent payments: paid payments by date
+            models.Index(fields=["status", "-paid_at"], name="payment_status_paid_at_idx"),
+            # admin payments list (newest first, paginated)
+            models.Index(fields=["-created_at"], name="payment_created_idx"),
+        ]
+
     def __str__(self):
         return f"Payment {self.id} - {self.bill.service_type} - {self.status}"
 
@@ -85,6 +120,15 @@ class WasteServiceProvider(models.Model):
     phone = models.CharField(max_length=50, blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
 
+    # Login used by the provider's field crews for the coverage lookup API
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="waste_provider",
+    )
+
     def __str__(self):
         return self.name
 
@@ -152,12 +196,44 @@ class WasteCoverage(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
 
+    # [start_date, end_date) as a Postgres daterange, maintained by the DB.
+    # Backs the overlap exclusion below and "covered on date D" lookups (period__contains=D).
+    period = models.GeneratedField(
+        expression=models.Func(
+            models.F("start_date"), models.F("end_date"), models.Value("[)"),
+            function="daterange",
+            output_field=DateRangeField(),
+        ),
+        output_field=DateRangeField(),
+        db_persist=True,
+    )
+
     status = models.CharField(max_length=10, choices=CoverageStatus.choices, default=CoverageStatus.ACTIVE)
 
     last_payment = models.ForeignKey("Payment", on_delete=models.SET_NULL, null=True, blank=True)
 
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        constraints = [
+            # A household's active coverage periods never overlap (renewals append, see
+            # billing/coverage.py); expired rows are history and may overlap a renewal
+            ExclusionConstraint(
+                name="excl_waste_coverage_overlap",
+                expressions=[
+                    ("user", RangeOperators.EQUAL),
+                    ("period", RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(status="ACTIVE"),
+            ),
+        ]
+        indexes = [
+            # "current coverage for this household": status=ACTIVE, end_date >= today
+            models.Index(fields=["user", "status", "end_date"], name="wastecov_user_status_end_idx"),
+            # expiry sweep: only the rows still marked ACTIVE, ordered by end_date
+            models.Index(fields=["end_date"], condition=models.Q(status="ACTIVE"), name="wastecov_active_end_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.plan} - {self.status}"
 
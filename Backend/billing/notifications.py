@@ -2,6 +2,9 @@ from django.conf import settings
 from django.core.mail import send_mail, EmailMessage
 from django.contrib.auth import get_user_model
 
+from core.instrumentation import timed
+from core.tracing import traced
+
 User = get_user_model()
 
 
@@ -11,13 +14,14 @@ User = get_user_model()
 def _send_email(to_email: str, subject: str, message: str):
     if not to_email:
         return
-    send_mail(
-        subject,
-        message,
-        settings.EMAIL_HOST_USER,
-        [to_email],
-        fail_silently=False,
-    )
+    with timed("email"):
+        send_mail(
+            subject,
+            message,
+            settings.EMAIL_HOST_USER,
+            [to_email],
+            fail_silently=False,
+        )
 
 
 def _service_label(service_type: str) -> str:
@@ -41,6 +45,7 @@ def _service_label(service_type: str) -> str:
 #     )
 #     _send_email(user.email, subject, message)
 
+@traced("notify.citizen_payment_success", ids=("payment", "bill"))
 def notify_citizen_payment_success(payment, bill, user):
     subject = "Payment Successful - Local Tax"
     message = (
@@ -56,11 +61,13 @@ def notify_citizen_payment_success(payment, bill, user):
 
     # ✅ Attach PDF if exists
     if payment.receipt_pdf:
-        email.attach(payment.receipt_pdf.name, payment.receipt_pdf.read(), "application/pdf")
+        email.attach(f"receipt_{payment.id:06d}.pdf", payment.receipt_pdf.read(), "application/pdf")
 
-    email.send(fail_silently=False)
+    with timed("email"):
+        email.send(fail_silently=False)
 
 
+@traced("notify.staff_ward_payment_success", ids=("payment", "bill"))
 def notify_staff_ward_payment_success(payment, bill, user):
     """
     Notify STAFF/COUNCILOR users in same ward as the citizen.
@@ -90,6 +97,7 @@ def notify_staff_ward_payment_success(payment, bill, user):
         _send_email(staff_user.email, subject, message)
 
 
+@traced("notify.admin_payment_success", ids=("payment", "bill"))
 def notify_admin_payment_success(payment, bill, user):
     """
     Notify ALL admins for every payment.
@@ -108,4 +116,22 @@ def notify_admin_payment_success(payment, bill, user):
             f"Paid At: {payment.paid_at}\n\n"
             f"Please review in the admin portal."
         )
-        _send_email(admin_user.email, subject, message)
\ No newline at end of file
+        _send_email(admin_user.email, subject, message)
+
+# ----------------------------
+# WASTE COVERAGE NOTIFICATIONS
+# ----------------------------
+def notify_citizen_waste_coverage_expired(coverage, user):
+    """
+    Renewal reminder once a household's waste collection coverage has lapsed.
+    """
+    plan_name = coverage.plan.name if coverage.plan else "Waste Collection"
+    subject = "Waste Collection Coverage Expired - Please Renew"
+    message = (
+        f"Hi {user.first_name} {user.last_name},\n\n"
+        f"Your waste collection coverage ({plan_name}) ended on {coverage.end_date}.\n"
+        f"Collections for your household will stop until you renew.\n\n"
+        f"Renew in the CCRSMS portal under Payments > Waste Collection.\n"
+        f"Thank you."
+    )
+    _send_email(user.email, subject, message)
@@ -0,0 +1,15 @@
+from rest_framework.permissions import BasePermission
+
+from .waste_mapping import get_waste_mapping
+
+
+class IsWasteProvider(BasePermission):
+    """
+    Logged-in user is linked to a WasteServiceProvider (checked against the cached mapping, no query).
+    """
+    def has_permission(self, request, view):
+        return bool(
+            request.user
+            and request.user.is_authenticated
+            and get_waste_mapping().provider_for_user(request.user.id)
+        )
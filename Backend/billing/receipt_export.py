@@ -0,0 +1,131 @@
+"""
+Streaming ZIP export of receipts for auditors (admin portal, by ward / date range).
+
+Payments are read in id batches (see receipt_regeneration.load_payment_batch). Stored
+PDFs are copied out of storage chunk by chunk; a payment whose file is missing gets its
+receipt rendered on the fly. The archive ends with manifest.csv (one row per payment,
+with the source and sha256 of each PDF), so nothing but the manifest rows is kept in memory.
+"""
+import csv
+import hashlib
+import io
+
+from django.core.files.storage import default_storage
+
+from core.streaming import CHUNK_SIZE, ZipEntry, zip_stream
+from .receipt_regeneration import batched_ids, load_payment_batch
+from .reciepts import build_receipt_for_payment
+
+MANIFEST_COLUMNS = [
+    "payment_id",
+    "file",
+    "citizen",
+    "email",
+    "ward",
+    "service_type",
+    "amount",
+    "paid_at",
+    "transaction_ref",
+    "source",
+    "sha256",
+]
+
+EXPORT_BATCH_SIZE = 200
+
+
+def _stored_chunks(name: str, digest):
+    """
+    Opens the stored receipt up front (so a missing file is detected before the entry starts)
+    and returns a generator over its chunks.
+    """
+    fh = default_storage.open(name, "rb")
+
+    def chunks():
+        with fh:
+            for chunk in fh.chunks(CHUNK_SIZE):
+                digest.update(chunk)
+                yield chunk
+
+    return chunks()
+
+
+def _manifest_row(payment, filename, source, digest):
+    user = payment.bill.user
+    return {
+        "payment_id": payment.id,
+        "file": filename,
+        "citizen": f"{user.first_name} {user.last_name}".strip(),
+        "email": user.email,
+        "ward": str(user.ward) if user.ward_id else "",
+        "service_type": payment.bill.service_type,
+        "amount": payment.amount,
+        "paid_at": payment.paid_at.isoformat() if payment.paid_at else "",
+        "transaction_ref": payment.stripe_payment_intent_id or payment.stripe_checkout_session_id or "",
+        "source": source,
+        "sha256": digest.hexdigest() if digest else "",
+    }
+
+
+def _receipt_entries(qs, manifest):
+    for batch in batched_ids(qs, EXPORT_BATCH_SIZE):
+        payments, coverages = load_payment_batch(batch)
+        for payment in payments:
+            bill = payment.bill
+            filename = f"{bill.service_type.lower()}/receipt_{payment.id:06d}.pdf"
+            digest = hashlib.sha256()
+
+            if payment.receipt_pdf:
+                try:
+                    chunks = _stored_chunks(payment.receipt_pdf.name, digest)
+                except OSError:
+                    chunks = None
+                if chunks is not None:
+                    row = _manifest_row(payment, filename, "stored", None)
+                    manifest.append(row)
+                    yield ZipEntry(filename, chunks, compress=False)
+                    row["sha256"] = digest.hexdigest()
+                    continue
+
+            try:
+                receipt = build_receipt_for_payment(
+                    payment,
+                    bill.user,
+                    bill,
+                    coverage=coverages.get(payment.id),
+                    notice=getattr(bill, "business_license_notice", None),
+                )
+            except Exception as e:
+                print("[RECEIPT EXPORT ERROR] payment", payment.id, e)
+                manifest.append(_manifest_row(payment, "", "failed", None))
+                continue
+
+            content = receipt.read()
+            digest.update(content)
+            manifest.append(_manifest_row(payment, filename, "rendered", digest))
+            yield ZipEntry(filename, [content], compress=False)
+
+
+def _manifest_chunks(manifest):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=MANIFEST_COLUMNS)
+    writer.writeheader()
+    for row in manifest:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def iter_receipts_zip(qs):
+    """
+    Yields the ZIP bytes for the payments in `qs` (see receipt_regeneration.regeneration_queryset).
+    """
+    manifest = []
+
+    def entries():
+        yield from _receipt_entries(qs, manifest)
+        yield ZipEntry("manifest.csv", _manifest_chunks(manifest))
+
+    return zip_stream(entries())
@@ -0,0 +1,182 @@
+"""
+Bulk receipt regeneration (`manage.py regenerate_receipts`), e.g. after the council
+changes the receipt template or designation text.
+
+- payment ids are selected once, then split into batches handed to a process pool
+  (core/processes.py: the platform's default start method, spawn-safe)
+- each worker loads its whole batch up front: payments with bill, citizen, ward and
+  profile in one joined query, waste coverages in one more (no per-row lazy queries)
+- each PDF is written atomically (temp file + os.replace), so a receipt being downloaded
+  or emailed meanwhile is either the old one or the new one, never half written
+"""
+import os
+import tempfile
+import time
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+
+from core.tracing import continue_trace, flush_spans
+from .models import Payment, PaymentStatus, WasteCoverage
+from .reciepts import build_receipt_for_payment
+
+DEFAULT_BATCH_SIZE = 200
+
+
+# ----------------------------
+# SELECTION
+# ----------------------------
+def regeneration_queryset(date_from=None, date_to=None, service_types=None, ward_ids=None):
+    """
+    Paid payments to regenerate, oldest first. Dates filter on the payment day.
+    """
+    qs = Payment.objects.filter(status=PaymentStatus.PAID)
+    if date_from:
+        qs = qs.filter(paid_at__date__gte=date_from)
+    if date_to:
+        qs = qs.filter(paid_at__date__lte=date_to)
+    if service_types:
+        qs = qs.filter(bill__service_type__in=service_types)
+    if ward_ids:
+        qs = qs.filter(bill__user__ward_id__in=ward_ids)
+    return qs.order_by("id")
+
+
+def batched_ids(qs, batch_size: int = DEFAULT_BATCH_SIZE):
+    batch = []
+    for payment_id in qs.values_list("id", flat=True).iterator(chunk_size=max(batch_size, 2000)):
+        batch.append(payment_id)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ----------------------------
+# WORKER
+# ----------------------------
+def load_payment_batch(payment_ids):
+    """
+    (payments, {payment_id: waste coverage}) with everything a receipt needs, in two queries.
+    """
+    payments = list(
+        Payment.objects.filter(id__in=payment_ids)
+        .select_related(
+            "bill",
+            "bill__user",
+            "bill__user__ward",
+            "bill__user__citizenprofile",
+            "bill__business_license_notice__business",
+        )
+        .order_by("id")
+    )
+
+    waste_ids = [p.id for p in payments if p.bill.service_type == "WASTE_COLLECTION"]
+    coverages = {}
+    if waste_ids:
+        for coverage in WasteCoverage.objects.filter(last_payment_id__in=waste_ids).select_related(
+            "block", "provider", "plan"
+        ):
+            coverages[coverage.last_payment_id] = coverage
+    return payments, coverages
+
+
+def _atomic_write(storage, name: str, content: bytes) -> str:
+    """
+    Replaces `name` in one step and returns the stored name. Content-addressed storage
+    (core/storage.py) and storages without local paths (S3 etc.) get a fresh name instead;
+    the caller repoints the payment to it.
+    """
+    if getattr(storage, "content_addressed", False):
+        # the old blob may back other rows, so it is never overwritten; save() is already atomic
+        return storage.save(name, ContentFile(content))
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        return storage.save(name, ContentFile(content))
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".receipt-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(content)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.chmod(tmp_path, storage.file_permissions_mode or 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return name
+
+
+def regenerate_batch(payment_ids, traceparent=None) -> dict:
+    """
+    Regenerates one batch. Runs inside a pool worker (or inline with --workers 1),
+    as a child span of `traceparent` (core/tracing.py) when tracing is on.
+    """
+    try:
+        with continue_trace(traceparent, "receipts.regenerate_batch", batch_size=len(payment_ids)):
+            return _regenerate_batch(payment_ids)
+    finally:
+        # pool workers exit without running atexit handlers
+        flush_spans()
+
+
+def _regenerate_batch(payment_ids) -> dict:
+    close_old_connections()
+    started = time.monotonic()
+    payments, coverages = load_payment_batch(payment_ids)
+
+    done = 0
+    written_bytes = 0
+    errors = []
+    repointed = []
+    superseded = []
+    storage = default_storage
+
+    for payment in payments:
+        bill = payment.bill
+        try:
+            receipt = build_receipt_for_payment(
+                payment,
+                bill.user,
+                bill,
+                coverage=coverages.get(payment.id),
+                notice=getattr(bill, "business_license_notice", None),
+            )
+            content = receipt.read()
+            old_name = payment.receipt_pdf.name if payment.receipt_pdf else None
+            target = old_name or payment.receipt_pdf.field.generate_filename(payment, receipt.name)
+
+            stored = _atomic_write(storage, target, content)
+            if stored != old_name:
+                payment.receipt_pdf.name = stored
+                repointed.append(payment)
+                if old_name:
+                    superseded.append(old_name)
+
+            done += 1
+            written_bytes += len(content)
+        except Exception as e:
+            errors.append(f"payment {payment.id}: {e}")
+
+    if repointed:
+        Payment.objects.bulk_update(repointed, ["receipt_pdf"])
+    for name in superseded:
+        storage.delete(name)
+
+    missing = len(payment_ids) - len(payments)
+    return {
+        "regenerated": done,
+        "failed": len(errors),
+        "missing": missing,
+        "bytes": written_bytes,
+        "seconds": time.monotonic() - started,
+        "errors": errors,
+    }
+
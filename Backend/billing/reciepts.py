@@ -10,7 +10,12 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from reportlab.lib import colors
 
+from core.instrumentation import timed
+from core.tracing import traced
 
+
+@timed("receipt")
+@traced("receipt.render", ids=("payment", "bill"))
 def build_local_tax_receipt_pdf(payment, user, bill):
     """
     FCC-style Local Tax receipt (clean PDF).
@@ -175,6 +180,8 @@ def build_local_tax_receipt_pdf(payment, user, bill):
     buffer.seek(0)
     return ContentFile(buffer.read(), name=f"local_tax_receipt_{payment.id}.pdf")
 
+@timed("receipt")
+@traced("receipt.render", ids=("payment", "bill"))
 def build_city_rate_receipt_pdf(payment, user, bill):
     buffer = io.BytesIO()
     page_w, page_h = A5
@@ -289,6 +296,8 @@ def build_city_rate_receipt_pdf(payment, user, bill):
     buffer.seek(0)
     return ContentFile(buffer.read(), name=f"city_rate_receipt_{payment.id}.pdf")
 
+@timed("receipt")
+@traced("receipt.render", ids=("payment", "bill"))
 def build_waste_collection_receipt_pdf(payment, user, bill, coverage):
     """
     Waste Collection Receipt (FCC style) - NEW FLOW:
@@ -443,6 +452,8 @@ def build_waste_collection_receipt_pdf(payment, user, bill, coverage):
     buffer.seek(0)
     return ContentFile(buffer.read(), name=f"waste_receipt_{payment.id}.pdf")
 
+@timed("receipt")
+@traced("receipt.render", ids=("payment", "bill"))
 def build_business_license_receipt_pdf(payment, user, bill, notice):
     buffer = io.BytesIO()
     page_w, page_h = A5
@@ -560,3 +571,25 @@ def build_business_license_receipt_pdf(payment, user, bill, notice):
 
     buffer.seek(0)
     return ContentFile(buffer.read(), name=f"business_license_receipt_{payment.id}.pdf")
+
+
+# ----------------------------
+# DISPATCH
+# ----------------------------
+def build_receipt_for_payment(payment, user, bill, coverage=None, notice=None) -> ContentFile:
+    """
+    Receipt for any service type (bulk regeneration). Waste receipts need the coverage
+    the payment bought, business license receipts the demand notice.
+    """
+    service = bill.service_type
+    if service == "LOCAL_TAX":
+        return build_local_tax_receipt_pdf(payment, user, bill)
+    if service == "CITY_RATE":
+        return build_city_rate_receipt_pdf(payment, user, bill)
+    if service == "WASTE_COLLECTION":
+        return build_waste_collection_receipt_pdf(payment, user, bill, coverage)
+    if service == "BUSINESS_LICENSE":
+        if notice is None:
+            raise ValueError(f"Payment {payment.id} has no business license notice.")
+        return build_business_license_receipt_pdf(payment, user, bill, notice)
+    raise ValueError(f"Unknown service type: {service}")
@@ -10,6 +10,7 @@ from .models import (
     DemandNoticeStatus,
 
 )
+from .waste_mapping import get_waste_mapping
 
 
 class BillSerializer(serializers.ModelSerializer):
@@ -101,10 +102,32 @@ class WasteCheckoutSerializer(serializers.Serializer):
     plan_id = serializers.IntegerField()
 
     def validate_plan_id(self, value):
-        if not WastePlan.objects.filter(id=value, is_active=True).exists():
+        if not get_waste_mapping().active_plan(value):
             raise serializers.ValidationError("Invalid or inactive plan.")
         return value
 
+class ProviderCoverageLookupSerializer(serializers.Serializer):
+    phone = serializers.CharField(required=False)
+    nin = serializers.CharField(required=False)
+    coverage_id = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        given = [k for k in ("phone", "nin", "coverage_id") if attrs.get(k) not in (None, "")]
+        if len(given) != 1:
+            raise serializers.ValidationError("Provide exactly one of phone, nin or coverage_id.")
+        attrs["type"] = given[0]
+        attrs["value"] = attrs[given[0]]
+        return attrs
+
+class ProviderCoverageBatchSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=["phone", "nin", "coverage_id"])
+    values = serializers.ListField(child=serializers.CharField(), allow_empty=False, max_length=1000)
+
+class ProviderManifestSerializer(serializers.Serializer):
+    block = serializers.IntegerField(required=False)
+    date = serializers.DateField(required=False)
+    output = serializers.ChoiceField(choices=["csv", "pdf"], default="csv")
+
 class BusinessSerializer(serializers.ModelSerializer):
     class Meta:
         model = Business
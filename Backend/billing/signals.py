@@ -0,0 +1,74 @@
+from django.db.models.signals import post_save, post_delete
+
+from accounts.models import CitizenProfile, CustomUser, Ward
+from core import reference
+
+from .models import WasteWardMeta, WasteBlockProvider, WasteServiceProvider, WasteBlock, WastePlan, WasteCoverage
+from . import coverage_index, manifests, waste_mapping
+
+
+# ----------------------------
+# WASTE REFERENCE DATA CACHE
+# ----------------------------
+WASTE_REFERENCE_MODELS = (WasteWardMeta, WasteBlockProvider, WasteServiceProvider, WasteBlock, WastePlan)
+
+
+def invalidate_waste_mapping(sender, **kwargs):
+    waste_mapping.invalidate()
+
+
+for _model in WASTE_REFERENCE_MODELS:
+    post_save.connect(invalidate_waste_mapping, sender=_model, dispatch_uid=f"waste_mapping_save_{_model.__name__}")
+    post_delete.connect(invalidate_waste_mapping, sender=_model, dispatch_uid=f"waste_mapping_delete_{_model.__name__}")
+
+
+# ----------------------------
+# PROVIDER COVERAGE INDEX + MANIFESTS
+# ----------------------------
+def invalidate_coverage_index(sender, instance, **kwargs):
+    coverage_index.invalidate()
+    manifests.invalidate_block(instance.block_id)
+
+
+post_save.connect(invalidate_coverage_index, sender=WasteCoverage, dispatch_uid="coverage_index_save")
+post_delete.connect(invalidate_coverage_index, sender=WasteCoverage, dispatch_uid="coverage_index_delete")
+
+# manifest columns read through the coverage (billing/manifests.py manifest_queryset)
+MANIFEST_USER_FIELDS = {"first_name", "last_name", "phone_number"}
+
+
+def invalidate_citizen_manifests(sender, instance, update_fields=None, **kwargs):
+    # logins save last_login only; that is not on a manifest
+    if update_fields is not None and not MANIFEST_USER_FIELDS.intersection(update_fields):
+        return
+    manifests.invalidate_blocks_of(user_id=instance.pk)
+
+
+def invalidate_profile_manifests(sender, instance, **kwargs):
+    manifests.invalidate_blocks_of(user_id=instance.user_id)
+
+
+def invalidate_ward_manifests(sender, instance, **kwargs):
+    manifests.invalidate_blocks_of(ward_id=instance.pk)
+
+
+def invalidate_plan_manifests(sender, instance, **kwargs):
+    manifests.invalidate_blocks_of(plan_id=instance.pk)
+
+
+post_save.connect(invalidate_citizen_manifests, sender=CustomUser, dispatch_uid="manifest_user_save")
+post_save.connect(invalidate_profile_manifests, sender=CitizenProfile, dispatch_uid="manifest_profile_save")
+post_delete.connect(invalidate_profile_manifests, sender=CitizenProfile, dispatch_uid="manifest_profile_delete")
+post_save.connect(invalidate_ward_manifests, sender=Ward, dispatch_uid="manifest_ward_save")
+post_save.connect(invalidate_plan_manifests, sender=WastePlan, dispatch_uid="manifest_plan_save")
+
+
+# ----------------------------
+# REFERENCE DATA (core/reference.py)
+# ----------------------------
+def _build_waste_plans():
+    from .serializers import WastePlanSerializer
+    return WastePlanSerializer(WastePlan.objects.filter(is_active=True).order_by("price"), many=True).data
+
+
+reference.register("waste_plans", _build_waste_plans, models=[WastePlan])
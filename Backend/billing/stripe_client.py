@@ -0,0 +1,265 @@
+"""
+Stripe access layer for the billing views.
+
+All Stripe calls go through `stripe_client` so that every worker shares:
+- one pooled HTTP session with explicit connect/read timeouts
+- jittered retries for idempotent calls (retrieve, and create with an idempotency key)
+- a circuit breaker that fails checkout fast while Stripe is unhealthy
+- per-call latency stats
+"""
+import logging
+import random
+import threading
+import time
+import uuid
+
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from core.instrumentation import timed
+from core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class StripeUnavailable(Exception):
+    """
+    Stripe could not be reached (circuit open, or retries exhausted).
+    Views turn this into a 503 so the citizen can try again later.
+    """
+    default_message = "Payment provider is temporarily unavailable. Please try again shortly."
+
+    def __init__(self, message=None):
+        super().__init__(message or self.default_message)
+
+
+def _is_transient(exc) -> bool:
+    """
+    Network errors, rate limits and 5xx responses are worth retrying.
+    Card errors / invalid requests are not (and must not trip the breaker).
+    """
+    if isinstance(exc, (stripe.APIConnectionError, stripe.RateLimitError)):
+        return True
+    status_code = getattr(exc, "http_status", None)
+    return isinstance(exc, stripe.StripeError) and status_code is not None and status_code >= 500
+
+
+# ----------------------------
+# CIRCUIT BREAKER
+# ----------------------------
+class CircuitBreaker:
+    """
+    Per-process breaker:
+    - CLOSED: calls go through, consecutive transient failures are counted
+    - OPEN: calls fail immediately until reset_timeout has passed
+    - HALF_OPEN: one trial call is let through; success closes, failure re-opens
+    """
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            # HALF_OPEN: only one trial call at a time
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("Stripe circuit opened after %s failures", self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+# ----------------------------
+# LATENCY STATS
+# ----------------------------
+class LatencyStats:
+    """
+    Running count / total / max latency (ms) per Stripe operation.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def record(self, op: str, elapsed_ms: float, ok: bool):
+        with self._lock:
+            row = self._data.setdefault(op, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            row["count"] += 1
+            row["total_ms"] += elapsed_ms
+            row["max_ms"] = max(row["max_ms"], elapsed_ms)
+            if not ok:
+                row["errors"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                op: {**row, "avg_ms": round(row["total_ms"] / row["count"], 2) if row["count"] else 0.0}
+                for op, row in self._data.items()
+            }
+
+
+# ----------------------------
+# CLIENT
+# ----------------------------
+class StripeClient:
+    def __init__(self):
+        self._configured = False
+        self._config_lock = threading.Lock()
+        self.breaker = None
+        self.stats = LatencyStats()
+
+    def _configure(self):
+        if self._configured:
+            return
+        with self._config_lock:
+            if self._configured:
+                return
+
+            pool_size = int(getattr(settings, "STRIPE_POOL_MAXSIZE", 20))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+            timeout = (
+                float(getattr(settings, "STRIPE_CONNECT_TIMEOUT", 3.0)),
+                float(getattr(settings, "STRIPE_READ_TIMEOUT", 10.0)),
+            )
+            stripe.default_http_client = stripe.RequestsClient(timeout=timeout, session=session)
+            # Retries are handled here (with jitter + breaker), not inside the SDK
+            stripe.max_network_retries = 0
+
+            # e.g. the local stand-in from billing/fake_stripe.py
+            api_base = getattr(settings, "STRIPE_API_BASE", "")
+            if api_base:
+                stripe.api_base = api_base
+
+            self.breaker = CircuitBreaker(
+                failure_threshold=int(getattr(settings, "STRIPE_BREAKER_FAILURE_THRESHOLD", 5)),
+                reset_timeout=float(getattr(settings, "STRIPE_BREAKER_RESET_SECONDS", 30)),
+            )
+            self._configured = True
+
+    def reset(self):
+        """
+        Drop the pooled session, breaker and stats so settings are re-read
+        (used by the load-test harness when pointing at a fake Stripe).
+        """
+        with self._config_lock:
+            self._configured = False
+            self.breaker = None
+            self.stats = LatencyStats()
+            stripe.api_base = stripe.DEFAULT_API_BASE
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: sleep a random amount up to base * 2^attempt (capped)
+        base = float(getattr(settings, "STRIPE_RETRY_BASE_DELAY", 0.25))
+        cap = float(getattr(settings, "STRIPE_RETRY_MAX_DELAY", 2.0))
+        return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+    def _call(self, op: str, fn, *, idempotent: bool, **kwargs):
+        self._configure()
+        kwargs.setdefault("api_key", settings.STRIPE_SECRET_KEY)
+
+        max_retries = int(getattr(settings, "STRIPE_MAX_RETRIES", 2)) if idempotent else 0
+        attempt = 0
+
+        while True:
+            if not self.breaker.allow():
+                self.stats.record(op, 0.0, ok=False)
+                raise StripeUnavailable()
+
+            started = time.perf_counter()
+            try:
+                with timed("stripe"), span(f"stripe {op}", attempt=attempt + 1):
+                    result = fn(**kwargs)
+            except Exception as e:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.stats.record(op, elapsed_ms, ok=False)
+
+                if not _is_transient(e):
+                    # Stripe answered (e.g. invalid request) -> Stripe itself is healthy
+                    self.breaker.record_success()
+                    raise
+
+                self.breaker.record_failure()
+                logger.warning("Stripe %s failed in %.1fms (attempt %s): %s", op, elapsed_ms, attempt + 1, e)
+
+                if attempt >= max_retries:
+                    raise StripeUnavailable() from e
+
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stats.record(op, elapsed_ms, ok=True)
+            self.breaker.record_success()
+            logger.debug("Stripe %s ok in %.1fms", op, elapsed_ms)
+            return result
+
+    def create_checkout_session(self, idempotency_key: str | None = None, **params):
+        """
+        Create a Checkout Session. The idempotency key makes the POST safe to retry;
+        callers should derive it from the Payment so a retry never creates a second session.
+        """
+        params["idempotency_key"] = idempotency_key or f"checkout-{uuid.uuid4()}"
+        return self._call("checkout.session.create", stripe.checkout.Session.create, idempotent=True, **params)
+
+    def retrieve_checkout_session(self, session_id: str, **params):
+        return self._call(
+            "checkout.session.retrieve",
+            stripe.checkout.Session.retrieve,
+            idempotent=True,
+            id=session_id,
+            **params,
+        )
+
+
+stripe_client = StripeClient()
+
+
+def create_checkout_session(**params):
+    return stripe_client.create_checkout_session(**params)
+
+
+def retrieve_checkout_session(session_id: str, **params):
+    return stripe_client.retrieve_checkout_session(session_id, **params)
@@ -1,3 +1,785 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings, tag
+from django.utils import timezone
+import stripe
+from knox.models import AuthToken
+
+from accounts.models import Ward
+from core.loadtest import analyze_tables, run_concurrently, seq_scanned_tables
+from .coverage import coverage_on, expire_waste_coverages, extend_waste_coverage
+from .issuance import LOCAL_TAX_AMOUNT, get_or_create_annual_bill, issue_annual_bills, payable_annual_bill
+from .loadtest import run_checkout_benchmark
+from .manifests import cached_manifest_path, precompute_manifest, prune_manifests
+from .receipt_export import iter_receipts_zip
+from .receipt_regeneration import regenerate_batch, regeneration_queryset
+from .stripe_client import CircuitBreaker, StripeClient, StripeUnavailable, stripe_client
+from .models import (
+    Bill,
+    BillStatus,
+    CoverageStatus,
+    Payment,
+    PaymentStatus,
+    ServiceType,
+    WasteBlock,
+    WasteBlockProvider,
+    WasteCoverage,
+    WasteInterval,
+    WastePlan,
+    WasteServiceProvider,
+    WasteWardMeta,
+)
+from . import coverage_index
+from .waste_mapping import get_waste_mapping
 
 # Create your tests here.
+
+
+@tag("benchmark")
+class CheckoutLoadHarnessTests(TransactionTestCase):
+    """
+    Runs the checkout -> verify harness against the local fake Stripe (no network).
+    TransactionTestCase because the harness drives requests from several threads.
+    """
+
+    def test_local_tax_flow_completes_offline(self):
+        report = run_checkout_benchmark(service="local-tax", citizens=6, concurrency=3, stripe_latency_ms=0)
+
+        self.assertEqual(report["completed_flows"], 6)
+        self.assertEqual(report["endpoints"]["checkout"]["errors"], 0)
+        self.assertEqual(report["endpoints"]["verify"]["errors"], 0)
+        self.assertGreater(report["endpoints"]["verify"]["queries_per_request"], 0)
+        self.assertEqual(Payment.objects.filter(status=PaymentStatus.PAID).count(), 6)
+
+    def test_stripe_outage_fails_checkout_fast(self):
+        report = run_checkout_benchmark(
+            service="waste", citizens=4, concurrency=2, stripe_latency_ms=0, stripe_failure_rate=1.0
+        )
+
+        self.assertEqual(report["completed_flows"], 0)
+        self.assertEqual(report["endpoints"]["checkout"]["errors"], 4)
+        self.assertEqual(Payment.objects.filter(status=PaymentStatus.FAILED).count(), 4)
+
+
+class StubStripeHTTP(stripe.HTTPClient):
+    """
+    Stands in for the SDK's HTTP client: answers each request with the next
+    (status, body) pair, or raises it if it is an exception.
+    """
+    name = "stub"
+
+    def __init__(self, *responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.requests = []
+
+    def request(self, method, url, headers, post_data=None):
+        self.requests.append({"method": method, "url": url, "headers": dict(headers or {})})
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        status_code, body = response
+        return json.dumps(body), status_code, {}
+
+    def close(self):
+        pass
+
+
+def stub_stripe(test, client, *responses):
+    """
+    Configures `client` and swaps its HTTP client for a stub (restored afterwards).
+    """
+    previous = stripe.default_http_client
+    test.addCleanup(setattr, stripe, "default_http_client", previous)
+    test.addCleanup(client.reset)
+    client._configure()
+    stripe.default_http_client = StubStripeHTTP(*responses)
+    return stripe.default_http_client
+
+
+SESSION_OK = (200, {"id": "cs_test_1", "object": "checkout.session", "url": "https://checkout.test/cs_test_1"})
+SERVER_ERROR = (500, {"error": {"message": "stripe is down"}})
+CARD_DECLINED = (402, {"error": {"type": "card_error", "message": "declined"}})
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def test_opens_after_the_threshold_and_fails_fast(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        breaker._opened_at -= 31
+
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_trial_success_closes(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        breaker._opened_at -= 31
+        breaker.allow()
+
+        breaker.record_success()
+
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_trial_failure_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        for _ in range(3):
+            breaker.record_failure()
+        breaker._opened_at -= 31
+        breaker.allow()
+
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+
+@override_settings(
+    STRIPE_SECRET_KEY="sk_test_stub",
+    STRIPE_API_BASE="",
+    STRIPE_MAX_RETRIES=2,
+    STRIPE_RETRY_BASE_DELAY=0.25,
+    STRIPE_RETRY_MAX_DELAY=0.4,
+    STRIPE_BREAKER_FAILURE_THRESHOLD=5,
+    STRIPE_BREAKER_RESET_SECONDS=30,
+)
+class StripeClientCallTests(SimpleTestCase):
+
+    def setUp(self):
+        self.stripe = StripeClient()
+        sleep = mock.patch("billing.stripe_client.time.sleep")
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_transient_errors_are_retried_with_capped_jitter(self):
+        http = stub_stripe(self, self.stripe, SERVER_ERROR)
+
+        with mock.patch("billing.stripe_client.random.uniform", side_effect=lambda low, high: high) as uniform:
+            with self.assertRaises(StripeUnavailable):
+                self.stripe.create_checkout_session(idempotency_key="pay-1", mode="payment")
+
+        self.assertEqual(len(http.requests), 3)  # first try + STRIPE_MAX_RETRIES
+        self.assertEqual([c.args for c in uniform.call_args_list], [(0, 0.25), (0, 0.4)])
+        self.assertEqual([c.args for c in self.sleep.call_args_list], [(0.25,), (0.4,)])
+
+    def test_retries_reuse_the_idempotency_key(self):
+        http = stub_stripe(self, self.stripe, SERVER_ERROR, SERVER_ERROR, SESSION_OK)
+
+        session = self.stripe.create_checkout_session(idempotency_key="pay-42", mode="payment")
+
+        self.assertEqual(session.id, "cs_test_1")
+        self.assertEqual([r["headers"].get("Idempotency-Key") for r in http.requests], ["pay-42"] * 3)
+
+    def test_generated_idempotency_key_is_kept_across_retries(self):
+        http = stub_stripe(self, self.stripe, SERVER_ERROR, SESSION_OK)
+
+        self.stripe.create_checkout_session(mode="payment")
+
+        keys = {r["headers"].get("Idempotency-Key") for r in http.requests}
+        self.assertEqual(len(http.requests), 2)
+        self.assertEqual(len(keys), 1)
+        self.assertTrue(keys.pop().startswith("checkout-"))
+
+    def test_client_errors_are_not_retried_and_keep_the_breaker_closed(self):
+        http = stub_stripe(self, self.stripe, CARD_DECLINED)
+
+        with self.assertRaises(stripe.CardError):
+            self.stripe.create_checkout_session(idempotency_key="pay-2", mode="payment")
+
+        self.assertEqual(len(http.requests), 1)
+        self.assertEqual(self.stripe.breaker.state, CircuitBreaker.CLOSED)
+
+    @override_settings(STRIPE_MAX_RETRIES=0, STRIPE_BREAKER_FAILURE_THRESHOLD=2)
+    def test_open_breaker_fails_without_a_request_then_recovers(self):
+        http = stub_stripe(self, self.stripe, stripe.APIConnectionError("connection refused"))
+        for _ in range(2):
+            with self.assertRaises(StripeUnavailable):
+                self.stripe.retrieve_checkout_session("cs_test_1")
+        self.assertEqual(self.stripe.breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(StripeUnavailable):
+            self.stripe.retrieve_checkout_session("cs_test_1")
+        self.assertEqual(len(http.requests), 2)
+
+        http.responses = [SESSION_OK]
+        self.stripe.breaker._opened_at -= 31
+        self.assertEqual(self.stripe.retrieve_checkout_session("cs_test_1").id, "cs_test_1")
+        self.assertEqual(self.stripe.breaker.state, CircuitBreaker.CLOSED)
+
+
+@override_settings(STRIPE_SECRET_KEY="sk_test_stub", STRIPE_API_BASE="", STRIPE_MAX_RETRIES=0)
+class StripeUnavailableResponseTests(TestCase):
+
+    def test_verify_answers_503(self):
+        user = get_user_model().objects.create_user(email="payer@fcc.local", phone_number=None)
+        bill = Bill.objects.create(user=user, service_type=ServiceType.LOCAL_TAX, amount_due=LOCAL_TAX_AMOUNT)
+        Payment.objects.create(bill=bill, amount=LOCAL_TAX_AMOUNT, stripe_checkout_session_id="cs_test_1")
+        stub_stripe(self, stripe_client, stripe.APIConnectionError("connection refused"))
+        citizen = Client(HTTP_AUTHORIZATION=f"Token {AuthToken.objects.create(user)[1]}")
+
+        resp = citizen.get("/billing/local-tax/verify/", {"session_id": "cs_test_1"})
+
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp.json()["error"], StripeUnavailable.default_message)
+
+
+class AnnualBillGetOrCreateTests(TransactionTestCase):
+    """
+    Concurrent first checkouts for the same citizen/year must share one bill.
+    """
+
+    def test_concurrent_first_checkouts_create_one_bill(self):
+        user = get_user_model().objects.create_user(email="race@loadtest.local", phone_number=None)
+        bills = []
+
+        def first_checkout(_):
+            bills.append(get_or_create_annual_bill(user, ServiceType.LOCAL_TAX, 2026, LOCAL_TAX_AMOUNT))
+
+        errors = run_concurrently(first_checkout, range(8), concurrency=8)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Bill.objects.filter(user=user, service_type=ServiceType.LOCAL_TAX, period_year=2026).count(), 1)
+        self.assertEqual(len({b.id for b in bills}), 1)
+
+    def test_city_rate_requires_amount_for_first_bill(self):
+        user = get_user_model().objects.create_user(email="cityrate@loadtest.local", phone_number=None)
+
+        with self.assertRaises(ValueError):
+            get_or_create_annual_bill(user, ServiceType.CITY_RATE, 2026, None)
+
+        bill = get_or_create_annual_bill(user, ServiceType.CITY_RATE, 2026, Decimal("300.00"))
+        self.assertEqual(get_or_create_annual_bill(user, ServiceType.CITY_RATE, 2026, None).id, bill.id)
+
+
+class AnnualBillIssuanceTests(TestCase):
+    """
+    Issuance reports the bills it actually inserted; checkout pays arrears before this year.
+    """
+
+    def setUp(self):
+        User = get_user_model()
+        self.ward = Ward.objects.create(name="Issuance Ward")
+        self.citizens = [
+            User.objects.create_user(email=f"payer{i}@fcc.local", phone_number=None, ward=self.ward) for i in range(3)
+        ]
+        User.objects.create_user(email="moved-away@fcc.local", phone_number=None, ward=self.ward, is_active=False)
+        User.objects.create_user(email="clerk@fcc.local", phone_number=None, ward=self.ward, user_type="STAFF")
+
+    def issue(self, **kwargs):
+        progress = list(issue_annual_bills(ServiceType.LOCAL_TAX, 2026, LOCAL_TAX_AMOUNT, **kwargs))
+        return sum(p["created"] for p in progress), sum(p["skipped"] for p in progress)
+
+    def test_counts_come_from_inserted_rows(self):
+        get_or_create_annual_bill(self.citizens[1], ServiceType.LOCAL_TAX, 2026, LOCAL_TAX_AMOUNT)
+
+        self.assertEqual(self.issue(chunk_size=2), (2, 1))
+        self.assertEqual(self.issue(chunk_size=2), (0, 3))
+        self.assertEqual(Bill.objects.filter(service_type=ServiceType.LOCAL_TAX, period_year=2026).count(), 3)
+
+    def test_ward_admin_actions(self):
+        admin_user = get_user_model().objects.create_superuser(email="root@fcc.local", phone_number=None)
+        self.client.force_login(admin_user)
+        year = timezone.now().year
+
+        def run(action):
+            resp = self.client.post(
+                "/admin/accounts/ward/", {"action": action, "_selected_action": [self.ward.id]}, follow=True
+            )
+            return [str(m) for m in resp.context["messages"]]
+
+        self.assertIn(f"{year} LOCAL_TAX bills: 3 created, 0 already billed across 1 ward(s).", run("issue_local_tax_bills"))
+        self.assertIn(f"{year} LOCAL_TAX bills: 0 created, 3 already billed across 1 ward(s).", run("issue_local_tax_bills"))
+
+        with override_settings(CITY_RATE_ANNUAL_AMOUNT=None):
+            self.assertIn("Set CITY_RATE_ANNUAL_AMOUNT", run("issue_city_rate_bills")[0])
+        with override_settings(CITY_RATE_ANNUAL_AMOUNT=Decimal("300.00")):
+            self.assertIn(f"{year} CITY_RATE bills: 3 created, 0 already billed across 1 ward(s).", run("issue_city_rate_bills"))
+        self.assertEqual(Bill.objects.filter(service_type=ServiceType.CITY_RATE, amount_due=Decimal("300.00")).count(), 3)
+
+    def test_checkout_pays_the_oldest_open_bill_first(self):
+        citizen = self.citizens[0]
+        for year, bill_status in ((2024, BillStatus.PAID), (2025, BillStatus.PARTIAL), (2027, BillStatus.PENDING)):
+            Bill.objects.create(
+                user=citizen, service_type=ServiceType.CITY_RATE, period_year=year,
+                amount_due=Decimal("300.00"), status=bill_status,
+            )
+
+        arrears = payable_annual_bill(citizen, ServiceType.CITY_RATE, 2026, None)
+        self.assertEqual(arrears.period_year, 2025)
+
+        arrears.status = BillStatus.PAID
+        arrears.save()
+        current = payable_annual_bill(citizen, ServiceType.CITY_RATE, 2026, Decimal("300.00"))
+        self.assertEqual((current.period_year, current.status), (2026, BillStatus.PENDING))
+
+
+class WasteCoverageExtensionTests(TransactionTestCase):
+    """
+    Concurrent renewals append one after another instead of overlapping.
+    """
+
+    def test_concurrent_renewals_chain_without_overlap(self):
+        user = get_user_model().objects.create_user(email="renew@loadtest.local", phone_number=None)
+        plan = WastePlan.objects.create(name="Weekly", interval=WasteInterval.WEEK, price=Decimal("25.00"))
+        payments = [
+            Payment.objects.create(
+                bill=Bill.objects.create(user=user, service_type=ServiceType.WASTE_COLLECTION, amount_due=plan.price),
+                amount=plan.price,
+            )
+            for _ in range(5)
+        ]
+        today = date(2026, 1, 1)
+
+        errors = run_concurrently(
+            lambda payment: extend_waste_coverage(user=user, plan=plan, payment=payment, today=today),
+            payments,
+            concurrency=5,
+        )
+
+        self.assertEqual(errors, [])
+        periods = list(WasteCoverage.objects.filter(user=user).order_by("start_date").values_list("start_date", "end_date"))
+        self.assertEqual(len(periods), 5)
+        self.assertEqual(periods[0][0], today)
+        self.assertEqual(periods[-1][1], today + timedelta(days=35))
+        for (_, prev_end), (start, _) in zip(periods, periods[1:]):
+            self.assertEqual(start, prev_end)
+
+        self.assertIsNotNone(coverage_on(user, today + timedelta(days=20)))
+        self.assertIsNone(coverage_on(user, today + timedelta(days=35)))
+
+    def test_same_payment_is_not_extended_twice(self):
+        user = get_user_model().objects.create_user(email="replay@loadtest.local", phone_number=None)
+        plan = WastePlan.objects.create(name="Monthly", interval=WasteInterval.MONTH, price=Decimal("100.00"))
+        bill = Bill.objects.create(user=user, service_type=ServiceType.WASTE_COLLECTION, amount_due=plan.price)
+        payment = Payment.objects.create(bill=bill, amount=plan.price)
+
+        first = extend_waste_coverage(user=user, plan=plan, payment=payment)
+        second = extend_waste_coverage(user=user, plan=plan, payment=payment)
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(WasteCoverage.objects.filter(user=user).count(), 1)
+
+
+    def test_renewal_over_an_expired_period(self):
+        user = get_user_model().objects.create_user(email="cancelled@loadtest.local", phone_number=None)
+        plan = WastePlan.objects.create(name="Monthly", interval=WasteInterval.MONTH, price=Decimal("100.00"))
+        today = date(2026, 1, 10)
+        # expired early in the admin, period still reaching past today
+        WasteCoverage.objects.create(
+            user=user, plan=plan, start_date=date(2026, 1, 1), end_date=date(2026, 1, 31), status=CoverageStatus.EXPIRED,
+        )
+        bill = Bill.objects.create(user=user, service_type=ServiceType.WASTE_COLLECTION, amount_due=plan.price)
+        payment = Payment.objects.create(bill=bill, amount=plan.price)
+
+        renewed = extend_waste_coverage(user=user, plan=plan, payment=payment, today=today)
+
+        self.assertEqual((renewed.start_date, renewed.end_date), (today, today + timedelta(days=30)))
+        self.assertEqual(coverage_on(user, date(2026, 1, 20)), renewed)
+
+class WasteCoverageExpiryTests(TransactionTestCase):
+
+    def test_sweep_expires_lapsed_rows_in_chunks(self):
+        User = get_user_model()
+        renewed = User.objects.create_user(email="renewed@loadtest.local", phone_number=None)
+        lapsed = User.objects.create_user(email="lapsed@loadtest.local", phone_number=None)
+        today = date(2026, 3, 1)
+
+        WasteCoverage.objects.create(user=renewed, start_date=date(2026, 1, 30), end_date=today)
+        WasteCoverage.objects.create(user=renewed, start_date=today, end_date=date(2026, 3, 31))
+        WasteCoverage.objects.create(user=lapsed, start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+        WasteCoverage.objects.create(user=lapsed, start_date=date(2026, 1, 31), end_date=date(2026, 2, 27))
+
+        chunks = list(expire_waste_coverages(today=today, chunk_size=2))
+
+        self.assertEqual(sum(c["expired"] for c in chunks), 3)
+        self.assertEqual(WasteCoverage.objects.filter(status=CoverageStatus.ACTIVE).count(), 1)
+        lapsed_ids = [cid for c in chunks for cid in c["lapsed"]]
+        self.assertEqual(set(WasteCoverage.objects.filter(id__in=lapsed_ids).values_list("user_id", flat=True)), {lapsed.id})
+        self.assertEqual(list(expire_waste_coverages(today=today)), [])
+
+
+class WasteMappingCacheTests(TransactionTestCase):
+
+    def test_mapping_is_served_from_memory_and_reloaded_on_change(self):
+        ward = Ward.objects.create(name="Mapping Ward")
+        block = WasteBlock.objects.create(block_number=91, name="Mapping Block")
+        first = WasteServiceProvider.objects.create(name="First Provider")
+        WasteWardMeta.objects.create(ward=ward, block=block)
+        mapping = WasteBlockProvider.objects.create(block=block, provider=first)
+
+        self.assertEqual(get_waste_mapping().block_and_provider(ward.id), (block, first))
+        with self.assertNumQueries(0):
+            get_waste_mapping().block_and_provider(ward.id)
+
+        second = WasteServiceProvider.objects.create(name="Second Provider")
+        mapping.provider = second
+        mapping.save()
+
+        self.assertEqual(get_waste_mapping().block_and_provider(ward.id), (block, second))
+        self.assertEqual(get_waste_mapping().block_and_provider(None), (None, None))
+
+
+class ProviderCoverageLookupTests(TransactionTestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        coverage_index.reset()
+        today = timezone.now().date()
+
+        own_block = WasteBlock.objects.create(block_number=92, name="Own Block")
+        other_block = WasteBlock.objects.create(block_number=93, name="Other Block")
+
+        crew = User.objects.create_user(email="crew@provider.local", phone_number=None, user_type="STAFF")
+        provider = WasteServiceProvider.objects.create(name="Own Provider", user=crew)
+        WasteBlockProvider.objects.create(block=own_block, provider=provider)
+        WasteBlockProvider.objects.create(
+            block=other_block, provider=WasteServiceProvider.objects.create(name="Other Provider")
+        )
+
+        self.paid = User.objects.create_user(email="paid@loadtest.local", phone_number="+23276000001", nin="AB12CD34")
+        self.elsewhere = User.objects.create_user(email="elsewhere@loadtest.local", phone_number="+23276000002")
+        self.coverage = WasteCoverage.objects.create(
+            user=self.paid, block=own_block, start_date=today - timedelta(days=3), end_date=today + timedelta(days=27)
+        )
+        WasteCoverage.objects.create(
+            user=self.paid, block=own_block, start_date=today + timedelta(days=27), end_date=today + timedelta(days=57)
+        )
+        WasteCoverage.objects.create(
+            user=self.elsewhere, block=other_block, start_date=today, end_date=today + timedelta(days=7)
+        )
+        self.covered_until = today + timedelta(days=57)
+
+        self.client = Client(HTTP_AUTHORIZATION=f"Token {AuthToken.objects.create(crew)[1]}")
+
+    def test_lookup_by_phone_nin_and_coverage_id(self):
+        for params in ({"phone": "076000001"}, {"nin": "ab12cd34"}, {"coverage_id": self.coverage.id}):
+            body = self.client.get("/billing/providers/coverage/lookup/", params).json()
+            self.assertTrue(body["covered"], params)
+            self.assertEqual(body["covered_until"], self.covered_until.isoformat())
+
+    def test_households_outside_provider_blocks_are_not_covered(self):
+        body = self.client.get("/billing/providers/coverage/lookup/", {"phone": "+23276000002"}).json()
+        self.assertFalse(body["covered"])
+
+    def test_batch_lookup_counts_covered_households(self):
+        payload = {"type": "phone", "values": ["+23276000001", "+23276000002", "not-a-number"]}
+        resp = self.client.post("/billing/providers/coverage/batch/", payload, content_type="application/json")
+        self.assertEqual(resp.json()["covered"], 1)
+        self.assertEqual(resp.json()["count"], 3)
+
+    def test_manifest_csv_lists_covered_households_in_block(self):
+        resp = self.client.get("/billing/providers/manifests/", {"output": "csv"})
+        body = b"".join(resp.streaming_content).decode()
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("+23276000001", body)
+        self.assertNotIn("+23276000002", body)
+        self.assertEqual(len(body.strip().splitlines()), 2)
+
+    def test_precomputed_manifest_is_dropped_when_coverage_changes(self):
+        today = timezone.now().date()
+        block_id = self.coverage.block_id
+        with tempfile.TemporaryDirectory() as manifest_root, override_settings(MANIFEST_ROOT=manifest_root):
+            first = precompute_manifest(block_id, today, "pdf")
+            self.assertEqual(cached_manifest_path(block_id, today, "pdf"), first)
+
+            self.coverage.save()
+            self.assertIsNone(cached_manifest_path(block_id, today, "pdf"))
+
+            # the new version replaces the old file; past days are pruned
+            second = precompute_manifest(block_id, today, "pdf")
+            self.assertEqual(os.listdir(os.path.join(manifest_root, today.isoformat())), [os.path.basename(second)])
+            precompute_manifest(block_id, today - timedelta(days=1), "csv")
+            self.assertEqual(prune_manifests(before=today), 1)
+            self.assertEqual(os.listdir(manifest_root), [today.isoformat()])
+
+            resp = self.client.get("/billing/providers/manifests/", {"output": "pdf"})
+            self.assertEqual(b"".join(resp.streaming_content)[:5], b"%PDF-")
+
+    def test_precomputed_manifest_is_dropped_when_citizen_details_change(self):
+        today = timezone.now().date()
+        block_id = self.coverage.block_id
+        with tempfile.TemporaryDirectory() as manifest_root, override_settings(MANIFEST_ROOT=manifest_root):
+            path = precompute_manifest(block_id, today, "csv")
+            self.paid.last_login = timezone.now()
+            self.paid.save(update_fields=["last_login"])
+            self.assertEqual(cached_manifest_path(block_id, today, "csv"), path)
+
+            self.paid.phone_number = "+23276000009"
+            self.paid.save()
+            self.assertIsNone(cached_manifest_path(block_id, today, "csv"))
+
+            precompute_manifest(block_id, today, "csv")
+            profile = self.paid.citizenprofile
+            profile.address = "12 New Road"
+            profile.save()
+            self.assertIsNone(cached_manifest_path(block_id, today, "csv"))
+
+    def test_citizens_cannot_use_lookup(self):
+        citizen = Client(HTTP_AUTHORIZATION=f"Token {AuthToken.objects.create(self.paid)[1]}")
+        self.assertEqual(citizen.get("/billing/providers/coverage/lookup/", {"phone": "076000001"}).status_code, 403)
+
+
+class ReceiptRegenerationTests(TransactionTestCase):
+    """
+    Bulk regeneration repoints payments to fresh receipts; the audit ZIP export falls back to rendering.
+    """
+
+    def test_batch_replaces_stale_receipt_and_creates_missing(self):
+        user = get_user_model().objects.create_user(email="regen@loadtest.local", phone_number=None)
+        plan = WastePlan.objects.create(name="Monthly", interval=WasteInterval.MONTH, price=Decimal("100.00"))
+        paid_at = timezone.now()
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            tax = Payment.objects.create(
+                bill=Bill.objects.create(user=user, service_type=ServiceType.LOCAL_TAX, amount_due=LOCAL_TAX_AMOUNT),
+                amount=LOCAL_TAX_AMOUNT,
+                status=PaymentStatus.PAID,
+                paid_at=paid_at,
+            )
+            tax.receipt_pdf.save("local_tax_receipt_old.pdf", ContentFile(b"stale"), save=True)
+            stale_name = tax.receipt_pdf.name
+
+            waste = Payment.objects.create(
+                bill=Bill.objects.create(user=user, service_type=ServiceType.WASTE_COLLECTION, amount_due=plan.price),
+                amount=plan.price,
+                status=PaymentStatus.PAID,
+                paid_at=paid_at,
+            )
+            extend_waste_coverage(user=user, plan=plan, payment=waste)
+
+            result = regenerate_batch([tax.id, waste.id])
+
+            self.assertEqual(result["regenerated"], 2)
+            self.assertEqual(result["errors"], [])
+            tax.refresh_from_db()
+            waste.refresh_from_db()
+            # content-addressed storage: new bytes, new name; the old blob is left for other rows
+            self.assertNotEqual(tax.receipt_pdf.name, stale_name)
+            with default_storage.open(tax.receipt_pdf.name) as fh:
+                self.assertTrue(fh.read().startswith(b"%PDF"))
+            self.assertTrue(waste.receipt_pdf.name.startswith("receipts/"))
+            self.assertTrue(default_storage.exists(waste.receipt_pdf.name))
+
+    def test_zip_export_streams_stored_and_renders_missing(self):
+        ward = Ward.objects.create(name="Audit Ward")
+        user = get_user_model().objects.create_user(email="audit@loadtest.local", phone_number=None, ward=ward)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            payments = [
+                Payment.objects.create(
+                    bill=Bill.objects.create(user=user, service_type=ServiceType.LOCAL_TAX, amount_due=LOCAL_TAX_AMOUNT),
+                    amount=LOCAL_TAX_AMOUNT,
+                    status=PaymentStatus.PAID,
+                    paid_at=timezone.now(),
+                )
+                for _ in range(2)
+            ]
+            payments[0].receipt_pdf.save("stored.pdf", ContentFile(b"%PDF-stored"), save=True)
+            payments[1].receipt_pdf.name = "receipts/deleted.pdf"
+            payments[1].save(update_fields=["receipt_pdf"])
+
+            body = b"".join(iter_receipts_zip(regeneration_queryset(ward_ids=[ward.id])))
+
+        archive = zipfile.ZipFile(io.BytesIO(body))
+        manifest = list(csv.DictReader(io.StringIO(archive.read("manifest.csv").decode())))
+
+        self.assertEqual([row["source"] for row in manifest], ["stored", "rendered"])
+        self.assertEqual(archive.read(manifest[0]["file"]), b"%PDF-stored")
+        self.assertTrue(archive.read(manifest[1]["file"]).startswith(b"%PDF"))
+
+
+class AdminSpreadsheetExportTests(TestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        admin = User.objects.create_user(email="finance@fcc.local", phone_number=None, user_type="ADMIN")
+        session = self.client.session
+        session["staff_user_id"] = admin.id
+        session["staff_token_key"] = AuthToken.objects.create(admin)[0].token_key
+        session["user_type"] = "ADMIN"
+        session.save()
+
+        citizen = User.objects.create_user(email="payer@loadtest.local", phone_number=None, first_name="=HYPERLINK")
+        for service in (ServiceType.LOCAL_TAX, ServiceType.CITY_RATE):
+            Payment.objects.create(
+                bill=Bill.objects.create(user=citizen, service_type=service, amount_due=Decimal("300.00")),
+                amount=Decimal("300.00"),
+            )
+
+    def test_payments_csv_applies_list_filters(self):
+        resp = self.client.get("/billing/admin/payments/export/", {"service_type": "CITY_RATE"})
+        lines = b"".join(resp.streaming_content).decode("utf-8-sig").splitlines()
+
+        self.assertEqual(resp["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(len(lines), 2)
+        self.assertIn("CITY_RATE", lines[1])
+        self.assertIn("'=HYPERLINK", lines[1])
+
+    def test_receipt_zip_matches_the_list_filters(self):
+        User = get_user_model()
+        target = User.objects.create_user(email="receipts-wanted@loadtest.local", phone_number=None)
+        other = User.objects.create_user(email="someone-else@loadtest.local", phone_number=None)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            expected = []
+            for user, payment_status in ((target, PaymentStatus.PAID), (target, PaymentStatus.FAILED), (other, PaymentStatus.PAID)):
+                payment = Payment.objects.create(
+                    bill=Bill.objects.create(user=user, service_type=ServiceType.LOCAL_TAX, amount_due=LOCAL_TAX_AMOUNT),
+                    amount=LOCAL_TAX_AMOUNT,
+                    status=payment_status,
+                    paid_at=timezone.now() if payment_status == PaymentStatus.PAID else None,
+                )
+                payment.receipt_pdf.save(f"r{payment.id}.pdf", ContentFile(b"%PDF-" + str(payment.id).encode()), save=True)
+                if user == target and payment_status == PaymentStatus.PAID:
+                    expected.append(str(payment.id))
+
+            listed = self.client.get("/billing/admin/payments/", {"q": "receipts-wanted"})
+            resp = self.client.get("/billing/admin/payments/receipts.zip", {"q": "receipts-wanted"})
+            body = b"".join(resp.streaming_content)
+
+        manifest = list(csv.DictReader(io.StringIO(zipfile.ZipFile(io.BytesIO(body)).read("manifest.csv").decode())))
+        self.assertEqual([row["payment_id"] for row in manifest], expected)
+        self.assertEqual(len(listed.context["payments"]), 2)  # the list also shows the failed attempt
+
+    def test_non_numeric_ward_is_ignored(self):
+        listed = self.client.get("/billing/admin/payments/", {"ward": "abc"})
+        self.assertEqual(listed.status_code, 200)
+        self.assertEqual(len(listed.context["payments"]), 2)
+
+        # a ward alone is not enough to export, and "abc" is no ward
+        resp = self.client.get("/billing/admin/payments/receipts.zip", {"ward": "abc"})
+        self.assertRedirects(resp, "/billing/admin/payments/", fetch_redirect_response=False)
+
+        resp = self.client.get("/billing/admin/payments/receipts.zip", {"ward": "abc", "q": "payer"})
+        body = b"".join(resp.streaming_content)
+        self.assertEqual(resp["Content-Disposition"], 'attachment; filename="receipts.zip"')
+        self.assertIn("manifest.csv", zipfile.ZipFile(io.BytesIO(body)).namelist())
+
+    def test_bills_xlsx_is_a_workbook(self):
+        resp = self.client.get("/billing/admin/bills/export/", {"output": "xlsx"})
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(resp.streaming_content)))
+
+        sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+        self.assertEqual(sheet.count("<row>"), 3)
+        self.assertIn("<v>300.00</v>", sheet)
+
+
+class HotPathIndexTests(TestCase):
+    """
+    EXPLAIN the per-request billing queries against realistic volumes: none may fall
+    back to a sequential scan of the big tables (a dropped or unusable index shows up here).
+    """
+    CITIZENS = 3000
+    HOT_TABLES = {Bill._meta.db_table, Payment._meta.db_table, WasteCoverage._meta.db_table}
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        now = timezone.now()
+        today = now.date()
+
+        users = User.objects.bulk_create(
+            User(email=f"citizen{i}@volume.local", password="!", first_name="Citizen", last_name=str(i))
+            for i in range(cls.CITIZENS)
+        )
+
+        bills, payments, coverages = [], [], []
+        for i, user in enumerate(users):
+            created = now - timedelta(days=i % 700)
+            bills.append(Bill(
+                user=user, service_type=ServiceType.LOCAL_TAX, period_year=2025, amount_due=LOCAL_TAX_AMOUNT,
+                amount_paid=LOCAL_TAX_AMOUNT, status="PAID", created_at=created,
+            ))
+            bills.append(Bill(
+                user=user, service_type=ServiceType.CITY_RATE, period_year=2026, amount_due=Decimal("300.00"),
+                status="PENDING", created_at=created,
+            ))
+            bills.append(Bill(
+                user=user, service_type=ServiceType.WASTE_COLLECTION, amount_due=Decimal("100.00"),
+                amount_paid=Decimal("100.00"), status="PAID", created_at=created,
+            ))
+        Bill.objects.bulk_create(bills)
+
+        for i, bill in enumerate(bills):
+            paid = bill.status == "PAID"
+            payments.append(Payment(
+                bill=bill,
+                amount=bill.amount_due,
+                status=PaymentStatus.PAID if paid else PaymentStatus.INITIATED,
+                paid_at=bill.created_at if paid else None,
+                stripe_checkout_session_id=f"cs_volume_{i}",
+                created_at=bill.created_at,
+            ))
+        Payment.objects.bulk_create(payments)
+
+        for i, user in enumerate(users):
+            start = today - timedelta(days=i % 60)
+            coverages.append(WasteCoverage(
+                user=user, start_date=start, end_date=start + timedelta(days=30 if i % 10 else 90),
+            ))
+        WasteCoverage.objects.bulk_create(coverages)
+
+        analyze_tables(get_user_model(), Bill, Payment, WasteCoverage)
+        cls.user = users[len(users) // 2]
+
+    def assertIndexed(self, queryset):
+        scanned = seq_scanned_tables(queryset) & self.HOT_TABLES
+        self.assertEqual(scanned, set(), f"sequential scan on {scanned}:\n{queryset.query}")
+
+    def test_checkout_verify_lookup(self):
+        self.assertIndexed(Payment.objects.select_related("bill").filter(
+            stripe_checkout_session_id="cs_volume_4500", bill__user=self.user, bill__service_type=ServiceType.LOCAL_TAX,
+        ))
+
+    def test_annual_bill_probe(self):
+        self.assertIndexed(Bill.objects.filter(user=self.user, service_type=ServiceType.LOCAL_TAX, period_year=2025))
+
+    def test_citizen_bills_and_pending_total(self):
+        self.assertIndexed(Bill.objects.filter(user=self.user).order_by("-created_at"))
+        self.assertIndexed(Bill.objects.filter(user=self.user, status__in=["PENDING", "PARTIAL"]))
+
+    def test_dashboard_stats_payments(self):
+        ytd = timezone.now().replace(month=1, day=1)
+        self.assertIndexed(Payment.objects.filter(bill__user=self.user, status=PaymentStatus.PAID, paid_at__gte=ytd))
+        self.assertIndexed(
+            Payment.objects.filter(bill__user=self.user, status=PaymentStatus.PAID).order_by("-paid_at")[:1]
+        )
+        self.assertIndexed(Payment.objects.filter(status=PaymentStatus.PAID).order_by("-paid_at")[:20])
+
+    def test_admin_lists_newest_first(self):
+        self.assertIndexed(Payment.objects.select_related("bill", "bill__user").order_by("-created_at")[:15])
+        self.assertIndexed(Bill.objects.select_related("user").order_by("-created_at")[:15])
+
+    def test_waste_coverage_current_and_expiry_sweep(self):
+        today = timezone.now().date()
+        self.assertIndexed(WasteCoverage.objects.filter(user=self.user, status=CoverageStatus.ACTIVE, end_date__gt=today))
+        self.assertIndexed(
+            WasteCoverage.objects.filter(status=CoverageStatus.ACTIVE, end_date__lte=today - timedelta(days=20))
+            .order_by("end_date")[:500]
+        )
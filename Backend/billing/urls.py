@@ -5,6 +5,8 @@ from .views import (
     CityRateViewSet, 
     WasteCollectionViewSet,
     BusinessLicensePaymentViewSet,
+    ProviderCoverageViewSet,
+    ProviderManifestViewSet,
     # STAFF
     StaffPaymentListView, StaffPaymentDetailView,
     StaffBillListView, StaffBillDetailView,
@@ -14,8 +16,8 @@ from .views import (
     StaffBusinessNoticeDetailView,
     StaffBusinessNoticeUpdateView,
     # ADMIN
-    AdminPaymentListView, AdminPaymentDetailView,
-    AdminBillListView, AdminBillDetailView, 
+    AdminPaymentListView, AdminPaymentDetailView, AdminReceiptExportView, AdminPaymentExportView,
+    AdminBillListView, AdminBillDetailView, AdminBillExportView,
     AdminBusinessNoticeListView, 
     AdminBusinessNoticeDetailView, 
     AdminBusinessNoticeUpdateView,
@@ -33,6 +35,9 @@ router.register("business-license/payment", BusinessLicensePaymentViewSet, basen
 router.register("citizens/businesses", CitizenBusinessViewSet, basename="citizen-businesses")
 router.register("citizens/business-license/notices", CitizenBusinessLicenseNoticeViewSet, basename="citizen-business-license-notices")
 router.register("payments", PaymentDataViewSet, basename="payment-data")
+# Waste service providers (field crews)
+router.register("providers/coverage", ProviderCoverageViewSet, basename="provider-coverage")
+router.register("providers/manifests", ProviderManifestViewSet, basename="provider-manifests")
 
 
 
@@ -55,9 +60,12 @@ urlpatterns = router.urls + [
     # =========================
     path("admin/payments/", AdminPaymentListView.as_view(), name="admin_payment_list"),
     path("admin/payments/<int:pk>/", AdminPaymentDetailView.as_view(), name="admin_payment_detail"),
+    path("admin/payments/receipts.zip", AdminReceiptExportView.as_view(), name="admin_receipt_export"),
+    path("admin/payments/export/", AdminPaymentExportView.as_view(), name="admin_payment_export"),
 
     path("admin/bills/", AdminBillListView.as_view(), name="admin_bill_list"),
     path("admin/bills/<int:pk>/", AdminBillDetailView.as_view(), name="admin_bill_detail"),
+    path("admin/bills/export/", AdminBillExportView.as_view(), name="admin_bill_export"),
     # ADMIN — Business License Notices
     path("admin/business-license/notices/", AdminBusinessNoticeListView.as_view(), name="admin_business_notice_list"),
     path("admin/business-license/notices/<int:pk>/", AdminBusinessNoticeDetailView.as_view(), name="admin_business_notice_detail"),
@@ -1,11 +1,11 @@
-import stripe
+import tempfile
 from decimal import Decimal, ROUND_HALF_UP
 
 from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
-from datetime import timedelta
 from django.contrib import messages
+from django.http import FileResponse, StreamingHttpResponse
 
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
@@ -17,13 +17,8 @@ from .models import (
     ServiceType, 
     BillStatus, 
     PaymentStatus,
-    WastePlan, 
-    WasteCoverage, 
     WasteServiceProvider,
     WasteInterval,
-    CoverageStatus,
-    WasteWardMeta,
-    WasteBlockProvider,
     WasteBlock,
     BusinessLicenseDemandNotice, 
     DemandNoticeStatus,
@@ -34,13 +29,15 @@ from .serializers import (
     LocalTaxCheckoutResponseSerializer,
     VerifySessionSerializer,
     PaymentSerializer,
-    WastePlanSerializer,
     WasteCheckoutSerializer,
     WasteCoverageSerializer,
     BusinessLicenseCheckoutSerializer,
     BusinessLicenseCheckoutResponseSerializer,
     BusinessLicenseDemandNoticeSerializer,
     BusinessSerializer,
+    ProviderCoverageLookupSerializer,
+    ProviderCoverageBatchSerializer,
+    ProviderManifestSerializer,
 )
 from .notifications import(
     notify_admin_payment_success,
@@ -54,26 +51,32 @@ from .reciepts import (
     build_business_license_receipt_pdf,
 )
 from .forms import StaffBusinessNoticeVerifyForm
+from .stripe_client import create_checkout_session, retrieve_checkout_session, StripeUnavailable
+from .coverage import extend_waste_coverage
+from .waste_mapping import get_waste_mapping
+from .coverage_index import get_coverage_index
+from .permissions import IsWasteProvider
+from core import reference
+from core.tracing import set_span_ids
+from core.reference import reference_response
+from core.exports import export_response
+from .manifests import SPOOL_MAX_BYTES, cached_manifest_path, iter_csv, manifest_rows, manifest_storage, render_manifest
+from .issuance import LOCAL_TAX_AMOUNT, payable_annual_bill
+from .receipt_export import iter_receipts_zip
 from django.db.models import Sum, Value, DecimalField
 from django.db.models.functions import Coalesce
 from .serializers import PaymentListSerializer, PaymentDetailSerializer, BillSerializer, CityRateCheckoutSerializer
 from django.shortcuts import redirect
-from django.views.generic import ListView, DetailView, UpdateView
+from django.views.generic import ListView, DetailView, UpdateView, View
 from django.db.models import Q
 from django.utils.dateparse import parse_date
-from accounts.mixins import KnoxSessionRequiredMixin, RoleRequiredMixin
+from accounts.mixins import KnoxSessionRequiredMixin, RoleRequiredMixin, SessionStaffUserMixin
 from django.contrib.auth import get_user_model
 
 
 User = get_user_model()
 
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
-
-LOCAL_TAX_AMOUNT = Decimal("10.00")  # Le 10.00 (your requirement)
-
-
 class LocalTaxViewSet(viewsets.ViewSet):
     """
     Local Tax payment flow (Option C):
@@ -83,26 +86,8 @@ class LocalTaxViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def _get_or_create_local_tax_bill(self, user) -> Bill:
-        bill = Bill.objects.filter(
-            user=user,
-            service_type=ServiceType.LOCAL_TAX,
-            status__in=[BillStatus.PENDING, BillStatus.PARTIAL],
-        ).order_by("-created_at").first()
-
-        if bill:
-            return bill
-
-        return Bill.objects.create(
-            user=user,
-            service_type=ServiceType.LOCAL_TAX,
-            amount_due=LOCAL_TAX_AMOUNT,       # stored in SLE
-            amount_paid=Decimal("0.00"),
-            status=BillStatus.PENDING,
-            allow_installments=False,
-            max_installments=1,
-            installment_count=0,
-            due_date=None,
-        )
+        # Oldest unpaid year first, else this year's bill (normally issued by `manage.py issue_annual_bills`)
+        return payable_annual_bill(user, ServiceType.LOCAL_TAX, timezone.now().year, LOCAL_TAX_AMOUNT)
 
     def _sll_to_usd_cents(self, amount_sll: Decimal) -> int:
         """
@@ -143,9 +128,11 @@ class LocalTaxViewSet(viewsets.ViewSet):
             amount=bill.amount_due,  # store SLE amount
             status=PaymentStatus.INITIATED,
         )
+        set_span_ids(payment=payment, bill=bill)
 
         try:
-            session = stripe.checkout.Session.create(
+            session = create_checkout_session(
+                idempotency_key=f"checkout-payment-{payment.id}",
                 mode="payment",
                 payment_method_types=["card"],
                 line_items=[
@@ -180,6 +167,11 @@ class LocalTaxViewSet(viewsets.ViewSet):
                 status=200,
             )
 
+        except StripeUnavailable as e:
+            payment.status = PaymentStatus.FAILED
+            payment.save(update_fields=["status"])
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         except Exception as e:
             payment.status = PaymentStatus.FAILED
             payment.save(update_fields=["status"])
@@ -202,11 +194,13 @@ class LocalTaxViewSet(viewsets.ViewSet):
         if not payment:
             return Response({"error": "Payment session not found."}, status=404)
 
+        set_span_ids(payment=payment, bill=payment.bill)
+
         if payment.status == PaymentStatus.PAID:
             return Response(PaymentSerializer(payment).data, status=200)
 
         try:
-            session = stripe.checkout.Session.retrieve(session_id, expand=["payment_intent"])
+            session = retrieve_checkout_session(session_id, expand=["payment_intent"])
 
             if session.payment_status != "paid":
                 return Response({"status": "NOT_PAID", "payment_status": session.payment_status}, status=200)
@@ -246,6 +240,9 @@ class LocalTaxViewSet(viewsets.ViewSet):
 
             return Response(PaymentSerializer(payment).data, status=200)
 
+        except StripeUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         except Exception as e:
             return Response({"error": str(e)}, status=400)
 
@@ -358,10 +355,6 @@ class CityRateViewSet(viewsets.ViewSet):
     # Helpers
     # ---------------------------------------------------
 
-    def _due_date_sept_30(self):
-        today = timezone.now().date()
-        return today.replace(month=9, day=30)
-
     def _sll_to_usd_cents(self, amount_sll: Decimal) -> int:
         """
         Convert NEW LEONES (SLE) -> USD cents for Stripe.
@@ -373,29 +366,9 @@ class CityRateViewSet(viewsets.ViewSet):
         return max(cents, 50)
 
     def _get_or_create_city_rate_bill(self, user, amount_due: Decimal | None) -> Bill:
-        bill = Bill.objects.filter(
-            user=user,
-            service_type=ServiceType.CITY_RATE,
-            status__in=[BillStatus.PENDING, BillStatus.PARTIAL],
-        ).order_by("-created_at").first()
-
-        if bill:
-            return bill
-
-        if amount_due is None:
-            raise ValueError("amount_due is required for first City Rate payment.")
-
-        return Bill.objects.create(
-            user=user,
-            service_type=ServiceType.CITY_RATE,
-            amount_due=amount_due,  # stored in SLE
-            amount_paid=Decimal("0.00"),
-            status=BillStatus.PENDING,
-            allow_installments=True,
-            max_installments=3,
-            installment_count=0,
-            due_date=self._due_date_sept_30(),
-        )
+        # Oldest unpaid year first, else this year's bill (normally issued by `manage.py issue_annual_bills`).
+        # amount_due (SLE) is only needed when no bill exists yet.
+        return payable_annual_bill(user, ServiceType.CITY_RATE, timezone.now().year, amount_due)
 
     # ---------------------------------------------------
     # Checkout
@@ -448,9 +421,11 @@ class CityRateViewSet(viewsets.ViewSet):
             amount=pay_amount,  # stored in SLE
             status=PaymentStatus.INITIATED,
         )
+        set_span_ids(payment=payment, bill=bill)
 
         try:
-            session = stripe.checkout.Session.create(
+            session = create_checkout_session(
+                idempotency_key=f"checkout-payment-{payment.id}",
                 mode="payment",
                 payment_method_types=["card"],
                 line_items=[{
@@ -483,6 +458,11 @@ class CityRateViewSet(viewsets.ViewSet):
                 status=200,
             )
 
+        except StripeUnavailable as e:
+            payment.status = PaymentStatus.FAILED
+            payment.save(update_fields=["status"])
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         except Exception as e:
             payment.status = PaymentStatus.FAILED
             payment.save(update_fields=["status"])
@@ -509,11 +489,13 @@ class CityRateViewSet(viewsets.ViewSet):
         if not payment:
             return Response({"error": "Payment session not found."}, status=404)
 
+        set_span_ids(payment=payment, bill=payment.bill)
+
         if payment.status == PaymentStatus.PAID:
             return Response(PaymentSerializer(payment).data, status=200)
 
         try:
-            session = stripe.checkout.Session.retrieve(session_id, expand=["payment_intent"])
+            session = retrieve_checkout_session(session_id, expand=["payment_intent"])
 
             if session.payment_status != "paid":
                 return Response(
@@ -561,6 +543,9 @@ class CityRateViewSet(viewsets.ViewSet):
 
             return Response(PaymentSerializer(payment).data, status=200)
 
+        except StripeUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         except Exception as e:
             return Response({"error": str(e)}, status=400)
         
@@ -569,21 +554,12 @@ class WasteCollectionViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["get"], url_path="plans")
     def plans(self, request):
-        qs = WastePlan.objects.filter(is_active=True).order_by("price")
-        return Response(WastePlanSerializer(qs, many=True).data, status=200)
+        # cached list with ETag / Cache-Control (core/reference.py)
+        return reference_response(request, "waste_plans")
 
     def _get_block_and_provider(self, user):
-        ward = getattr(user, "ward", None)
-        if not ward:
-            return None, None
-
-        meta = WasteWardMeta.objects.select_related("block").filter(ward=ward).first()
-        if not meta or not meta.block:
-            return None, None
-
-        mapping = WasteBlockProvider.objects.select_related("provider").filter(block=meta.block).first()
-        provider = mapping.provider if mapping else None
-        return meta.block, provider
+        # ward -> block -> provider from the per-process snapshot (no queries)
+        return get_waste_mapping().block_and_provider(user.ward_id)
 
     def _get_or_create_bill(self, user, amount_due: Decimal) -> Bill:
         # single-payment bill for waste
@@ -599,18 +575,15 @@ class WasteCollectionViewSet(viewsets.ViewSet):
             due_date=None,
         )
 
-    def _calculate_period(self, plan: WastePlan, base_date):
-        if plan.interval == "WEEK":
-            return base_date, base_date + timedelta(days=7)
-        return base_date, base_date + timedelta(days=30)
-
     @action(detail=False, methods=["post"], url_path="checkout")
     def checkout(self, request):
         serializer = WasteCheckoutSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         user = request.user
-        plan = WastePlan.objects.get(id=serializer.validated_data["plan_id"], is_active=True)
+        plan = get_waste_mapping().active_plan(serializer.validated_data["plan_id"])
+        if not plan:
+            return Response({"error": "Waste plan not found."}, status=404)
 
         block, provider = self._get_block_and_provider(user)
         if not block or not provider:
@@ -640,9 +613,11 @@ class WasteCollectionViewSet(viewsets.ViewSet):
             amount=plan.price,  # stored in SLE
             status=PaymentStatus.INITIATED,
         )
+        set_span_ids(payment=payment, bill=bill)
 
         try:
-            session = stripe.checkout.Session.create(
+            session = create_checkout_session(
+                idempotency_key=f"checkout-payment-{payment.id}",
                 mode="payment",
                 payment_method_types=["card"],
                 line_items=[{
@@ -673,6 +648,11 @@ class WasteCollectionViewSet(viewsets.ViewSet):
                 LocalTaxCheckoutResponseSerializer({"checkout_url": session.url, "session_id": session.id}).data,
                 status=200
             )
+        except StripeUnavailable as e:
+            payment.status = PaymentStatus.FAILED
+            payment.save(update_fields=["status"])
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         except Exception as e:
             payment.status = PaymentStatus.FAILED
             payment.save(update_fields=["status"])
@@ -695,18 +675,22 @@ class WasteCollectionViewSet(viewsets.ViewSet):
         if not payment:
             return Response({"error": "Payment session not found."}, status=404)
 
+        set_span_ids(payment=payment, bill=payment.bill)
+
         if payment.status == PaymentStatus.PAID:
             return Response(PaymentSerializer(payment).data, status=200)
 
         try:
-            session = stripe.checkout.Session.retrieve(session_id, expand=["payment_intent"])
+            session = retrieve_checkout_session(session_id, expand=["payment_intent"])
             if session.payment_status != "paid":
                 return Response({"status": "NOT_PAID", "payment_status": session.payment_status}, status=200)
 
             payment_intent_id = session.payment_intent.id if session.payment_intent else None
-            plan_id = int(session.metadata.get("plan_id"))
+            plan_id = int(session.metadata["plan_id"])
 
-            plan = WastePlan.objects.get(id=plan_id)
+            plan = get_waste_mapping().plans.get(plan_id)
+            if not plan:
+                return Response({"error": "Waste plan not found."}, status=404)
 
             # Trust current mapping (ward->block->provider)
             block, provider = self._get_block_and_provider(user)
@@ -722,27 +706,9 @@ class WasteCollectionViewSet(viewsets.ViewSet):
                 bill.status = BillStatus.PAID
                 bill.save(update_fields=["amount_paid", "status"])
 
-                today = timezone.now().date()
-
-                active_cov = WasteCoverage.objects.filter(
-                    user=user,
-                    status=CoverageStatus.ACTIVE,
-                    end_date__gte=today
-                ).order_by("-end_date").first()
-
-                base_start = active_cov.end_date if active_cov else today
-                start_date, end_date = self._calculate_period(plan, base_start)
-
-                coverage = WasteCoverage.objects.create(
-                    user=user,
-                    ward=getattr(user, "ward", None),
-                    block=block,
-                    provider=provider,
-                    plan=plan,
-                    start_date=start_date,
-                    end_date=end_date,
-                    status=CoverageStatus.ACTIVE,
-                    last_payment=payment,
+                # Appends after the current active period (serialized per user)
+                coverage = extend_waste_coverage(
+                    user=user, plan=plan, payment=payment, block=block, provider=provider
                 )
 
                 receipt_file = build_waste_collection_receipt_pdf(
@@ -773,9 +739,90 @@ class WasteCollectionViewSet(viewsets.ViewSet):
                 },
                 status=200
             )
+        except StripeUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         except Exception as e:
             return Response({"error": str(e)}, status=400)
 
+class ProviderCoverageViewSet(viewsets.ViewSet):
+    """
+    Waste service providers: "is this household paid up?" for the provider's own blocks.
+    Answered from the in-memory coverage index (billing/coverage_index.py).
+    """
+    permission_classes = [IsWasteProvider]
+
+    def _provider_block_ids(self, request):
+        mapping = get_waste_mapping()
+        provider = mapping.provider_for_user(request.user.id)
+        return mapping.provider_block_ids(provider.id)
+
+    @action(detail=False, methods=["get"], url_path="lookup")
+    def lookup(self, request):
+        serializer = ProviderCoverageLookupSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+        result = get_coverage_index().lookup(data["type"], data["value"], self._provider_block_ids(request))
+        return Response(result, status=200)
+
+    @action(detail=False, methods=["post"], url_path="batch")
+    def batch(self, request):
+        serializer = ProviderCoverageBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        lookup_type = serializer.validated_data["type"]
+        block_ids = self._provider_block_ids(request)
+        index = get_coverage_index()
+
+        results = [index.lookup(lookup_type, value, block_ids) for value in serializer.validated_data["values"]]
+        return Response(
+            {"count": len(results), "covered": sum(1 for r in results if r["covered"]), "results": results},
+            status=200
+        )
+
+
+class ProviderManifestViewSet(viewsets.ViewSet):
+    """
+    Daily collection manifest for one of the provider's blocks (?block=&date=&output=csv|pdf).
+    Serves tonight's precomputed file while it is current, otherwise renders from a live cursor.
+    """
+    permission_classes = [IsWasteProvider]
+
+    def list(self, request):
+        serializer = ProviderManifestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        mapping = get_waste_mapping()
+        provider = mapping.provider_for_user(request.user.id)
+        block_ids = mapping.provider_block_ids(provider.id)
+
+        block_id = serializer.validated_data.get("block")
+        if block_id is None and len(block_ids) == 1:
+            block_id = next(iter(block_ids))
+        if block_id not in block_ids:
+            return Response({"error": "Choose one of your blocks: ?block=<id>."}, status=400)
+
+        on_date = serializer.validated_data.get("date") or timezone.now().date()
+        fmt = serializer.validated_data["output"]
+        filename = f"manifest-block-{block_id}-{on_date.isoformat()}.{fmt}"
+        content_type = "application/pdf" if fmt == "pdf" else "text/csv"
+
+        path = cached_manifest_path(block_id, on_date, fmt)
+        if path:
+            return FileResponse(manifest_storage().open(path, "rb"), as_attachment=True, filename=filename, content_type=content_type)
+
+        if fmt == "csv":
+            response = StreamingHttpResponse(iter_csv(manifest_rows(block_id, on_date)), content_type=content_type)
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+
+        buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        render_manifest(block_id, on_date, fmt, buffer, title=f"{provider.name} - Block {block_id} - {on_date}")
+        buffer.seek(0)
+        return FileResponse(buffer, as_attachment=True, filename=filename, content_type=content_type)
+
+
 class BusinessLicensePaymentViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -839,9 +886,11 @@ class BusinessLicensePaymentViewSet(viewsets.ViewSet):
             amount=bill.amount_due,  # stored in SLE
             status=PaymentStatus.INITIATED
         )
+        set_span_ids(payment=payment, bill=bill)
 
         try:
-            session = stripe.checkout.Session.create(
+            session = create_checkout_session(
+                idempotency_key=f"checkout-payment-{payment.id}",
                 mode="payment",
                 payment_method_types=["card"],
                 line_items=[{
@@ -871,6 +920,11 @@ class BusinessLicensePaymentViewSet(viewsets.ViewSet):
                 status=200
             )
 
+        except StripeUnavailable as e:
+            payment.status = PaymentStatus.FAILED
+            payment.save(update_fields=["status"])
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         except Exception as e:
             payment.status = PaymentStatus.FAILED
             payment.save(update_fields=["status"])
@@ -893,16 +947,18 @@ class BusinessLicensePaymentViewSet(viewsets.ViewSet):
         if not payment:
             return Response({"error": "Payment session not found."}, status=404)
 
+        set_span_ids(payment=payment, bill=payment.bill)
+
         if payment.status == PaymentStatus.PAID:
             return Response(PaymentSerializer(payment).data, status=200)
 
         try:
-            session = stripe.checkout.Session.retrieve(session_id, expand=["payment_intent"])
+            session = retrieve_checkout_session(session_id, expand=["payment_intent"])
             if session.payment_status != "paid":
                 return Response({"status": "NOT_PAID", "payment_status": session.payment_status}, status=200)
 
             payment_intent_id = session.payment_intent.id if session.payment_intent else None
-            notice_id = int(session.metadata.get("notice_id"))
+            notice_id = int(session.metadata["notice_id"])
 
             notice = BusinessLicenseDemandNotice.objects.select_related("business").filter(id=notice_id, owner=user).first()
             if not notice:
@@ -943,6 +999,9 @@ class BusinessLicensePaymentViewSet(viewsets.ViewSet):
 
             return Response(PaymentSerializer(payment).data, status=200)
 
+        except StripeUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         except Exception as e:
             return Response({"error": str(e)}, status=400)
 
@@ -978,31 +1037,15 @@ class CitizenBusinessLicenseNoticeViewSet(viewsets.ModelViewSet):
 
 
 # =========================================================
-# TEMPLATE SESSION MIXIN (same as complaints)
+# SHARED FILTER HELPERS
 # =========================================================
 
-class SessionStaffUserMixin:
+def _ward_param(request) -> str:
     """
-    Attaches the logged-in staff/admin user object to request.user
-    using session staff_user_id saved at login.
+    ?ward= when it is a ward id; anything else is ignored (it would fail the ward_id filter).
     """
-    def dispatch(self, request, *args, **kwargs):
-        staff_user_id = request.session.get("staff_user_id")
-        if not staff_user_id:
-            request.session.flush()
-            return redirect("staff_login")
-
-        user = User.objects.filter(id=staff_user_id).first()
-        if not user:
-            request.session.flush()
-            return redirect("staff_login")
-
-        request.user = user
-        return super().dispatch(request, *args, **kwargs)
-
-# =========================================================
-# SHARED FILTER HELPERS
-# =========================================================
+    ward_id = request.GET.get("ward", "").strip()
+    return ward_id if ward_id.isdigit() else ""
 
 def _apply_payment_filters(qs, request, allow_admin_filters: bool):
     q = request.GET.get("q", "").strip()
@@ -1035,7 +1078,7 @@ def _apply_payment_filters(qs, request, allow_admin_filters: bool):
         qs = qs.filter(created_at__date__lte=date_to)
 
     if allow_admin_filters:
-        ward_id = request.GET.get("ward", "").strip()
+        ward_id = _ward_param(request)
         if ward_id:
             qs = qs.filter(bill__user__ward_id=ward_id)
 
@@ -1070,7 +1113,7 @@ def _apply_bill_filters(qs, request, allow_admin_filters: bool):
         qs = qs.filter(created_at__date__lte=date_to)
 
     if allow_admin_filters:
-        ward_id = request.GET.get("ward", "").strip()
+        ward_id = _ward_param(request)
         if ward_id:
             qs = qs.filter(user__ward_id=ward_id)
 
@@ -1088,7 +1131,7 @@ class StaffPaymentListView(SessionStaffUserMixin, KnoxSessionRequiredMixin, Role
 
     def get_queryset(self):
         qs = Payment.objects.select_related("bill", "bill__user").filter(
-            bill__user__ward=self.request.user.ward
+            bill__user__ward_id=self.request.user.ward_id
         ).order_by("-created_at")
 
         qs = _apply_payment_filters(qs, self.request, allow_admin_filters=False)
@@ -1107,8 +1150,8 @@ class StaffPaymentDetailView(SessionStaffUserMixin, KnoxSessionRequiredMixin, Ro
     required_role = "STAFF"
 
     def get_queryset(self):
-        return Payment.objects.select_related("bill", "bill__user").filter(
-            bill__user__ward=self.request.user.ward
+        return Payment.objects.select_related("bill", "bill__user", "bill__user__ward").filter(
+            bill__user__ward_id=self.request.user.ward_id
         )
 
 class StaffBillListView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, ListView):
@@ -1119,7 +1162,7 @@ class StaffBillListView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleReq
 
     def get_queryset(self):
         qs = Bill.objects.select_related("user").filter(
-            user__ward=self.request.user.ward
+            user__ward_id=self.request.user.ward_id
         ).order_by("-created_at")
 
         qs = _apply_bill_filters(qs, self.request, allow_admin_filters=False)
@@ -1138,8 +1181,8 @@ class StaffBillDetailView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleR
     required_role = "STAFF"
 
     def get_queryset(self):
-        return Bill.objects.select_related("user").prefetch_related("payments").filter(
-            user__ward=self.request.user.ward
+        return Bill.objects.select_related("user", "user__ward").prefetch_related("payments").filter(
+            user__ward_id=self.request.user.ward_id
         )
 
 class StaffBusinessNoticeListView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, ListView):
@@ -1150,7 +1193,7 @@ class StaffBusinessNoticeListView(SessionStaffUserMixin, KnoxSessionRequiredMixi
 
     def get_queryset(self):
         qs = BusinessLicenseDemandNotice.objects.select_related("business", "owner").filter(
-            owner__ward=self.request.user.ward
+            owner__ward_id=self.request.user.ward_id
         ).order_by("-created_at")
 
         q = self.request.GET.get("q", "").strip()
@@ -1176,7 +1219,7 @@ class StaffBusinessNoticeDetailView(SessionStaffUserMixin, KnoxSessionRequiredMi
 
     def get_queryset(self):
         return BusinessLicenseDemandNotice.objects.select_related("business", "owner").filter(
-            owner__ward=self.request.user.ward
+            owner__ward_id=self.request.user.ward_id
         )
 
 class StaffBusinessNoticeUpdateView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, UpdateView):
@@ -1188,7 +1231,7 @@ class StaffBusinessNoticeUpdateView(SessionStaffUserMixin, KnoxSessionRequiredMi
 
     def get_queryset(self):
         return BusinessLicenseDemandNotice.objects.select_related("business", "owner").filter(
-            owner__ward=self.request.user.ward
+            owner__ward_id=self.request.user.ward_id
         )
 
     def form_valid(self, form):
@@ -1224,8 +1267,7 @@ class AdminPaymentListView(SessionStaffUserMixin, KnoxSessionRequiredMixin, Role
         ctx = super().get_context_data(**kwargs)
         ctx["service_types"] = ServiceType.choices
         ctx["payment_statuses"] = PaymentStatus.choices
-        # if you want ward dropdown in template:
-        # ctx["wards"] = Ward.objects.all().order_by("name")
+        ctx["wards"] = reference.get("wards").data
         return ctx
 
 class AdminPaymentDetailView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, DetailView):
@@ -1237,6 +1279,66 @@ class AdminPaymentDetailView(SessionStaffUserMixin, KnoxSessionRequiredMixin, Ro
     def get_queryset(self):
         return Payment.objects.select_related("bill", "bill__user").all()
 
+class AdminReceiptExportView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, View):
+    """
+    Streams a ZIP of the paid receipts (plus manifest.csv) for exactly the payments the
+    admin payments list shows with the same query string (q, service_type, status,
+    date_from/date_to on the created date, ward), limited to paid payments.
+    """
+    required_role = "ADMIN"
+
+    def get(self, request, *args, **kwargs):
+        ward_id = _ward_param(request)
+        date_from = parse_date(request.GET.get("date_from", "") or "")
+        date_to = parse_date(request.GET.get("date_to", "") or "")
+
+        if not (ward_id or date_from or date_to or request.GET.get("q", "").strip()):
+            messages.error(request, "Choose a ward, a date range or a search to export receipts.")
+            return redirect("admin_payment_list")
+
+        qs = Payment.objects.filter(status=PaymentStatus.PAID)
+        qs = _apply_payment_filters(qs, request, allow_admin_filters=True).order_by("id")
+
+        parts = ["receipts"]
+        if ward_id:
+            parts.append(f"ward-{ward_id}")
+        if date_from:
+            parts.append(date_from.isoformat())
+        if date_to:
+            parts.append(date_to.isoformat())
+
+        response = StreamingHttpResponse(iter_receipts_zip(qs), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="{"_".join(parts)}.zip"'
+        return response
+
+PAYMENT_EXPORT_COLUMNS = [
+    ("id", "Payment ID"),
+    ("created_at", "Created"),
+    ("paid_at", "Paid At"),
+    ("status", "Status"),
+    ("bill_id", "Bill ID"),
+    ("bill__service_type", "Service"),
+    ("amount", "Amount (SLE)"),
+    ("bill__user__first_name", "First Name"),
+    ("bill__user__last_name", "Last Name"),
+    ("bill__user__email", "Email"),
+    ("bill__user__ward__name", "Ward"),
+    ("stripe_payment_intent_id", "Stripe Payment Intent"),
+    ("stripe_checkout_session_id", "Stripe Checkout Session"),
+]
+
+
+class AdminPaymentExportView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, View):
+    """
+    Payments list filters, streamed as CSV (default) or ?output=xlsx.
+    """
+    required_role = "ADMIN"
+
+    def get(self, request, *args, **kwargs):
+        qs = _apply_payment_filters(Payment.objects.order_by("-created_at"), request, allow_admin_filters=True)
+        return export_response(request, qs, PAYMENT_EXPORT_COLUMNS, "payments")
+
+
 class AdminBillListView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, ListView):
     template_name = "dashboards/admin/bills.html"
     context_object_name = "bills"
@@ -1262,7 +1364,35 @@ class AdminBillDetailView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleR
     required_role = "ADMIN"
 
     def get_queryset(self):
-        return Bill.objects.select_related("user").prefetch_related("payments").all()
+        return Bill.objects.select_related("user", "user__ward").prefetch_related("payments").all()
+
+
+BILL_EXPORT_COLUMNS = [
+    ("id", "Bill ID"),
+    ("created_at", "Created"),
+    ("service_type", "Service"),
+    ("status", "Status"),
+    ("period_year", "Year"),
+    ("amount_due", "Amount Due (SLE)"),
+    ("amount_paid", "Amount Paid (SLE)"),
+    ("due_date", "Due Date"),
+    ("installment_count", "Installments Paid"),
+    ("user__first_name", "First Name"),
+    ("user__last_name", "Last Name"),
+    ("user__email", "Email"),
+    ("user__ward__name", "Ward"),
+]
+
+
+class AdminBillExportView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, View):
+    """
+    Bills list filters, streamed as CSV (default) or ?output=xlsx.
+    """
+    required_role = "ADMIN"
+
+    def get(self, request, *args, **kwargs):
+        qs = _apply_bill_filters(Bill.objects.order_by("-created_at"), request, allow_admin_filters=True)
+        return export_response(request, qs, BILL_EXPORT_COLUMNS, "bills")
 
 
 # =========================================================
@@ -1307,7 +1437,7 @@ class AdminBusinessNoticeDetailView(SessionStaffUserMixin, KnoxSessionRequiredMi
     required_role = "ADMIN"
 
     def get_queryset(self):
-        return BusinessLicenseDemandNotice.objects.select_related("business", "owner", "bill")
+        return BusinessLicenseDemandNotice.objects.select_related("business", "owner", "owner__ward", "bill")
 
 
 class AdminBusinessNoticeUpdateView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, UpdateView):
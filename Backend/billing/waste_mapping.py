@@ -0,0 +1,118 @@
+"""
+Process-wide snapshot of the waste reference data:
+ward -> block -> provider (about 48 wards, 8 blocks), provider logins and the waste plans.
+
+Loaded once per process and reused by every waste checkout/verify, so those
+spend no queries on reference data. billing/signals.py calls invalidate() when
+any of the underlying rows change:
+- the local snapshot is dropped immediately
+- a version token in the shared Django cache is bumped on commit, and every
+  worker compares its snapshot against that token (at most every
+  WASTE_MAPPING_CHECK_SECONDS) so other processes reload too; with several
+  workers the cache must be shared (core/checks.py rejects locmem)
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import WastePlan, WasteWardMeta, WasteBlockProvider, WasteServiceProvider
+
+VERSION_CACHE_KEY = "billing:waste_mapping:version"
+
+
+class WasteMapping:
+    def __init__(self, ward_blocks: dict, block_providers: dict, plans: dict, provider_users: dict):
+        self.ward_blocks = ward_blocks            # ward_id -> WasteBlock
+        self.block_providers = block_providers    # block_id -> WasteServiceProvider
+        self.plans = plans                        # plan_id -> WastePlan (active and inactive)
+        self.provider_users = provider_users      # user_id -> WasteServiceProvider (provider logins)
+
+    @classmethod
+    def load(cls) -> "WasteMapping":
+        ward_blocks = {
+            meta.ward_id: meta.block
+            for meta in WasteWardMeta.objects.select_related("block").filter(block__isnull=False)
+        }
+        block_providers = {
+            m.block_id: m.provider
+            for m in WasteBlockProvider.objects.select_related("provider")
+        }
+        plans = {p.id: p for p in WastePlan.objects.all()}
+        provider_users = {p.user_id: p for p in WasteServiceProvider.objects.filter(user__isnull=False)}
+        return cls(ward_blocks, block_providers, plans, provider_users)
+
+    def block_and_provider(self, ward_id):
+        block = self.ward_blocks.get(ward_id) if ward_id else None
+        if not block:
+            return None, None
+        return block, self.block_providers.get(block.id)
+
+    def provider_for_user(self, user_id):
+        return self.provider_users.get(user_id)
+
+    def provider_block_ids(self, provider_id) -> set:
+        return {block_id for block_id, p in self.block_providers.items() if p.id == provider_id}
+
+    def active_plan(self, plan_id):
+        plan = self.plans.get(plan_id)
+        return plan if plan and plan.is_active else None
+
+    def active_plans(self):
+        return sorted((p for p in self.plans.values() if p.is_active), key=lambda p: p.price)
+
+
+_lock = threading.Lock()
+_mapping = None
+_version = None
+_checked_at = 0.0
+
+
+def _shared_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        # another worker may have set it first; whichever value sticks is the one to compare against
+        cache.add(VERSION_CACHE_KEY, version, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY, version)
+    return version
+
+
+def get_waste_mapping() -> WasteMapping:
+    global _mapping, _version, _checked_at
+
+    check_every = getattr(settings, "WASTE_MAPPING_CHECK_SECONDS", 5)
+    now = time.monotonic()
+    mapping = _mapping
+    if mapping is not None and now - _checked_at < check_every:
+        return mapping
+
+    with _lock:
+        version = _shared_version()
+        if _mapping is None or _version != version:
+            _mapping = WasteMapping.load()
+            _version = version
+        _checked_at = now
+        return _mapping
+
+
+def _bump_shared_version():
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+    _drop_local()
+
+
+def _drop_local():
+    global _mapping
+    with _lock:
+        _mapping = None
+
+
+def invalidate():
+    """
+    Drops this process's snapshot now and tells the other workers once the change commits.
+    """
+    _drop_local()
+    transaction.on_commit(_bump_shared_version)
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ccrsms.settings')
 
 application = get_asgi_application()
+
+# several workers need a shared cache (core/checks.py)
+from core.checks import require_shared_cache  # noqa: E402
+
+require_shared_cache()
@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "django.contrib.gis",
     'core',
     'accounts',
@@ -62,6 +63,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.ServerTimingMiddleware',  # first: times the whole stack
+    'core.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -106,7 +109,7 @@ TEMPLATES = [
 WSGI_APPLICATION = 'ccrsms.wsgi.application'
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ( "knox.auth.TokenAuthentication",)
+    "DEFAULT_AUTHENTICATION_CLASSES": ( "accounts.authentication.CachedTokenAuthentication",)
 }
 
 REST_KNOX = {
@@ -131,6 +134,63 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared between workers in production (e.g. CACHE_URL=redis://127.0.0.1:6379/1) so
+# cache invalidations (billing/waste_mapping.py) reach every process.
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+# Worker processes serving the app (gunicorn reads WEB_CONCURRENCY too). More than one
+# needs a shared CACHE_URL: locmem is rejected then (core/checks.py)
+WEB_WORKERS = env.int("WEB_CONCURRENCY", default=1)
+WASTE_MAPPING_CHECK_SECONDS = env.float("WASTE_MAPPING_CHECK_SECONDS", default=5)
+# Reference lists (core/reference.py): client max-age and cross-worker version check interval
+REFERENCE_DATA_MAX_AGE = env.int("REFERENCE_DATA_MAX_AGE", default=300)
+REFERENCE_DATA_CHECK_SECONDS = env.float("REFERENCE_DATA_CHECK_SECONDS", default=5)
+# Provider coverage lookup index (billing/coverage_index.py)
+COVERAGE_INDEX_TTL_SECONDS = env.float("COVERAGE_INDEX_TTL_SECONDS", default=60)
+COVERAGE_INDEX_MIN_REBUILD_SECONDS = env.float("COVERAGE_INDEX_MIN_REBUILD_SECONDS", default=5)
+# Phone numbers are parsed as Sierra Leone numbers and stored as E.164, the form
+# accounts/auth_backend.py looks them up by
+PHONENUMBER_DEFAULT_REGION = "SL"
+PHONENUMBER_DB_FORMAT = "E164"
+# Staff/admin pages cache their Knox token check and session user (accounts/mixins.py)
+STAFF_SESSION_CACHE_SECONDS = env.int("STAFF_SESSION_CACHE_SECONDS", default=60)
+# REST API token cache (accounts/authentication.py): shared-cache lifetime, and how long
+# a worker trusts its own copy (the longest a revocation takes to reach other workers)
+AUTH_TOKEN_CACHE_SECONDS = env.int("AUTH_TOKEN_CACHE_SECONDS", default=60)
+AUTH_TOKEN_LOCAL_SECONDS = env.float("AUTH_TOKEN_LOCAL_SECONDS", default=5)
+AUTH_TOKEN_LOCAL_SIZE = env.int("AUTH_TOKEN_LOCAL_SIZE", default=1024)
+# Login rate limits (accounts/throttling.py): token buckets per client IP and per
+# email/phone, checked before the password hash. Counted in the shared cache, so the
+# limits hold across worker processes.
+LOGIN_THROTTLE_ENABLED = env.bool("LOGIN_THROTTLE_ENABLED", default=True)
+LOGIN_THROTTLE_IP_BURST = env.int("LOGIN_THROTTLE_IP_BURST", default=20)
+LOGIN_THROTTLE_IP_PER_MINUTE = env.float("LOGIN_THROTTLE_IP_PER_MINUTE", default=10)
+LOGIN_THROTTLE_IDENTIFIER_BURST = env.int("LOGIN_THROTTLE_IDENTIFIER_BURST", default=5)
+LOGIN_THROTTLE_IDENTIFIER_PER_MINUTE = env.float("LOGIN_THROTTLE_IDENTIFIER_PER_MINUTE", default=2)
+# reverse proxies in front of Django that append to X-Forwarded-For (0: use REMOTE_ADDR)
+LOGIN_THROTTLE_PROXY_COUNT = env.int("LOGIN_THROTTLE_PROXY_COUNT", default=0)
+# Per-request timings (core/instrumentation.py): Server-Timing header and /metrics.
+# /metrics answers 404 until METRICS_TOKEN is set; Prometheus sends it as a Bearer token.
+SERVER_TIMING_HEADER = env.bool("SERVER_TIMING_HEADER", default=True)
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+# How often a worker adds its request histograms to the shared cache, where /metrics reads them
+METRICS_FLUSH_SECONDS = env.float("METRICS_FLUSH_SECONDS", default=10)
+# Tracing spans (core/tracing.py): "" (off), "file" (JSON lines) or "otlp" (OTLP/HTTP JSON,
+# e.g. to `manage.py trace_collector` locally)
+TRACING_EXPORTER = env("TRACING_EXPORTER", default="")
+TRACING_FILE = env("TRACING_FILE", default=str(BASE_DIR / "traces.jsonl"))
+TRACING_OTLP_ENDPOINT = env("TRACING_OTLP_ENDPOINT", default="http://127.0.0.1:4318/v1/traces")
+TRACING_SERVICE_NAME = env("TRACING_SERVICE_NAME", default="ccrsms")
+# OTLP spans are posted from a background thread: spans waiting at most (more are dropped),
+# spans per POST, seconds a batch waits to fill, and the POST timeout
+TRACING_OTLP_QUEUE_SIZE = env.int("TRACING_OTLP_QUEUE_SIZE", default=2048)
+TRACING_OTLP_BATCH_SIZE = env.int("TRACING_OTLP_BATCH_SIZE", default=512)
+TRACING_OTLP_FLUSH_SECONDS = env.float("TRACING_OTLP_FLUSH_SECONDS", default=1.0)
+TRACING_OTLP_TIMEOUT = env.float("TRACING_OTLP_TIMEOUT", default=2.0)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -174,6 +234,20 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'uploads')
 
+# Uploads/receipts are stored by sha256, sharded receipts/ab/cd/<sha256>.pdf (core/storage.py)
+STORAGES = {
+    "default": {"BACKEND": "core.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+# Who sends media bytes (core/media.py): "django" (dev), "x-accel" (nginx) or "x-sendfile" (Apache)
+MEDIA_SERVE_MODE = env("MEDIA_SERVE_MODE", default="django")
+MEDIA_ACCEL_PREFIX = env("MEDIA_ACCEL_PREFIX", default="/protected-media/")  # nginx `internal` location
+MEDIA_MAX_AGE = env.int("MEDIA_MAX_AGE", default=3600)  # seconds, for files not named by content hash
+MEDIA_URL_MAX_AGE = env.int("MEDIA_URL_MAX_AGE", default=3600)  # seconds a signed media link keeps working
+# Precomputed waste collection manifests (billing/manifests.py): citizen PII, kept outside
+# MEDIA_ROOT and never served directly
+MANIFEST_ROOT = env("MANIFEST_ROOT", default=str(BASE_DIR / "private" / "manifests"))
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'accounts.CustomUser'
@@ -204,3 +278,14 @@ STRIPE_PUBLISHABLE_KEY = env("STRIPE_PUBLISHABLE_KEY")
 FRONTEND_URL = env("FRONTEND_URL", default="http://localhost:5173")
 SLL_PER_USD = Decimal(env("SLL_PER_USD", default="22"))  # e.g. 1 USD = 25 Le
 STRIPE_CURRENCY = "usd"
+# Flat City Rate used by the Ward admin "issue bills" action (SLE). Leave empty to issue via the command only.
+CITY_RATE_ANNUAL_AMOUNT = env("CITY_RATE_ANNUAL_AMOUNT", cast=Decimal, default=None)
+
+# Stripe client (billing/stripe_client.py): pooled session, timeouts, retries, circuit breaker
+STRIPE_CONNECT_TIMEOUT = env.float("STRIPE_CONNECT_TIMEOUT", default=3.0)   # seconds
+STRIPE_READ_TIMEOUT = env.float("STRIPE_READ_TIMEOUT", default=10.0)        # seconds
+STRIPE_POOL_MAXSIZE = env.int("STRIPE_POOL_MAXSIZE", default=20)
+STRIPE_MAX_RETRIES = env.int("STRIPE_MAX_RETRIES", default=2)
+STRIPE_BREAKER_FAILURE_THRESHOLD = env.int("STRIPE_BREAKER_FAILURE_THRESHOLD", default=5)
+STRIPE_BREAKER_RESET_SECONDS = env.float("STRIPE_BREAKER_RESET_SECONDS", default=30)
+STRIPE_API_BASE = env("STRIPE_API_BASE", default="")  # e.g. the local fake: billing/fake_stripe.py
@@ -16,9 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
 from knox import views as knox_views
+from core.instrumentation import metrics_view
+from core.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -30,9 +31,14 @@ urlpatterns = [
     # Knox Logout (global token management)
     path('api/logout/', knox_views.LogoutView.as_view(), name='knox_logout'),
     path('api/logoutall/', knox_views.LogoutAllView.as_view(), name='knox_logoutall'),
+    # Prometheus scrape target (core/instrumentation.py)
+    path('metrics', metrics_view, name='metrics'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Media goes through Django so every download is authorized (signed link or staff session):
+# streamed with ETag/Range under DEBUG, X-Accel-Redirect / X-Sendfile hand-off in production.
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", serve_media, name="media"),
+]
 
 
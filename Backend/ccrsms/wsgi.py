@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ccrsms.settings')
 
 application = get_wsgi_application()
+
+# several workers need a shared cache (core/checks.py)
+from core.checks import require_shared_cache  # noqa: E402
+
+require_shared_cache()
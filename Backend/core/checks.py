@@ -0,0 +1,61 @@
+"""
+System checks for settings the process-local caches depend on.
+
+The waste mapping (billing/waste_mapping.py), the reference lists (core/reference.py),
+the staff session and API token caches (accounts/mixins.py, accounts/authentication.py),
+the login throttles (accounts/throttling.py) and the /metrics histograms
+(core/instrumentation.py) keep data in each process and learn
+about changes made elsewhere through the Django cache. With the default locmem cache
+every worker has its own, so with several workers those invalidations and shared
+counters silently stay in the worker that made the change.
+
+- core.E001  more than one worker (WEB_WORKERS, from WEB_CONCURRENCY) on a locmem cache
+- core.W001  locmem cache with DEBUG off (`manage.py check --deploy`)
+
+ccrsms/wsgi.py and ccrsms/asgi.py call require_shared_cache() so a server started
+with that E001 setup refuses to start instead of serving stale data.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.core.exceptions import ImproperlyConfigured
+
+LOCMEM_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+
+SHARED_CACHE_HINT = "Set CACHE_URL to a cache all workers share, e.g. redis://... or dbcache://cache_table."
+
+
+def cache_is_per_process() -> bool:
+    return settings.CACHES.get("default", {}).get("BACKEND") == LOCMEM_BACKEND
+
+
+def web_workers() -> int:
+    return getattr(settings, "WEB_WORKERS", 1)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs=None, **kwargs):
+    if cache_is_per_process() and web_workers() > 1:
+        return [Error(
+            f"The default cache is per-process (locmem) but WEB_WORKERS is {web_workers()}: "
+            "cache invalidations and login throttles would not reach the other workers.",
+            hint=SHARED_CACHE_HINT,
+            id="core.E001",
+        )]
+    return []
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache_deploy(app_configs=None, **kwargs):
+    if cache_is_per_process() and not settings.DEBUG and web_workers() <= 1:
+        return [Warning(
+            "The default cache is per-process (locmem). That is only safe with a single worker process.",
+            hint=SHARED_CACHE_HINT,
+            id="core.W001",
+        )]
+    return []
+
+
+def require_shared_cache():
+    errors = check_shared_cache()
+    if errors:
+        raise ImproperlyConfigured(f"{errors[0].msg} {errors[0].hint}")
@@ -0,0 +1,233 @@
+"""
+Mixed citizen-app load test.
+
+N concurrent citizens each send a weighted random mix of the requests the React app
+makes: complaint create (multipart, with an evidence photo), complaint list, payment
+history, dashboard stats / recent payments, bills, and login. Complaint notifications
+go through the real SMTP backend to core.fake_smtp.FakeSMTPServer and the Stripe
+client points at billing.fake_stripe.FakeStripeServer, so nothing leaves the machine.
+
+Reports RPS, p50/p95/p99 latency and queries per request per endpoint. The report
+(or just its "endpoints" part) is the baseline `manage.py bench_citizen_api`
+saves and compares against.
+
+Used by `manage.py bench_citizen_api` and by core/tests.py.
+"""
+import io
+import random
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from knox.models import AuthToken
+from PIL import Image
+
+from accounts.models import Ward
+from billing.fake_stripe import FakeStripeServer
+from billing.models import Bill, BillStatus, Payment, PaymentStatus, ServiceType
+from billing.stripe_client import stripe_client
+from .fake_smtp import FakeSMTPServer
+from .loadtest import LatencyRecorder, run_concurrently
+from .models import ComplaintCategory
+
+User = get_user_model()
+
+BENCH_PASSWORD = "Bench-Citizen-2026"
+
+# relative weights, roughly what the citizen app sends: reads dominate
+DEFAULT_MIX = {
+    "complaint-create": 1,
+    "complaint-list": 3,
+    "payments": 3,
+    "payment-stats": 2,
+    "payment-recent": 2,
+    "bills": 2,
+    "login": 1,
+}
+
+
+def parse_mix(value: str) -> dict:
+    """
+    "payments=5,login=1" -> {"payments": 5, "login": 1}. Unknown names raise ValueError.
+    """
+    mix = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown endpoint '{name}'. Choose from: {', '.join(DEFAULT_MIX)}")
+        mix[name] = int(weight or 1)
+    if not mix or not any(mix.values()):
+        raise ValueError("The mix needs at least one endpoint with a positive weight.")
+    return mix
+
+
+def evidence_photo(size=(640, 480)) -> bytes:
+    """
+    A phone-camera-sized JPEG (noise, so it does not compress to nothing).
+    """
+    image = Image.effect_noise(size, 64).convert("RGB")
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=80)
+    return buf.getvalue()
+
+
+# ----------------------------
+# SEED DATA
+# ----------------------------
+def seed_citizens(count: int, history: int, staff_per_ward: int = 2, label: str = "citizenbench"):
+    """
+    `count` citizens in one ward, each with `history` paid City Rate bills/payments,
+    plus staff in the ward (so complaint creation notifies them). All citizens share
+    BENCH_PASSWORD; the hash is computed once. Returns [(user, token)] and the category.
+    """
+    ward = Ward.objects.create(name=f"{label.title()} Ward")
+    category = ComplaintCategory.objects.create(category_name=f"{label.title()} Drainage")
+    password = make_password(BENCH_PASSWORD)
+
+    User.objects.bulk_create([
+        User(email=f"{label}-staff{i}@loadtest.local", first_name="Ward", last_name=f"Officer {i}",
+             user_type="STAFF", ward=ward, password=make_password(None))
+        for i in range(staff_per_ward)
+    ])
+    users = User.objects.bulk_create([
+        User(email=f"{label}{i}@loadtest.local", first_name="Bench", last_name=f"Citizen {i}",
+             user_type="CITIZEN", ward=ward, password=password)
+        for i in range(count)
+    ])
+
+    now = timezone.now()
+    bills = Bill.objects.bulk_create([
+        Bill(
+            user=user, service_type=ServiceType.CITY_RATE, period_year=now.year - n,
+            amount_due=Decimal("300.00"), amount_paid=Decimal("300.00"), status=BillStatus.PAID,
+            created_at=now - timedelta(days=365 * n),
+        )
+        for user in users
+        for n in range(history)
+    ])
+    Payment.objects.bulk_create([
+        Payment(bill=bill, amount=bill.amount_due, status=PaymentStatus.PAID,
+                paid_at=bill.created_at, created_at=bill.created_at)
+        for bill in bills
+    ])
+
+    tokens = [AuthToken.objects.create(u)[1] for u in users]
+    return list(zip(users, tokens)), category
+
+
+# ----------------------------
+# RUNNER
+# ----------------------------
+def run_citizen_benchmark(
+    citizens: int = 50,
+    concurrency: int = 10,
+    requests_per_citizen: int = 20,
+    history: int = 3,
+    mix: dict | None = None,
+    smtp_latency_ms: float = 0.0,
+    seed: int = 0,
+) -> dict:
+    mix = mix or DEFAULT_MIX
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+
+    recorder = LatencyRecorder()
+    seeded, category = seed_citizens(citizens, history)
+    photo = evidence_photo()
+    rng = random.Random(seed)
+    # the request sequence is drawn up front, so a run is repeatable for a given seed
+    plans = [(user, token, rng.choices(names, weights, k=requests_per_citizen)) for user, token in seeded]
+
+    def complaint_create(client, user):
+        resp = client.post("/core/citizens/complaints/", {
+            "category": category.id,
+            "title": "Blocked drain",
+            "description": "Drain blocked after the rain, water on the road.",
+            "latitude": 8.4844 + rng.random() / 100,
+            "longitude": -13.2344 + rng.random() / 100,
+            "street_name": "Siaka Stevens Street",
+            "evidence_image": SimpleUploadedFile("evidence.jpg", photo, content_type="image/jpeg"),
+        })
+        return resp.status_code == 201
+
+    def login(client, user):
+        resp = Client().post(
+            "/api/citizens/login/", {"identifier": user.email, "password": BENCH_PASSWORD},
+            content_type="application/json",
+        )
+        return resp.status_code == 200 and "token" in resp.json()
+
+    def get(url):
+        return lambda client, user: client.get(url).status_code == 200
+
+    actions = {
+        "complaint-create": complaint_create,
+        "complaint-list": get("/core/citizens/complaints/"),
+        "payments": get("/billing/payments/"),
+        "payment-stats": get("/billing/payments/stats/"),
+        "payment-recent": get("/billing/payments/recent/"),
+        "bills": get("/billing/payments/bills/"),
+        "login": login,
+    }
+
+    def citizen_flow(item):
+        user, token, plan = item
+        client = Client(HTTP_AUTHORIZATION=f"Token {token}")
+        for name in plan:
+            with recorder.measure(name) as result:
+                result["ok"] = actions[name](client, user)
+
+    smtp = FakeSMTPServer(latency_ms=smtp_latency_ms)
+    stripe = FakeStripeServer(latency_ms=0)
+
+    with smtp, stripe, tempfile.TemporaryDirectory() as media_root, override_settings(
+        EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+        EMAIL_HOST=smtp.host,
+        EMAIL_PORT=smtp.port,
+        EMAIL_USE_TLS=False,
+        EMAIL_USE_SSL=False,
+        EMAIL_HOST_USER="noreply@loadtest.local",
+        EMAIL_HOST_PASSWORD="",
+        STRIPE_API_BASE=stripe.url,
+        STRIPE_SECRET_KEY="sk_test_loadtest",
+        MEDIA_ROOT=media_root,
+        # every simulated citizen logs in from 127.0.0.1; accounts/bench_login_throttle covers the limits
+        LOGIN_THROTTLE_ENABLED=False,
+    ):
+        stripe_client.reset()
+        try:
+            recorder.start()
+            errors = run_concurrently(citizen_flow, plans, concurrency)
+            recorder.stop()
+        finally:
+            stripe_client.reset()
+
+    endpoints = recorder.summary()
+    wall = recorder.finished_at - recorder.started_at
+    total = sum(row["count"] for row in endpoints.values())
+
+    return {
+        "citizens": citizens,
+        "concurrency": concurrency,
+        "requests_per_citizen": requests_per_citizen,
+        "history": history,
+        "mix": dict(zip(names, weights)),
+        "seed": seed,
+        "wall_seconds": round(wall, 3),
+        "requests": total,
+        "requests_per_second": round(total / wall, 2) if wall > 0 else 0.0,
+        "endpoints": endpoints,
+        "smtp": {
+            "latency_ms": smtp_latency_ms,
+            "connections": smtp.state.connection_count,
+            "messages": smtp.state.message_count,
+        },
+        "exceptions": [repr(e) for e in errors[:10]],
+    }
@@ -0,0 +1,134 @@
+"""
+Local SMTP stand-in for load tests and offline CI.
+
+Speaks just enough SMTP for django.core.mail's SMTP backend (EHLO/HELO, MAIL, RCPT,
+DATA, RSET, NOOP, QUIT; no TLS, no AUTH) and keeps the messages it accepted, so the
+notification emails sent inside a request are really sent over a socket and timed.
+
+Usage:
+    with FakeSMTPServer(latency_ms=20) as smtp:
+        override_settings(EMAIL_HOST=smtp.host, EMAIL_PORT=smtp.port, EMAIL_USE_TLS=False, ...)
+"""
+import socketserver
+import threading
+import time
+
+
+class FakeSMTPState:
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+        self.lock = threading.Lock()
+        self.messages = []  # (mail_from, [rcpt_to], raw bytes)
+        self.connection_count = 0
+
+    @property
+    def message_count(self) -> int:
+        with self.lock:
+            return len(self.messages)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    @property
+    def state(self) -> FakeSMTPState:
+        return self.server.state
+
+    def _reply(self, line: str):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+        self.wfile.flush()
+
+    def _read_data(self) -> bytes:
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                return b"".join(lines)
+            if line.startswith(b".."):
+                line = line[1:]  # dot-stuffing
+            lines.append(line)
+
+    def handle(self):
+        with self.state.lock:
+            self.state.connection_count += 1
+
+        mail_from, rcpt_to = None, []
+        self._reply("220 fake-smtp ESMTP ready")
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, arg = line.decode("ascii", "replace").strip().partition(" ")
+            command = command.upper()
+
+            if command == "EHLO":
+                self._reply("250-fake-smtp")
+                self._reply("250-8BITMIME")
+                self._reply("250 SMTPUTF8")
+            elif command == "HELO":
+                self._reply("250 fake-smtp")
+            elif command == "MAIL":
+                mail_from, rcpt_to = arg.partition(":")[2].strip(), []
+                self._reply("250 OK")
+            elif command == "RCPT":
+                rcpt_to.append(arg.partition(":")[2].strip())
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                body = self._read_data()
+                if self.state.latency_ms > 0:
+                    time.sleep(self.state.latency_ms / 1000)
+                with self.state.lock:
+                    self.state.messages.append((mail_from, rcpt_to, body))
+                mail_from, rcpt_to = None, []
+                self._reply("250 OK: queued")
+            elif command == "RSET":
+                mail_from, rcpt_to = None, []
+                self._reply("250 OK")
+            elif command == "NOOP":
+                self._reply("250 OK")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeSMTPServer:
+    """
+    Runs the fake SMTP server on a background thread. Port 0 picks a free port.
+    """
+    def __init__(self, host="127.0.0.1", port=0, **state_kwargs):
+        self.state = FakeSMTPState(**state_kwargs)
+        self.server = _Server((host, port), _Handler)
+        self.server.state = self.state
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return self.server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-smtp", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,368 @@
+"""
+Per-request timing: where did the time go?
+
+ServerTimingMiddleware times every request and splits it into phases:
+
+- db        every SQL query (count and time), via connection.execute_wrapper
+- stripe    Stripe API calls (billing/stripe_client.py)
+- receipt   reportlab receipt rendering (billing/reciepts.py)
+- email     SMTP sends (the notification helpers)
+- sms       Twilio sends
+- template  TemplateResponse rendering (the class-based staff/admin views)
+
+The phases go back to the caller as a Server-Timing header (browser devtools show them
+under Network -> Timing) and into Prometheus histograms served at /metrics
+(settings.METRICS_TOKEN, sent as "Authorization: Bearer <token>").
+
+Code outside this module only marks the work it does:
+
+    with timed("stripe"):
+        ...
+
+    @timed("receipt")
+    def build_receipt(...):
+        ...
+
+Outside a request (management commands, pool workers) timed() does nothing.
+
+Behind one gunicorn port a scrape reaches a random worker, so the histograms are kept
+in the shared cache (CACHE_URL, required with several workers, see core/checks.py).
+Each worker adds its observations up in memory and flushes them as deltas (atomic
+cache.incr) at most every METRICS_FLUSH_SECONDS, and before answering a scrape; /metrics
+then reports the totals of all workers. Observations a worker had not flushed yet when
+it exited are lost.
+"""
+import hashlib
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+PHASES = ("db", "stripe", "receipt", "email", "sms", "template")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+INF_BUCKET = 'le="+Inf"'
+
+_current = ContextVar("request_timings", default=None)
+
+
+# ----------------------------
+# PER-REQUEST TIMINGS
+# ----------------------------
+class RequestTimings:
+    def __init__(self):
+        self.phases = {}  # phase -> [count, seconds]
+
+    def add(self, phase: str, seconds: float):
+        row = self.phases.setdefault(phase, [0, 0.0])
+        row[0] += 1
+        row[1] += seconds
+
+    def count(self, phase: str) -> int:
+        return self.phases.get(phase, (0, 0.0))[0]
+
+    def seconds(self, phase: str) -> float:
+        return self.phases.get(phase, (0, 0.0))[1]
+
+
+@contextmanager
+def timed(phase: str):
+    """
+    Adds the time spent in the block to `phase` of the current request.
+    Usable as a decorator too.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+# ----------------------------
+# PROMETHEUS HISTOGRAMS
+# ----------------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _add(key: str, delta: int) -> int:
+    """
+    Atomically adds `delta` to a cache counter that never expires; returns the new value.
+    """
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout=None):
+            return delta
+        return cache.incr(key, delta)
+
+
+class Histogram:
+    """
+    Observations collect in this process (_pending) until flush() adds them to the
+    shared cache. Keys, under metrics:<name>:<generation>:
+    - series             how many label sets were registered; series:<n> holds the nth
+                         (a label set two workers both register is listed twice)
+    - <series id>:b<i>   observations in bucket i (not cumulative)
+    - <series id>:sum    sum of the values, times sum_scale (cache.incr takes integers)
+    - <series id>:count  observations
+    """
+    def __init__(self, name: str, documentation: str, labels=(), buckets=DURATION_BUCKETS, sum_scale=1_000_000):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.sum_scale = sum_scale
+        self._lock = threading.Lock()
+        self._pending = {}  # label values -> [per-bucket counts, scaled sum, count]
+        self._registered = {}  # (generation, label values) -> its series:<n> entry
+
+    def observe(self, value: float, *label_values):
+        label_values = tuple(str(v) for v in label_values)
+        with self._lock:
+            series = self._pending.get(label_values)
+            if series is None:
+                series = self._pending[label_values] = [[0] * len(self.buckets), 0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += round(value * self.sum_scale)
+            series[2] += 1
+
+    def _key(self, generation, suffix: str) -> str:
+        return f"metrics:{self.name}:{generation}:{suffix}"
+
+    @staticmethod
+    def _series_id(label_values) -> str:
+        return hashlib.sha256("\x1f".join(label_values).encode()).hexdigest()[:16]
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        generation = cache.get(f"metrics:{self.name}:generation", 0)
+        # listed before; re-listed if the cache lost the entry (cleared, evicted)
+        listed = {
+            label_values: self._key(generation, f"series:{self._registered[(generation, label_values)]}")
+            for label_values in pending
+            if (generation, label_values) in self._registered
+        }
+        still_listed = cache.get_many(listed.values())
+        for label_values, (counts, total, count) in pending.items():
+            if listed.get(label_values) not in still_listed:
+                index = _add(self._key(generation, "series"), 1)
+                cache.set(self._key(generation, f"series:{index}"), list(label_values), timeout=None)
+                self._registered[(generation, label_values)] = index
+
+            series = self._series_id(label_values)
+            for i, bucket_count in enumerate(counts):
+                if bucket_count:
+                    _add(self._key(generation, f"{series}:b{i}"), bucket_count)
+            _add(self._key(generation, f"{series}:sum"), total)
+            _add(self._key(generation, f"{series}:count"), count)
+
+    def reset(self):
+        """
+        Drops the counts of every worker (by moving to a new key generation).
+        """
+        with self._lock:
+            self._pending.clear()
+            self._registered.clear()
+        _add(f"metrics:{self.name}:generation", 1)
+
+    def expose(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+
+        generation = cache.get(f"metrics:{self.name}:generation", 0)
+        registered = cache.get(self._key(generation, "series")) or 0
+        listed = cache.get_many([self._key(generation, f"series:{i}") for i in range(1, registered + 1)])
+        label_sets = sorted({tuple(v) for v in listed.values()})
+
+        keys = {}
+        for label_values in label_sets:
+            series = self._series_id(label_values)
+            suffixes = [f"b{i}" for i in range(len(self.buckets))] + ["sum", "count"]
+            keys[label_values] = [self._key(generation, f"{series}:{suffix}") for suffix in suffixes]
+        stored = cache.get_many([key for series_keys in keys.values() for key in series_keys])
+
+        for label_values in label_sets:
+            values = [stored.get(key, 0) for key in keys[label_values]]
+            counts, total, count = values[:-2], values[-2], values[-1]
+            if self.sum_scale != 1:
+                total /= self.sum_scale
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _label_text(self.labels, label_values, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_text(self.labels, label_values, INF_BUCKET)} {count}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, label_values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, label_values)} {count}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "ccrsms_http_request_duration_seconds",
+    "Time to produce the response (streamed bodies excluded).",
+    labels=("view", "method", "status"),
+)
+REQUEST_PHASE = Histogram(
+    "ccrsms_http_request_phase_seconds",
+    "Time one request spent in each phase (db, stripe, receipt, email, sms, template).",
+    labels=("view", "phase"),
+)
+REQUEST_QUERIES = Histogram(
+    "ccrsms_http_request_db_queries",
+    "SQL queries run by one request.",
+    labels=("view",),
+    buckets=QUERY_COUNT_BUCKETS,
+    sum_scale=1,
+)
+
+HISTOGRAMS = [REQUEST_DURATION, REQUEST_PHASE, REQUEST_QUERIES]
+
+
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def flush_metrics(force: bool = False):
+    """
+    Flushes this process's observations to the shared cache, at most every
+    METRICS_FLUSH_SECONDS unless forced. A cache error is reported, never raised.
+    """
+    global _last_flush
+    now = time.monotonic()
+    with _flush_lock:
+        if not force and now - _last_flush < getattr(settings, "METRICS_FLUSH_SECONDS", 10):
+            return
+        _last_flush = now
+    try:
+        for histogram in HISTOGRAMS:
+            histogram.flush()
+    except Exception as e:
+        print("[METRICS ERROR] flush:", e)
+
+
+def render_metrics() -> str:
+    flush_metrics(force=True)
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition. 404 unless settings.METRICS_TOKEN is set, 403 without it.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token:
+        raise Http404("Not found.")
+
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+
+    response = HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+# ----------------------------
+# MIDDLEWARE
+# ----------------------------
+def _db_wrapper(timings):
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timings.add("db", time.perf_counter() - started)
+    return wrapper
+
+
+def _view_label(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route or "unnamed"
+
+
+def server_timing_header(timings, total_seconds: float) -> str:
+    parts = []
+    for phase in PHASES:
+        count = timings.count(phase)
+        if not count:
+            continue
+        desc = f"{count} quer{'y' if count == 1 else 'ies'}" if phase == "db" else f"{count} call{'s' * (count != 1)}"
+        parts.append(f'{phase};dur={timings.seconds(phase) * 1000:.1f};desc="{desc}"')
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """
+    Keep first in MIDDLEWARE so the timings cover the whole stack.
+    settings.SERVER_TIMING_HEADER = False keeps the metrics but drops the header.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_db_wrapper(timings)))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = time.perf_counter() - started
+        view = _view_label(request)
+
+        REQUEST_DURATION.observe(total, view, request.method, response.status_code)
+        REQUEST_QUERIES.observe(timings.count("db"), view)
+        for phase in PHASES:
+            if timings.count(phase):
+                REQUEST_PHASE.observe(timings.seconds(phase), view, phase)
+        flush_metrics()
+
+        if getattr(settings, "SERVER_TIMING_HEADER", True):
+            response["Server-Timing"] = server_timing_header(timings, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # rendered here (instead of by the handler right after) so it can be timed
+        with timed("template"):
+            response.render()
+        return response
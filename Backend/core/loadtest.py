@@ -0,0 +1,193 @@
+"""
+Shared helpers for the offline benchmark / load-test harnesses.
+
+- LatencyRecorder: thread-safe latency + query-count samples per endpoint label
+- run_concurrently: drive a worker function over items with N threads
+- temporary_test_database: run a benchmark against a throwaway copy of the schema
+- analyze_tables / seq_scanned_tables: EXPLAIN checks that hot queries stay on an index
+- compare_to_baseline: per-endpoint regressions of a report against a saved baseline
+"""
+import json
+import math
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, pct: float) -> float:
+    """
+    Nearest-rank percentile (pct in 0..100). Returns 0.0 for no samples.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+
+    def stop(self):
+        self.finished_at = time.perf_counter()
+
+    def record(self, label: str, elapsed_ms: float, queries: int = 0, ok: bool = True):
+        with self._lock:
+            row = self._samples.setdefault(label, {"latency_ms": [], "queries": [], "errors": 0})
+            row["latency_ms"].append(elapsed_ms)
+            row["queries"].append(queries)
+            if not ok:
+                row["errors"] += 1
+
+    @contextmanager
+    def measure(self, label: str):
+        """
+        Times the block and counts the queries it ran on this thread's connection.
+        The block may set result["ok"] = False to mark a failed request.
+        """
+        result = {"ok": True}
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            try:
+                yield result
+            except Exception:
+                result["ok"] = False
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.record(label, elapsed_ms, queries=len(ctx.captured_queries), ok=result["ok"])
+
+    def summary(self) -> dict:
+        wall = (self.finished_at or time.perf_counter()) - (self.started_at or time.perf_counter())
+        out = {}
+        with self._lock:
+            for label, row in self._samples.items():
+                latencies = row["latency_ms"]
+                count = len(latencies)
+                out[label] = {
+                    "count": count,
+                    "errors": row["errors"],
+                    "rps": round(count / wall, 2) if wall > 0 else 0.0,
+                    "p50_ms": round(percentile(latencies, 50), 2),
+                    "p95_ms": round(percentile(latencies, 95), 2),
+                    "p99_ms": round(percentile(latencies, 99), 2),
+                    "max_ms": round(max(latencies), 2) if latencies else 0.0,
+                    "queries_per_request": round(sum(row["queries"]) / count, 2) if count else 0.0,
+                }
+        return out
+
+
+def run_concurrently(worker, items, concurrency: int):
+    """
+    Runs worker(item) for every item on `concurrency` threads. Each thread keeps
+    its DB connection for its whole run (so connects are not timed per request)
+    and closes it at the end so the test database can be dropped afterwards.
+    Exceptions are collected and returned instead of stopping the run.
+    """
+    pending = queue.SimpleQueue()
+    for item in items:
+        pending.put(item)
+
+    errors = []
+    errors_lock = threading.Lock()
+
+    def _run():
+        try:
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    worker(item)
+                except Exception as e:
+                    with errors_lock:
+                        errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=_run, name=f"loadtest-{i}") for i in range(max(1, concurrency))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+@contextmanager
+def temporary_test_database(keepdb: bool = False, verbosity: int = 0):
+    """
+    Creates the test database (same as `manage.py test`), yields, then drops it.
+    Benchmarks never touch the real council data.
+    """
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity, keepdb=keepdb)
+
+
+def analyze_tables(*models):
+    """
+    Refreshes planner statistics after seeding, so EXPLAIN reflects the seeded volumes.
+    """
+    with connection.cursor() as cursor:
+        for model in models:
+            cursor.execute(f'ANALYZE "{model._meta.db_table}"')
+
+
+def seq_scanned_tables(queryset) -> set:
+    """
+    Tables the PostgreSQL plan for `queryset` reads with a (parallel) sequential scan.
+    Uses plain EXPLAIN, so the query is planned but not run.
+    """
+    plan = json.loads(queryset.explain(format="json"))
+    found = set()
+
+    def walk(node):
+        if node.get("Node Type") == "Seq Scan":
+            found.add(node.get("Relation Name"))
+        for child in node.get("Plans", []):
+            walk(child)
+
+    for entry in plan:
+        walk(entry["Plan"])
+    return found
+
+
+def compare_to_baseline(endpoints: dict, baseline: dict, tolerance: float = 0.2) -> list:
+    """
+    Compares LatencyRecorder.summary() rows with the same rows from a saved run.
+    Returns a message per regression: throughput down, p95 latency or queries per
+    request up by more than `tolerance` (0.2 = 20%), or new errors. Endpoints missing
+    from either side are skipped.
+    """
+    regressions = []
+    for label, base in baseline.items():
+        row = endpoints.get(label)
+        if not row:
+            continue
+        if base["rps"] and row["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{label}: rps {base['rps']} -> {row['rps']}")
+        if base["p95_ms"] and row["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {base['p95_ms']}ms -> {row['p95_ms']}ms")
+        if row["queries_per_request"] > base["queries_per_request"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: queries/request {base['queries_per_request']} -> {row['queries_per_request']}"
+            )
+        if row["errors"] > base["errors"]:
+            regressions.append(f"{label}: errors {base['errors']} -> {row['errors']}")
+    return regressions
@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.citizen_loadtest import parse_mix, run_citizen_benchmark
+from core.loadtest import compare_to_baseline, temporary_test_database
+
+# settings that must match for two runs to be comparable
+RUN_KEYS = ("citizens", "concurrency", "requests_per_citizen", "history", "mix", "seed")
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the citizen API with a mixed workload (complaints, payment history, dashboard, "
+        "login) against local SMTP and Stripe stand-ins. Runs in a throwaway test database. "
+        "--save-baseline / --baseline keep and compare a JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--citizens", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument("--requests", type=int, default=20, help="Requests per citizen.")
+        parser.add_argument("--history", type=int, default=3, help="Paid bills per citizen.")
+        parser.add_argument("--mix", default="", help='Endpoint weights, e.g. "payments=5,login=1".')
+        parser.add_argument("--smtp-latency-ms", type=float, default=0.0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--save-baseline", metavar="PATH", help="Write the report to PATH.")
+        parser.add_argument("--baseline", metavar="PATH", help="Compare with a saved report; exit 1 on regression.")
+        parser.add_argument("--tolerance", type=float, default=20.0, help="Allowed regression in percent.")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database between runs.")
+        parser.add_argument("--json", action="store_true", help="Print the raw report as JSON.")
+
+    def handle(self, *args, **opts):
+        if opts["citizens"] < 1 or opts["concurrency"] < 1 or opts["requests"] < 1:
+            raise CommandError("--citizens, --concurrency and --requests must be at least 1.")
+        try:
+            mix = parse_mix(opts["mix"]) if opts["mix"] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        baseline = None
+        if opts["baseline"]:
+            try:
+                baseline = json.loads(Path(opts["baseline"]).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline: {e}")
+
+        with temporary_test_database(keepdb=opts["keepdb"]):
+            report = run_citizen_benchmark(
+                citizens=opts["citizens"],
+                concurrency=opts["concurrency"],
+                requests_per_citizen=opts["requests"],
+                history=opts["history"],
+                mix=mix,
+                smtp_latency_ms=opts["smtp_latency_ms"],
+                seed=opts["seed"],
+            )
+
+        if opts["save_baseline"]:
+            path = Path(opts["save_baseline"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2) + "\n")
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print_report(report)
+
+        if baseline is not None:
+            self._compare(report, baseline, opts["tolerance"] / 100)
+
+    def _print_report(self, report):
+        self.stdout.write(
+            f"{report['citizens']} citizens x {report['concurrency']} threads, "
+            f"{report['requests_per_citizen']} requests each, {report['history']} paid bills each"
+        )
+        self.stdout.write(
+            f"Requests: {report['requests']} in {report['wall_seconds']}s ({report['requests_per_second']} req/s), "
+            f"emails sent: {report['smtp']['messages']}"
+        )
+        self.stdout.write(
+            f"{'endpoint':<18}{'count':>7}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        )
+        for label, row in report["endpoints"].items():
+            self.stdout.write(
+                f"{label:<18}{row['count']:>7}{row['errors']:>8}{row['rps']:>9}"
+                f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['queries_per_request']:>9}"
+            )
+        for err in report["exceptions"]:
+            self.stderr.write(err)
+
+    def _compare(self, report, baseline, tolerance):
+        differing = [key for key in RUN_KEYS if baseline.get(key) != report.get(key)]
+        if differing:
+            self.stderr.write(f"Baseline was run with different settings ({', '.join(differing)}); comparing anyway.")
+
+        regressions = compare_to_baseline(report["endpoints"], baseline.get("endpoints", {}), tolerance)
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(f"{len(regressions)} regression(s) against the baseline.")
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
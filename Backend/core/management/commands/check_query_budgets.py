@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import temporary_test_database
+from core.query_budget import BUDGET_FILE, ENDPOINTS, LARGE, SMALL, load_budgets, measure_sizes, write_budgets
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the SQL queries of every citizen/staff/admin GET endpoint at two data sizes "
+        "and compare them with core/query_budgets.json. Runs in a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoint", action="append", default=[], help="Only these labels (repeatable).")
+        parser.add_argument("--write", action="store_true", help="Rewrite the budget file with the measured counts.")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database between runs.")
+
+    def handle(self, *args, **opts):
+        endpoints = ENDPOINTS
+        if opts["endpoint"]:
+            unknown = set(opts["endpoint"]) - {e.label for e in ENDPOINTS}
+            if unknown:
+                raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+            endpoints = [e for e in ENDPOINTS if e.label in opts["endpoint"]]
+        if opts["write"] and opts["endpoint"]:
+            raise CommandError("--write measures every endpoint; drop --endpoint.")
+
+        with temporary_test_database(keepdb=opts["keepdb"]):
+            report = measure_sizes(endpoints=endpoints)
+
+        budgets = load_budgets()
+        failures = 0
+        self.stdout.write(f"{'endpoint':<32}{'status':>7}{f'{SMALL} rows':>9}{f'{LARGE} rows':>9}{'budget':>8}")
+        for endpoint in endpoints:
+            small_status, small = report[SMALL][endpoint.label]
+            status, large = report[LARGE][endpoint.label]
+            budget = budgets.get(endpoint.label)
+
+            problem = ""
+            if (small_status, status) != (200, 200):
+                problem = "  <- not 200"
+            elif small != large:
+                problem = "  <- grows with rows"
+            elif not opts["write"] and (budget is None or large > budget):
+                problem = "  <- over budget"
+            failures += bool(problem)
+            if not problem and not opts["write"] and large < budget:
+                problem = "  <- under budget (re-pin with --write)"
+
+            self.stdout.write(
+                f"{endpoint.label:<32}{status:>7}{small:>9}{large:>9}{budget if budget is not None else '-':>8}{problem}"
+            )
+
+        if opts["write"]:
+            if failures:
+                raise CommandError(f"{failures} endpoint(s) fail or grow with rows; budgets not written.")
+            write_budgets({label: queries for label, (_, queries) in report[LARGE].items()})
+            self.stdout.write(self.style.SUCCESS(f"Wrote {BUDGET_FILE}"))
+        elif failures:
+            raise CommandError(f"{failures} endpoint(s) over budget or not constant.")
@@ -0,0 +1,43 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from core.storage import orphaned_media
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete content-addressed media files that no row references any more "
+        "(run daily, e.g. cron `40 3 * * *`). Prints the files and bytes removed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours", type=float, default=24,
+            help="Only files last written longer ago than this (uploads whose row is not saved yet are younger).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="List what would be removed, delete nothing.")
+
+    def handle(self, *args, **opts):
+        if opts["grace_hours"] < 0:
+            raise CommandError("--grace-hours cannot be negative.")
+        if not getattr(default_storage, "content_addressed", False):
+            raise CommandError("The default storage is not core.storage.ContentAddressedStorage.")
+
+        removed = freed = 0
+        for name in orphaned_media(default_storage, opts["grace_hours"] * 3600):
+            full_path = default_storage.path(name)
+            try:
+                size = os.path.getsize(full_path)
+                if not opts["dry_run"]:
+                    os.remove(full_path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+            freed += size
+            if opts["verbosity"] > 1 or opts["dry_run"]:
+                self.stdout.write(f"  {name}")
+
+        verb = "Would remove" if opts["dry_run"] else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} orphaned media files ({freed / 1048576:.1f} MiB)."))
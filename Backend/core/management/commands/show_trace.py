@@ -0,0 +1,101 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ID_KEYS = ("payment_id", "bill_id", "complaint_id")
+
+
+def load_spans(path: str) -> list:
+    spans = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+    return spans
+
+
+class Command(BaseCommand):
+    help = (
+        "Print one trace as a tree (offsets, durations, ids), or list recent traces "
+        "when no trace id is given. Reads TRACING_FILE or --file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("trace_id", nargs="?")
+        parser.add_argument("--file", default=None)
+        parser.add_argument("--payment", type=int, help="List traces that touched this payment id.")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--no-queries", action="store_true", help="Fold db.query spans into a count.")
+
+    def handle(self, *args, **opts):
+        path = opts["file"] or getattr(settings, "TRACING_FILE", "traces.jsonl")
+        try:
+            spans = load_spans(path)
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+        if opts["trace_id"]:
+            trace = [s for s in spans if s["trace_id"] == opts["trace_id"]]
+            if not trace:
+                raise CommandError(f"No spans for trace {opts['trace_id']} in {path}.")
+            self._print_tree(trace, fold_queries=opts["no_queries"])
+        else:
+            self._print_list(spans, opts["payment"], opts["limit"])
+
+    def _print_list(self, spans, payment_id, limit):
+        by_trace = defaultdict(list)
+        for s in spans:
+            by_trace[s["trace_id"]].append(s)
+
+        rows = []
+        for trace_id, trace in by_trace.items():
+            if payment_id is not None and not any(s["attributes"].get("payment_id") == payment_id for s in trace):
+                continue
+            start = min(s["start_ns"] for s in trace)
+            end = max(s["end_ns"] for s in trace)
+            first = min(trace, key=lambda s: s["start_ns"])
+            rows.append((start, trace_id, first["name"], (end - start) / 1e6, len(trace)))
+
+        for start, trace_id, name, duration_ms, count in sorted(rows, reverse=True)[:limit]:
+            self.stdout.write(f"{trace_id}  {duration_ms:>9.1f}ms  {count:>5} spans  {name}")
+
+    def _print_tree(self, trace, fold_queries):
+        ids = {s["span_id"] for s in trace}
+        children = defaultdict(list)
+        roots = []
+        for s in sorted(trace, key=lambda s: s["start_ns"]):
+            if s["parent_id"] in ids:
+                children[s["parent_id"]].append(s)
+            else:
+                roots.append(s)
+        origin = min(s["start_ns"] for s in trace)
+
+        def describe(s):
+            attrs = s["attributes"]
+            extra = " ".join(f"{k}={attrs[k]}" for k in ID_KEYS if k in attrs)
+            if s["name"] == "db.query":
+                extra = (attrs.get("statement") or "")[:90]
+            if s["status"] == "error":
+                extra += f" ERROR {attrs.get('error', '')}"
+            return extra
+
+        def walk(s, depth):
+            offset_ms = (s["start_ns"] - origin) / 1e6
+            self.stdout.write(
+                f"{offset_ms:>9.1f}ms {s['duration_ms']:>9.1f}ms  {'  ' * depth}{s['name']}  {describe(s)}".rstrip()
+            )
+            kids = children[s["span_id"]]
+            if fold_queries:
+                queries = [k for k in kids if k["name"] == "db.query"]
+                if queries:
+                    total = sum(q["duration_ms"] for q in queries)
+                    self.stdout.write(f"{'':>11} {total:>9.1f}ms  {'  ' * (depth + 1)}db.query x{len(queries)}")
+                kids = [k for k in kids if k["name"] != "db.query"]
+            for kid in kids:
+                walk(kid, depth + 1)
+
+        for root in roots:
+            walk(root, 0)
@@ -0,0 +1,74 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from core.tracing import spans_from_otlp
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "TraceCollector/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status_code: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/traces":
+            return self._send(404, {"error": "Only /v1/traces is collected."})
+        if "json" not in self.headers.get("Content-Type", ""):
+            return self._send(415, {"error": "Send OTLP/HTTP JSON (application/json)."})
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            spans = spans_from_otlp(json.loads(self.rfile.read(length)))
+        except (ValueError, KeyError) as e:
+            return self._send(400, {"error": f"Malformed payload: {e}"})
+
+        self.server.write(spans)
+        self._send(200, {"partialSuccess": {}})
+
+
+class Command(BaseCommand):
+    help = (
+        "Local OTLP/HTTP collector stand-in: receives spans from TRACING_EXPORTER=otlp and appends "
+        "them as JSON lines for `manage.py show_trace`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=4318)
+        parser.add_argument("--out", default="traces.jsonl", help="JSON lines file to append to.")
+
+    def handle(self, *args, **opts):
+        lock = threading.Lock()
+        out = opts["out"]
+        stdout = self.stdout
+
+        def write(spans):
+            with lock, open(out, "a", encoding="utf-8") as fh:
+                for span in spans:
+                    fh.write(json.dumps(span) + "\n")
+            roots = [s for s in spans if not any(p["span_id"] == s["parent_id"] for p in spans)]
+            for root in roots:
+                stdout.write(f"{root['trace_id']}  {root['name']}  {root['duration_ms']}ms  ({len(spans)} spans)")
+
+        server = ThreadingHTTPServer((opts["host"], opts["port"]), _Handler)
+        server.daemon_threads = True
+        server.write = write
+
+        self.stdout.write(f"Collecting OTLP spans on http://{opts['host']}:{opts['port']}/v1/traces -> {out}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,177 @@
+"""
+Media downloads (MEDIA_URL) with ETag, 304 revalidation and byte ranges.
+
+Receipts, complaint evidence and profile pictures carry personal data, so every
+request must be allowed first:
+- a signed, unexpired link (?sig=, from default_storage.url(), core/storage.py), or
+- a logged-in staff/admin session (portal pages)
+Anything else gets 403. Responses are Cache-Control: private, so shared caches keep
+no copy.
+
+settings.MEDIA_SERVE_MODE picks who sends the bytes:
+- "x-accel": nginx. Django only answers with X-Accel-Redirect, nginx streams the file
+  (and handles Range) from an internal location, e.g.
+
+      location /protected-media/ {
+          internal;
+          alias /srv/ccrsms/uploads/;
+      }
+
+- "x-sendfile": Apache mod_xsendfile / lighttpd, same idea with the absolute path
+- "django" (default): streamed from Django, Range handled here. Development only,
+  like the static() fallback it replaces: with DEBUG off it answers 404
+
+Content-addressed names (core/storage.py) carry their sha256, which is used as the
+ETag without touching the file, and are marked immutable (in the browser cache).
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, HttpResponseForbidden, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from accounts.mixins import token_is_valid
+from .storage import content_hash, media_signature_valid
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def _etag_for(name: str, stat) -> tuple:
+    sha = content_hash(name)
+    if sha:
+        return f'"{sha}"', True
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', False
+
+
+def _etag_matches(request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match", "")
+    if header.strip() == "*":
+        return True
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+def _parse_range(header: str, size: int):
+    """
+    (start, end) inclusive for a single "bytes=" range, None to send the whole file,
+    or False when the range cannot be satisfied. Multi-range requests get the whole file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:  # suffix: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _file_chunks(path: str, start: int, length: int):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _may_read(request, path: str) -> bool:
+    token = request.GET.get("sig", "")
+    if token and media_signature_valid(path, token):
+        return True
+    # portal pages: staff and admin may open any file (same checks as KnoxSessionRequiredMixin)
+    token_key = request.session.get("staff_token_key")
+    if token_key and request.session.get("user_type") in ("STAFF", "ADMIN"):
+        return token_is_valid(token_key)
+    return False
+
+
+@require_safe
+def serve_media(request, path):
+    if not _may_read(request, path):
+        return HttpResponseForbidden("Forbidden", content_type="text/plain")
+
+    mode = getattr(settings, "MEDIA_SERVE_MODE", "django")
+    if mode == "django" and not settings.DEBUG:
+        # production sends media through the web server (x-accel / x-sendfile)
+        raise Http404("Not found.")
+
+    try:
+        full_path = default_storage.path(path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found.")
+
+    stat = os.stat(full_path)
+    etag, immutable = _etag_for(path, stat)
+    max_age = getattr(settings, "MEDIA_MAX_AGE", 3600)
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=31536000, immutable" if immutable else f"private, max-age={max_age}",
+    }
+
+    if _etag_matches(request, etag):
+        return HttpResponseNotModified(headers=headers)
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    download = request.GET.get("download", "").strip()
+    if download:
+        headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(os.path.basename(download))}"
+
+    if mode == "x-accel":
+        prefix = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/")
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(path)
+        return response
+    if mode == "x-sendfile":
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response["X-Sendfile"] = full_path
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if_range = request.headers.get("If-Range", "").strip()
+    if "Range" in request.headers and (not if_range or if_range == etag):
+        byte_range = _parse_range(request.headers["Range"], size)
+
+    if byte_range is False:
+        headers["Content-Range"] = f"bytes */{size}"
+        return HttpResponse(status=416, headers=headers)
+
+    if byte_range is None:
+        start, end, status = 0, size - 1, 200
+    else:
+        (start, end), status = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = max(end - start + 1, 0)
+    response = StreamingHttpResponse(
+        _file_chunks(full_path, start, length), status=status, content_type=content_type, headers=headers
+    )
+    response["Content-Length"] = str(length)
+    if request.method == "HEAD":
+        response.streaming_content = []
+    return response
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 14:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; tables stay writable meanwhile
+    atomic = False
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='complaint',
+            index=models.Index(fields=['status', '-created_at'], name='complaint_status_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='complaint',
+            index=models.Index(fields=['-created_at'], name='complaint_created_idx'),
+        ),
+    ]
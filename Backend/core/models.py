@@ -84,6 +84,14 @@ class Complaint(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # staff/admin lists filtered by status, newest first
+            models.Index(fields=["status", "-created_at"], name="complaint_status_created_idx"),
+            # admin list without filters (newest first, paginated)
+            models.Index(fields=["-created_at"], name="complaint_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.citizen.first_name}"
 
@@ -2,6 +2,9 @@ from django.conf import settings
 from django.core.mail import send_mail
 from django.contrib.auth import get_user_model
 
+from core.instrumentation import timed
+from core.tracing import traced
+
 User = get_user_model()
 
 
@@ -12,18 +15,20 @@ def _send_email(to_email: str, subject: str, message: str):
     if not to_email:
         return
 
-    send_mail(
-        subject,
-        message,
-        settings.EMAIL_HOST_USER,
-        [to_email],
-        fail_silently=False,
-    )
+    with timed("email"):
+        send_mail(
+            subject,
+            message,
+            settings.EMAIL_HOST_USER,
+            [to_email],
+            fail_silently=False,
+        )
 
 
 # -------------------------------------------------
 # CITIZEN NOTIFICATIONS
 # -------------------------------------------------
+@traced("notify.citizen_complaint_created", ids=("complaint",))
 def notify_citizen_complaint_created(complaint):
     """
     Complaint owner notification after creation
@@ -42,6 +47,7 @@ def notify_citizen_complaint_created(complaint):
     _send_email(citizen_user.email, subject, message)
 
 
+@traced("notify.citizen_complaint_updated", ids=("complaint",))
 def notify_citizen_complaint_updated(complaint, updated_by="SYSTEM"):
     """
     Notify citizen when their complaint is updated
@@ -78,6 +84,7 @@ def notify_citizen_complaint_deleted(citizen_user, complaint_title: str):
 # -------------------------------------------------
 # STAFF (WARD-BASED) NOTIFICATIONS
 # -------------------------------------------------
+@traced("notify.staff_complaint_created", ids=("complaint",))
 def notify_staff_complaint_created(complaint):
     """
     Notify STAFF users in the SAME ward as the citizen
@@ -108,6 +115,7 @@ def notify_staff_complaint_created(complaint):
         _send_email(staff_user.email, subject, message)
 
 
+@traced("notify.staff_complaint_updated", ids=("complaint",))
 def notify_staff_complaint_updated(complaint, updated_by="CITIZEN"):
     """
     Notify STAFF users when a complaint in their ward is updated
@@ -0,0 +1,44 @@
+"""
+Process pools for management commands (e.g. `manage.py regenerate_receipts`).
+
+django_process_pool() uses the platform's default start method: fork on Linux,
+spawn on Windows and macOS. A spawned worker is a fresh interpreter, so the pool
+initializer (init_django_worker, kept in this import-light module so it can be
+unpickled before Django is loaded) points it at the parent's settings and runs
+django.setup(). Settings overridden at runtime in the parent are not carried over.
+
+Returns None when worker processes cannot be started here; callers then do the work
+in their own process.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def init_django_worker(settings_module: str):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def django_process_pool(workers: int):
+    from django.conf import settings
+    from django.db import connections
+
+    # forked workers must open their own connections, not share the parent's sockets
+    connections.close_all()
+    settings_module = os.environ.get("DJANGO_SETTINGS_MODULE") or settings.SETTINGS_MODULE
+    try:
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(),
+            initializer=init_django_worker,
+            initargs=(settings_module,),
+        )
+    except (OSError, NotImplementedError, ValueError) as e:
+        print("[PROCESS POOL ERROR] workers unavailable, running serially:", e)
+        return None
@@ -0,0 +1,249 @@
+"""
+Per-endpoint query budgets (N+1 guard).
+
+Every GET endpoint the citizen app, staff portal and admin portal use is requested
+against two seeded data sets of different sizes. The number of SQL queries a request
+runs must not depend on how many rows it shows, and must stay within the budget checked
+in at core/query_budgets.json.
+
+Used by core/tests.py (QueryBudgetTests) and `manage.py check_query_budgets`, which
+also rewrites the budget file after an intended change (--write).
+"""
+import json
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from knox.models import AuthToken
+
+from accounts.models import StaffProfile, Ward
+from billing.models import (
+    Bill,
+    BillStatus,
+    Business,
+    BusinessCategory,
+    BusinessLicenseDemandNotice,
+    Payment,
+    PaymentStatus,
+    ServiceType,
+)
+from .models import Complaint, ComplaintCategory
+
+User = get_user_model()
+
+BUDGET_FILE = Path(__file__).with_name("query_budgets.json")
+
+# rows per list in each data set; both stay under one page of the batched exports
+SMALL = 3
+LARGE = 25
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    label: str
+    role: str  # "citizen" (knox token), "staff" / "admin" (portal session)
+    url: str   # formatted with the seeded ids
+
+
+ENDPOINTS = [
+    # citizen app (React, /api + DRF routers)
+    Endpoint("citizen:wards", "citizen", "/api/wards/"),
+    Endpoint("citizen:complaint-categories", "citizen", "/core/complaint-categories/"),
+    Endpoint("citizen:complaints", "citizen", "/core/citizens/complaints/"),
+    Endpoint("citizen:complaint-detail", "citizen", "/core/citizens/complaints/{complaint}/"),
+    Endpoint("citizen:payments", "citizen", "/billing/payments/"),
+    Endpoint("citizen:payment-detail", "citizen", "/billing/payments/{payment}/"),
+    Endpoint("citizen:payment-stats", "citizen", "/billing/payments/stats/"),
+    Endpoint("citizen:payment-recent", "citizen", "/billing/payments/recent/"),
+    Endpoint("citizen:bills", "citizen", "/billing/payments/bills/"),
+    Endpoint("citizen:waste-plans", "citizen", "/billing/waste-collection/plans/"),
+    Endpoint("citizen:businesses", "citizen", "/billing/citizens/businesses/"),
+    Endpoint("citizen:business-detail", "citizen", "/billing/citizens/businesses/{business}/"),
+    Endpoint("citizen:notices", "citizen", "/billing/citizens/business-license/notices/"),
+    Endpoint("citizen:notice-detail", "citizen", "/billing/citizens/business-license/notices/{notice}/"),
+
+    # staff portal (ward scoped)
+    Endpoint("staff:dashboard", "staff", "/staff/dashboard/"),
+    Endpoint("staff:complaints", "staff", "/core/staff/complaints/"),
+    Endpoint("staff:complaint-detail", "staff", "/core/staff/complaints/{complaint}/"),
+    Endpoint("staff:complaint-update", "staff", "/core/staff/complaints/{complaint}/update/"),
+    Endpoint("staff:complaints-geojson", "staff", "/core/staff/complaints.geojson"),
+    Endpoint("staff:payments", "staff", "/billing/staff/payments/"),
+    Endpoint("staff:payment-detail", "staff", "/billing/staff/payments/{payment}/"),
+    Endpoint("staff:bills", "staff", "/billing/staff/bills/"),
+    Endpoint("staff:bill-detail", "staff", "/billing/staff/bills/{bill}/"),
+    Endpoint("staff:notices", "staff", "/billing/staff/business-license/notices/"),
+    Endpoint("staff:notice-detail", "staff", "/billing/staff/business-license/notices/{notice}/"),
+    Endpoint("staff:notice-update", "staff", "/billing/staff/business-license/notices/{notice}/update/"),
+
+    # admin portal (all wards)
+    Endpoint("admin:dashboard", "admin", "/council/admin/dashboard/"),
+    Endpoint("admin:complaints", "admin", "/core/admin/complaints/"),
+    Endpoint("admin:complaint-detail", "admin", "/core/admin/complaints/{complaint}/"),
+    Endpoint("admin:complaint-update", "admin", "/core/admin/complaints/{complaint}/update/"),
+    Endpoint("admin:complaint-delete", "admin", "/core/admin/complaints/{complaint}/delete/"),
+    Endpoint("admin:complaints-geojson", "admin", "/core/admin/complaints.geojson"),
+    Endpoint("admin:complaints-export", "admin", "/core/admin/complaints/export/?output=xlsx"),
+    Endpoint("admin:ward-counts", "admin", "/core/admin/analytics/ward-counts/"),
+    Endpoint("admin:category-counts", "admin", "/core/admin/analytics/category-counts/"),
+    Endpoint("admin:daily-counts", "admin", "/core/admin/analytics/daily-counts/"),
+    Endpoint("admin:payments", "admin", "/billing/admin/payments/"),
+    Endpoint("admin:payment-detail", "admin", "/billing/admin/payments/{payment}/"),
+    Endpoint("admin:payments-export", "admin", "/billing/admin/payments/export/"),
+    Endpoint("admin:receipts-zip", "admin", "/billing/admin/payments/receipts.zip?ward={ward}"),
+    Endpoint("admin:bills", "admin", "/billing/admin/bills/"),
+    Endpoint("admin:bill-detail", "admin", "/billing/admin/bills/{bill}/"),
+    Endpoint("admin:bills-export", "admin", "/billing/admin/bills/export/"),
+    Endpoint("admin:notices", "admin", "/billing/admin/business-license/notices/"),
+    Endpoint("admin:notice-detail", "admin", "/billing/admin/business-license/notices/{notice}/"),
+    Endpoint("admin:notice-update", "admin", "/billing/admin/business-license/notices/{notice}/update/"),
+]
+
+
+def load_budgets() -> dict:
+    with open(BUDGET_FILE, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def write_budgets(counts: dict):
+    with open(BUDGET_FILE, "w", encoding="utf-8") as fh:
+        json.dump(dict(sorted(counts.items())), fh, indent=2)
+        fh.write("\n")
+
+
+# ----------------------------
+# SEED DATA
+# ----------------------------
+def seed(size: int, label: str) -> dict:
+    """
+    One ward with a citizen who owns `size` complaints, bills (each with a payment),
+    businesses and demand notices, plus a staff member of that ward and an admin.
+    Returns the users and the ids the endpoint urls need.
+    """
+    now = timezone.now()
+    ward = Ward.objects.create(name=f"{label.title()} Ward")
+    citizen, staff, admin = User.objects.bulk_create([
+        User(email=f"{label}-citizen@budget.local", first_name="Budget", last_name="Citizen",
+             user_type="CITIZEN", ward=ward, password=make_password(None)),
+        User(email=f"{label}-staff@budget.local", first_name="Budget", last_name="Staff",
+             user_type="STAFF", ward=ward, password=make_password(None)),
+        User(email=f"{label}-admin@budget.local", first_name="Budget", last_name="Admin",
+             user_type="ADMIN", password=make_password(None)),
+    ])
+    StaffProfile.objects.create(user=staff, role="FIELD_OFFICER")
+
+    category = ComplaintCategory.objects.create(category_name=f"{label.title()} Drainage")
+    complaints = Complaint.objects.bulk_create(
+        Complaint(
+            citizen=citizen, category=category, title=f"Blocked drain #{i}", description="Blocked drain",
+            location=Point(-13.23 + i / 1000, 8.48), street_name="Siaka Stevens Street",
+            created_at=now - timedelta(hours=i),
+        )
+        for i in range(size)
+    )
+
+    bills = Bill.objects.bulk_create(
+        Bill(
+            user=citizen, service_type=ServiceType.CITY_RATE, period_year=2000 + i,
+            amount_due=Decimal("300.00"), amount_paid=Decimal("300.00"), status=BillStatus.PAID,
+            created_at=now - timedelta(days=i),
+        )
+        for i in range(size)
+    )
+    payments = Payment.objects.bulk_create(
+        Payment(
+            bill=bill, amount=bill.amount_due, status=PaymentStatus.PAID,
+            paid_at=bill.created_at, created_at=bill.created_at,
+        )
+        for bill in bills
+    )
+
+    businesses = Business.objects.bulk_create(
+        Business(owner=citizen, business_name=f"{label.title()} Shop {i}", category=BusinessCategory.HOSPITALITY, ward=ward)
+        for i in range(size)
+    )
+    notices = BusinessLicenseDemandNotice.objects.bulk_create(
+        BusinessLicenseDemandNotice(
+            owner=citizen, business=business, notice_number=f"FCC-RDN-{label}-{i}",
+            license_year=now.year, amount_due=Decimal("500.00"),
+        )
+        for i, business in enumerate(businesses)
+    )
+
+    return {
+        "users": {"citizen": citizen, "staff": staff, "admin": admin},
+        "ids": {
+            "ward": ward.pk,
+            "complaint": complaints[0].pk,
+            "bill": bills[0].pk,
+            "payment": payments[0].pk,
+            "business": businesses[0].pk,
+            "notice": notices[0].pk,
+        },
+    }
+
+
+# ----------------------------
+# MEASURE
+# ----------------------------
+def _clients(users: dict) -> dict:
+    citizen = Client(HTTP_AUTHORIZATION=f"Token {AuthToken.objects.create(users['citizen'])[1]}")
+
+    portal = {}
+    for role in ("staff", "admin"):
+        user = users[role]
+        client = Client()
+        session = client.session
+        session["staff_user_id"] = user.id
+        session["staff_token_key"] = AuthToken.objects.create(user)[0].token_key
+        session["user_type"] = user.user_type
+        session.save()
+        portal[role] = client
+
+    return {"citizen": citizen, **portal}
+
+
+def _get(client, url):
+    response = client.get(url)
+    if response.streaming:
+        b"".join(response.streaming_content)  # streamed exports query while they stream
+    return response
+
+
+def measure(data: dict, endpoints=ENDPOINTS) -> dict:
+    """
+    {label: (status_code, queries)} for one seeded data set. Each endpoint is requested
+    once beforehand, so per-process caches (reference lists, waste mapping) are warm
+    and only the per-request cost is counted.
+    """
+    clients = _clients(data["users"])
+    results = {}
+    for endpoint in endpoints:
+        client = clients[endpoint.role]
+        url = endpoint.url.format(**data["ids"])
+        _get(client, url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = _get(client, url)
+        results[endpoint.label] = (response.status_code, len(ctx.captured_queries))
+    return results
+
+
+def measure_sizes(sizes=(SMALL, LARGE), endpoints=ENDPOINTS) -> dict:
+    """
+    Measures each size against its own data set, rolled back afterwards so the
+    sizes do not see each other's rows. Returns {size: {label: (status, queries)}}.
+    """
+    report = {}
+    for size in sizes:
+        with transaction.atomic():
+            report[size] = measure(seed(size, f"budget{size}"), endpoints)
+            transaction.set_rollback(True)
+    return report
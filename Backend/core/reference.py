@@ -0,0 +1,138 @@
+"""
+Reference data served to every app screen (wards, complaint categories, waste plans).
+
+Each list is built once per process and kept with a strong ETag (sha1 of its JSON).
+Apps register a builder plus the models it depends on (in their signals.py);
+a save/delete on any of those models:
+- drops the list in this process immediately
+- bumps a version token in the shared cache on commit, which other workers
+  compare against at most every REFERENCE_DATA_CHECK_SECONDS (the cache must be
+  shared between workers, core/checks.py)
+
+reference_response() answers If-None-Match with 304 and sets Cache-Control,
+so clients revalidate cheaply instead of re-downloading.
+"""
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+class ReferenceEntry:
+    def __init__(self, data, etag: str, version):
+        self.data = data
+        self.etag = etag
+        self.version = version
+        self.checked_at = time.monotonic()
+
+
+_builders = {}
+_entries = {}
+_lock = threading.Lock()
+
+
+def _version_key(name: str) -> str:
+    return f"core:reference:{name}:version"
+
+
+def register(name: str, build, models=()):
+    """
+    build() returns JSON-serializable data. Any save/delete on `models` invalidates it.
+    """
+    _builders[name] = build
+
+    def _invalidate(sender, **kwargs):
+        invalidate(name)
+
+    for model in models:
+        uid = f"reference_{name}_{model._meta.label_lower}"
+        post_save.connect(_invalidate, sender=model, weak=False, dispatch_uid=f"{uid}_save")
+        post_delete.connect(_invalidate, sender=model, weak=False, dispatch_uid=f"{uid}_delete")
+
+
+def _shared_version(name: str):
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get(name: str) -> ReferenceEntry:
+    check_every = getattr(settings, "REFERENCE_DATA_CHECK_SECONDS", 5)
+
+    entry = _entries.get(name)
+    if entry is not None and time.monotonic() - entry.checked_at < check_every:
+        return entry
+
+    with _lock:
+        version = _shared_version(name)
+        entry = _entries.get(name)
+        if entry is not None and entry.version == version:
+            entry.checked_at = time.monotonic()
+            return entry
+
+        data = _builders[name]()
+        etag = '"%s"' % hashlib.sha1(JSONRenderer().render(data)).hexdigest()
+        entry = ReferenceEntry(data, etag, version)
+        _entries[name] = entry
+        return entry
+
+
+def _bump_shared_version(name: str):
+    cache.set(_version_key(name), uuid.uuid4().hex, timeout=None)
+    _entries.pop(name, None)
+
+
+def invalidate(name: str):
+    _entries.pop(name, None)
+    transaction.on_commit(lambda: _bump_shared_version(name))
+
+
+def reset():
+    """
+    Drops every list cached in this process (tests: rollbacks send no signals).
+    """
+    _entries.clear()
+
+
+def _etag_matches(request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match", "")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # weak comparison is fine for GET revalidation (proxies may add W/)
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def reference_response(request, name: str) -> Response:
+    entry = get(name)
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": f"public, max-age={getattr(settings, 'REFERENCE_DATA_MAX_AGE', 300)}",
+        "Vary": "Accept",
+    }
+
+    if _etag_matches(request, entry.etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(entry.data, status=status.HTTP_200_OK, headers=headers)
+
+
+class ReferenceListMixin:
+    """
+    For ReadOnlyModelViewSets: list() is served from the reference cache under `reference_name`.
+    """
+    reference_name = None
+
+    def list(self, request, *args, **kwargs):
+        return reference_response(request, self.reference_name)
@@ -0,0 +1,13 @@
+from . import reference
+from .models import ComplaintCategory
+
+
+# ----------------------------
+# REFERENCE DATA (core/reference.py)
+# ----------------------------
+def _build_complaint_categories():
+    from .serializers import ComplaintCategorySerializer
+    return ComplaintCategorySerializer(ComplaintCategory.objects.order_by("category_name"), many=True).data
+
+
+reference.register("complaint_categories", _build_complaint_categories, models=[ComplaintCategory])
@@ -0,0 +1,162 @@
+"""
+Content-addressed media storage (settings.STORAGES["default"]).
+
+A saved file is named after the sha256 of its bytes and sharded two levels deep under
+its upload_to directory:
+
+    receipts/local_tax_receipt_42.pdf  ->  receipts/3f/a9/3fa9...e1.pdf
+
+- identical uploads (the same evidence photo sent twice, a regenerated receipt that did
+  not change) are stored once
+- no directory holds more than a few dozen entries even at millions of files
+- the name never changes meaning, so it doubles as a strong ETag and the file can be
+  cached forever (core/media.py)
+
+url() returns a signed link that expires after MEDIA_URL_MAX_AGE: only views that
+already decided the viewer may see a file (the owner's API responses, staff and admin
+pages) hand out working links, and core/media.py refuses unsigned ones.
+
+Files written before this storage (flat names such as receipts/local_tax_receipt_34.pdf)
+keep working unchanged.
+
+Because one hashed file can back several rows, delete() leaves hashed files alone;
+`manage.py purge_orphan_media` (daily) removes the ones no FileField references any
+more, once they are older than a grace period. A save that deduplicates onto an
+existing file refreshes its mtime, so a file being reused is never swept mid-upload.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+
+HASH_NAME_RE = re.compile(r"(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60})(\.[A-Za-z0-9]+)?$")
+
+READ_CHUNK_SIZE = 64 * 1024
+
+URL_SIGNATURE_SALT = "core.storage.media-url"
+
+
+def content_hash(name: str):
+    """
+    The sha256 a content-addressed name was built from, or None for a legacy name.
+    """
+    match = HASH_NAME_RE.search(name or "")
+    return match.group(3) if match else None
+
+
+def sign_media_name(name: str) -> str:
+    """
+    The ?sig= token for a media link: timestamp + HMAC of the name (SECRET_KEY).
+    """
+    signed = signing.TimestampSigner(salt=URL_SIGNATURE_SALT).sign(name)
+    return signed[len(name) + 1:]
+
+
+def media_signature_valid(name: str, token: str) -> bool:
+    max_age = getattr(settings, "MEDIA_URL_MAX_AGE", 3600)
+    try:
+        return signing.TimestampSigner(salt=URL_SIGNATURE_SALT).unsign(f"{name}:{token}", max_age=max_age) == name
+    except signing.BadSignature:  # includes SignatureExpired
+        return False
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    content_addressed = True
+
+    def get_available_name(self, name, max_length=None):
+        # _save() decides the final name from the content; equal content means the same file
+        return name
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        ext = os.path.splitext(basename)[1].lower()
+
+        tmp_dir = os.path.join(self.location, ".incoming")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks(READ_CHUNK_SIZE):
+                    digest.update(chunk)
+                    fh.write(chunk)
+
+            sha = digest.hexdigest()
+            final_name = "/".join(p for p in (directory, sha[:2], sha[2:4], sha + ext) if p)
+            final_path = self.path(final_name)
+
+            if os.path.exists(final_path):
+                os.remove(tmp_path)  # deduplicated
+                os.utime(final_path)  # in use again: keep it out of purge_orphan_media
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                if self.directory_permissions_mode is not None:
+                    os.chmod(os.path.dirname(final_path), self.directory_permissions_mode)
+                os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+                os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return final_name
+
+    def url(self, name):
+        return f"{super().url(name)}?sig={sign_media_name(name)}"
+
+    def delete(self, name):
+        # content-addressed files may back several rows; only legacy names are removed
+        # here, unreferenced hashed files are left to purge_orphan_media
+        if content_hash(name):
+            return
+        super().delete(name)
+
+
+# ----------------------------
+# ORPHAN CLEANUP
+# ----------------------------
+def referenced_media_names() -> set:
+    """
+    Every name stored in a FileField (receipts, evidence, profile pictures, ...).
+    """
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                names.update(
+                    model._default_manager.exclude(**{f"{field.attname}__isnull": True})
+                    .exclude(**{field.attname: ""})
+                    .values_list(field.attname, flat=True)
+                    .iterator(chunk_size=2000)
+                )
+    return names
+
+
+def orphaned_media(storage, grace_seconds: float):
+    """
+    Generator: content-addressed names under `storage` that no row references and
+    that were last written more than `grace_seconds` ago, plus abandoned .incoming
+    temp files of the same age.
+    """
+    referenced = referenced_media_names()
+    cutoff = time.time() - grace_seconds
+
+    for root, dirs, files in os.walk(storage.location):
+        for filename in files:
+            full_path = os.path.join(root, filename)
+            name = os.path.relpath(full_path, storage.location).replace(os.sep, "/")
+            if name.startswith(".incoming/") or (content_hash(name) and name not in referenced):
+                try:
+                    if os.path.getmtime(full_path) < cutoff:
+                        yield name
+                except FileNotFoundError:
+                    continue
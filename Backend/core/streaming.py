@@ -0,0 +1,74 @@
+"""
+Streaming ZIP archives for StreamingHttpResponse.
+
+zip_stream() writes through the standard zipfile module into a non-seekable sink and
+yields the bytes as soon as they are produced, so an archive of any size is sent while
+it is built and only one chunk is held in memory. Entries use data descriptors and
+ZIP64, which every current unzip tool understands.
+"""
+import io
+import time
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, non-seekable target: zipfile then streams instead of seeking back."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class ZipEntry:
+    """
+    One archive member. `chunks` is an iterable of bytes, consumed lazily while streaming.
+    Already-compressed content (PDF, images) should be stored, not deflated again.
+    """
+
+    def __init__(self, name: str, chunks, compress: bool = True, date_time=None):
+        self.name = name
+        self.chunks = chunks
+        self.compress = compress
+        self.date_time = date_time or time.localtime(time.time())[:6]
+
+
+def zip_stream(entries):
+    """
+    Yields the bytes of a ZIP archive containing `entries` (an iterable of ZipEntry,
+    which may itself be a generator).
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, mode="w") as archive:
+        for entry in entries:
+            info = zipfile.ZipInfo(entry.name, date_time=entry.date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED if entry.compress else zipfile.ZIP_STORED
+            with archive.open(info, mode="w", force_zip64=True) as member:
+                for chunk in entry.chunks:
+                    member.write(chunk)
+                    if sink.pending >= CHUNK_SIZE:
+                        yield sink.drain()
+            if sink.pending:
+                yield sink.drain()
+    yield sink.drain()
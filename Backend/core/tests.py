@@ -1,3 +1,372 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import ThreadingHTTPServer
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import Point
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings, tag
+from django.utils import timezone
+from knox.models import AuthToken
+
+from . import reference
+from .checks import check_shared_cache, require_shared_cache
+from .citizen_loadtest import run_citizen_benchmark
+from .instrumentation import REQUEST_QUERIES, Histogram
+from .loadtest import analyze_tables, compare_to_baseline, seq_scanned_tables
+from .query_budget import LARGE, SMALL, load_budgets, measure_sizes
+from .management.commands.trace_collector import _Handler as CollectorHandler
+from .tracing import continue_trace, flush_spans, inject, otlp_payload, set_span_ids, span, spans_from_otlp
+from .models import Complaint, ComplaintCategory
 
 # Create your tests here.
+
+
+class ReferenceDataCachingTests(TestCase):
+
+    def setUp(self):
+        reference.reset()
+        ComplaintCategory.objects.create(category_name="Drainage")
+
+    def test_list_is_served_with_etag_and_revalidates_to_304(self):
+        first = self.client.get("/core/complaint-categories/")
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("max-age=", first["Cache-Control"])
+
+        with self.assertNumQueries(0):
+            again = self.client.get("/core/complaint-categories/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+    def test_saving_a_category_changes_the_etag(self):
+        before = self.client.get("/core/complaint-categories/")["ETag"]
+        ComplaintCategory.objects.create(category_name="Street Lights")
+
+        after = self.client.get("/core/complaint-categories/", HTTP_IF_NONE_MATCH=before)
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after["ETag"], before)
+        self.assertEqual(len(after.json()), 2)
+
+
+class ContentAddressedMediaTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, MEDIA_SERVE_MODE="django")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_identical_uploads_share_one_sharded_file(self):
+        first = default_storage.save("evidence/photo_a.jpg", ContentFile(b"same bytes"))
+        second = default_storage.save("evidence/photo_b.JPG", ContentFile(b"same bytes"))
+
+        self.assertEqual(first, second)
+        self.assertRegex(first, r"^evidence/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        default_storage.delete(first)
+        self.assertTrue(default_storage.exists(second))
+
+    def test_orphaned_files_are_purged_after_the_grace_period(self):
+        kept = default_storage.save("evidence/kept.jpg", ContentFile(b"still attached"))
+        orphan = default_storage.save("evidence/orphan.jpg", ContentFile(b"row was deleted"))
+        fresh = default_storage.save("evidence/fresh.jpg", ContentFile(b"row not saved yet"))
+        Complaint.objects.create(
+            citizen=get_user_model().objects.create_user(email="reporter@fcc.local", phone_number=None),
+            category=ComplaintCategory.objects.create(category_name="Illegal Dumping"),
+            title="Dumping", description="Rubbish by the road", location=Point(-13.23, 8.48),
+            evidence_image=kept,
+        )
+        day_ago = timezone.now().timestamp() - 2 * 86400
+        for name in (kept, orphan):
+            os.utime(default_storage.path(name), (day_ago, day_ago))
+
+        out = StringIO()
+        call_command("purge_orphan_media", stdout=out)
+
+        self.assertIn("Removed 1 orphaned media files", out.getvalue())
+        self.assertTrue(default_storage.exists(kept))
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(fresh))
+
+    @override_settings(DEBUG=True)
+    def test_media_is_served_with_etag_and_ranges(self):
+        name = default_storage.save("receipts/r.pdf", ContentFile(b"0123456789"))
+        url = default_storage.url(name)
+
+        full = self.client.get(url)
+        self.assertEqual(b"".join(full.streaming_content), b"0123456789")
+        self.assertEqual(full["Cache-Control"], "private, max-age=31536000, immutable")
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=full["ETag"]).status_code, 304)
+
+        part = self.client.get(url, HTTP_RANGE="bytes=2-4")
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(part["Content-Range"], "bytes 2-4/10")
+        self.assertEqual(b"".join(part.streaming_content), b"234")
+
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=20-").status_code, 416)
+
+    @override_settings(DEBUG=True)
+    def test_media_needs_a_valid_signature_or_staff_session(self):
+        name = default_storage.save("receipts/r.pdf", ContentFile(b"pdf"))
+        self.assertEqual(self.client.get(f"/media/{name}").status_code, 403)
+        self.assertEqual(self.client.get(f"/media/{name}?sig=forged").status_code, 403)
+
+        other = default_storage.save("receipts/other.pdf", ContentFile(b"other"))
+        other_sig = default_storage.url(other).split("?sig=")[1]
+        self.assertEqual(self.client.get(f"/media/{name}?sig={other_sig}").status_code, 403)
+
+        with override_settings(MEDIA_URL_MAX_AGE=-1):
+            self.assertEqual(self.client.get(default_storage.url(name)).status_code, 403)
+
+        staff = get_user_model().objects.create_user(email="clerk@fcc.local", phone_number=None, user_type="STAFF")
+        session = self.client.session
+        session["staff_user_id"] = staff.id
+        session["staff_token_key"] = AuthToken.objects.create(staff)[0].token_key
+        session["user_type"] = "STAFF"
+        session.save()
+        self.assertEqual(self.client.get(f"/media/{name}").status_code, 200)
+
+    def test_django_streaming_is_development_only(self):
+        name = default_storage.save("receipts/r.pdf", ContentFile(b"pdf"))
+        self.assertEqual(self.client.get(default_storage.url(name)).status_code, 404)
+
+    @override_settings(MEDIA_SERVE_MODE="x-accel", MEDIA_ACCEL_PREFIX="/protected-media/")
+    def test_x_accel_hands_off_to_web_server(self):
+        name = default_storage.save("receipts/r.pdf", ContentFile(b"pdf"))
+        resp = self.client.get(default_storage.url(name))
+        self.assertEqual(resp["X-Accel-Redirect"], f"/protected-media/{name}")
+        self.assertTrue(resp["Cache-Control"].startswith("private"))
+        self.assertEqual(resp.content, b"")
+
+
+class SharedCacheCheckTests(TestCase):
+    locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    shared = {"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "cache_table"}}
+
+    def test_locmem_is_rejected_with_several_workers(self):
+        with override_settings(CACHES=self.locmem, WEB_WORKERS=4):
+            self.assertEqual([e.id for e in check_shared_cache()], ["core.E001"])
+            with self.assertRaises(ImproperlyConfigured):
+                require_shared_cache()
+
+        with override_settings(CACHES=self.locmem, WEB_WORKERS=1):
+            self.assertEqual(check_shared_cache(), [])
+        with override_settings(CACHES=self.shared, WEB_WORKERS=4):
+            self.assertEqual(check_shared_cache(), [])
+            require_shared_cache()
+
+
+class ComplaintIndexTests(TestCase):
+    """
+    Staff/admin complaint lists must stay on an index at realistic volumes (EXPLAIN only).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        citizens = User.objects.bulk_create(
+            User(email=f"reporter{i}@volume.local", password="!") for i in range(200)
+        )
+        category = ComplaintCategory.objects.create(category_name="Blocked Drain")
+        now = timezone.now()
+        statuses = ["RESOLVED"] * 16 + ["IN_PROGRESS"] * 2 + ["ACKNOWLEDGED", "SUBMITTED"]
+
+        Complaint.objects.bulk_create(
+            Complaint(
+                citizen=citizens[i % len(citizens)],
+                category=category,
+                title=f"Drain #{i}",
+                description="Blocked drain",
+                location=Point(-13.23, 8.48),
+                status=statuses[i % len(statuses)],
+                created_at=now - timedelta(hours=i),
+            )
+            for i in range(20000)
+        )
+        analyze_tables(Complaint)
+
+    def assertIndexed(self, queryset):
+        self.assertNotIn(Complaint._meta.db_table, seq_scanned_tables(queryset), str(queryset.query))
+
+    def test_status_filtered_list(self):
+        self.assertIndexed(Complaint.objects.filter(status="SUBMITTED").order_by("-created_at")[:10])
+
+    def test_unfiltered_admin_list(self):
+        self.assertIndexed(Complaint.objects.select_related("category", "citizen").order_by("-created_at")[:10])
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every GET endpoint runs the same number of queries for 3 rows as for 25 (no N+1),
+    within its budget in core/query_budgets.json (`manage.py check_query_budgets`).
+    """
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        budgets = load_budgets()
+        report = measure_sizes()
+
+        for label, (status, queries) in report[LARGE].items():
+            with self.subTest(endpoint=label):
+                small_status, small_queries = report[SMALL][label]
+                self.assertEqual((small_status, status), (200, 200))
+                self.assertEqual(queries, small_queries, f"{label}: {small_queries} -> {queries} queries")
+                self.assertLessEqual(queries, budgets[label])
+
+
+@tag("benchmark")
+class CitizenLoadHarnessTests(TransactionTestCase):
+    """
+    Runs the mixed citizen workload against the local SMTP/Stripe stand-ins (no network).
+    """
+
+    def test_mixed_workload_completes_offline(self):
+        mix = {"complaint-create": 1, "payments": 1, "payment-stats": 1, "login": 1}
+        report = run_citizen_benchmark(citizens=4, concurrency=2, requests_per_citizen=8, history=2, mix=mix)
+
+        self.assertEqual(report["requests"], 32)
+        self.assertEqual(report["exceptions"], [])
+        for label, row in report["endpoints"].items():
+            self.assertEqual(row["errors"], 0, label)
+        # citizen + the ward's two staff members for every complaint
+        created = report["endpoints"]["complaint-create"]["count"]
+        self.assertEqual(report["smtp"]["messages"], created * 3)
+        self.assertEqual(Complaint.objects.count(), created)
+
+    def test_baseline_comparison_flags_regressions(self):
+        base = {"rps": 100.0, "p95_ms": 20.0, "queries_per_request": 4.0, "errors": 0}
+        same = dict(base, rps=95.0, p95_ms=22.0)
+        slower = dict(base, rps=60.0, p95_ms=40.0, queries_per_request=9.0)
+
+        self.assertEqual(compare_to_baseline({"payments": same}, {"payments": base}), [])
+        self.assertEqual(len(compare_to_baseline({"payments": slower}, {"payments": base})), 3)
+
+
+class ServerTimingTests(TestCase):
+
+    def test_server_timing_header_splits_phases(self):
+        resp = self.client.get("/core/admin/analytics/ward-counts/")
+
+        header = resp["Server-Timing"]
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ quer')
+        self.assertRegex(header, r"total;dur=[\d.]+$")
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_requires_the_token(self):
+        REQUEST_QUERIES.reset()
+        self.client.get("/core/admin/analytics/ward-counts/")
+
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        resp = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret")
+
+        body = resp.content.decode()
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("# TYPE ccrsms_http_request_duration_seconds histogram", body)
+        self.assertIn('ccrsms_http_request_db_queries_count{view="admin_agg_ward_counts"} 1', body)
+
+    def test_histograms_add_up_across_workers(self):
+        # two instances of one histogram stand for the same metric in two processes
+        workers = [Histogram("ccrsms_test_seconds", "Test.", labels=("view",)) for _ in range(2)]
+        workers[0].reset()
+        workers[0].observe(0.02, "a")
+        workers[1].observe(0.3, "a")
+        workers[1].observe(0.3, "b")
+        for worker in workers:
+            worker.flush()
+
+        for worker in workers:
+            text = "\n".join(worker.expose())
+            self.assertIn('ccrsms_test_seconds_bucket{view="a",le="0.025"} 1', text)
+            self.assertIn('ccrsms_test_seconds_count{view="a"} 2', text)
+            self.assertIn('ccrsms_test_seconds_sum{view="a"} 0.32', text)
+            self.assertIn('ccrsms_test_seconds_count{view="b"} 1', text)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_metrics_is_hidden_without_a_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+
+class TracingTests(TestCase):
+
+    def setUp(self):
+        fd, self.trace_file = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        self.addCleanup(os.remove, self.trace_file)
+
+    def read_spans(self):
+        with open(self.trace_file, encoding="utf-8") as fh:
+            return [json.loads(line) for line in fh if line.strip()]
+
+    def test_request_continues_incoming_traceparent(self):
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+        with override_settings(TRACING_EXPORTER="file", TRACING_FILE=self.trace_file):
+            resp = self.client.get(
+                "/core/admin/analytics/ward-counts/",
+                HTTP_TRACEPARENT=f"00-{trace_id}-00f067aa0ba902b7-01",
+            )
+
+        self.assertEqual(resp["X-Trace-Id"], trace_id)
+        spans = self.read_spans()
+        root = next(s for s in spans if s["name"] == "GET /core/admin/analytics/ward-counts/")
+        self.assertEqual(root["parent_id"], "00f067aa0ba902b7")
+        self.assertEqual(root["attributes"]["status_code"], resp.status_code)
+        self.assertTrue(any(s["name"] == "db.query" and s["parent_id"] == root["span_id"] for s in spans))
+
+    def test_job_spans_join_the_trace_and_inherit_ids(self):
+        with override_settings(TRACING_EXPORTER="file", TRACING_FILE=self.trace_file):
+            with continue_trace(None, "request") as root:
+                set_span_ids(complaint=Complaint(pk=7))
+                traceparent = inject()
+            # e.g. a pool worker handed the traceparent
+            with continue_trace(traceparent, "job"):
+                with span("step"):
+                    pass
+
+        spans = {s["name"]: s for s in self.read_spans()}
+        self.assertEqual(spans["job"]["trace_id"], root.trace_id)
+        self.assertEqual(spans["job"]["parent_id"], root.span_id)
+        self.assertEqual(spans["step"]["parent_id"], spans["job"]["span_id"])
+        self.assertEqual(spans["request"]["attributes"]["complaint_id"], 7)
+
+        round_trip = spans_from_otlp(otlp_payload([root]))
+        self.assertEqual(round_trip[0]["span_id"], root.span_id)
+        self.assertEqual(round_trip[0]["attributes"]["complaint_id"], 7)
+
+    def test_otlp_export_does_not_wait_for_the_collector(self):
+        received = []
+
+        class SlowCollector(CollectorHandler):
+            def do_POST(self):
+                time.sleep(1)
+                super().do_POST()
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SlowCollector)
+        server.daemon_threads = True
+        server.write = received.extend
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        endpoint = f"http://127.0.0.1:{server.server_port}/v1/traces"
+        with override_settings(TRACING_EXPORTER="otlp", TRACING_OTLP_ENDPOINT=endpoint, TRACING_OTLP_FLUSH_SECONDS=0):
+            started = time.monotonic()
+            resp = self.client.get("/core/admin/analytics/ward-counts/")
+            self.assertLess(time.monotonic() - started, 0.5)
+
+            self.assertTrue(flush_spans(timeout=5))
+
+        self.assertIn(resp["X-Trace-Id"], {s["trace_id"] for s in received})
+
+    @override_settings(TRACING_EXPORTER="")
+    def test_tracing_off_adds_nothing(self):
+        resp = self.client.get("/core/admin/analytics/ward-counts/")
+
+        self.assertNotIn("X-Trace-Id", resp)
+        self.assertEqual(self.read_spans(), [])
@@ -0,0 +1,424 @@
+"""
+Tracing spans for following one payment (or complaint) end to end:
+
+    GET /billing/local-tax/verify/          payment_id=42 bill_id=17
+      stripe checkout.session.retrieve
+      db.query x N
+      receipt.render
+      notify.citizen_payment_success
+      notify.staff_ward_payment_success
+      notify.admin_payment_success
+
+- TracingMiddleware opens a span per request (continuing an incoming W3C
+  `traceparent`) and returns the trace id as X-Trace-Id
+- every SQL query inside a traced request or job becomes a db.query child span
+- span()/traced() mark the stages; payment_id, bill_id and complaint_id set on a span
+  are copied to the spans started under it
+- background jobs continue the trace: pass inject() along with the job and open
+  continue_trace(traceparent, "job name") in the worker (see regenerate_receipts)
+
+settings.TRACING_EXPORTER picks where finished spans go:
+- ""      off (default): span() and traced() cost one ContextVar lookup
+- "file"  JSON lines appended to TRACING_FILE
+- "otlp"  OTLP/HTTP JSON posted to TRACING_OTLP_ENDPOINT. `manage.py trace_collector`
+          is a local stand-in that writes what it receives as the same JSON lines
+
+`manage.py show_trace <trace id>` prints a trace from those JSON lines as a tree.
+
+Spans are exported when the outermost span of the process ends (request or job), so
+forked pool workers export their part of the trace themselves. The OTLP exporter only
+queues them there: a background thread posts them in batches, so a slow or unreachable
+collector never holds up the request. Spans that do not fit in the queue
+(TRACING_OTLP_QUEUE_SIZE) are dropped rather than waited for. Jobs call flush_spans()
+before their process exits (interpreter exit does it too).
+"""
+import functools
+import inspect
+import atexit
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import ExitStack, contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+ID_ATTRIBUTES = ("payment_id", "bill_id", "complaint_id")
+MAX_STATEMENT_LENGTH = 500
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current = ContextVar("trace_span", default=None)
+
+
+# ----------------------------
+# SPANS
+# ----------------------------
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        # spans of this process that end with the local root and are exported with it
+        self.finished = parent.finished if parent else []
+        self.attributes = {k: parent.attributes[k] for k in ID_ATTRIBUTES if parent and k in parent.attributes}
+        self.attributes.update(attributes or {})
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.is_local_root = parent is None
+
+    def set(self, **attributes):
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "pid": os.getpid(),
+        }
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "TRACING_EXPORTER", ""))
+
+
+@contextmanager
+def _open(name, trace_id=None, parent_id=None, **attributes):
+    parent = _current.get()
+    if parent is not None:
+        span = Span(name, parent.trace_id, parent.span_id, parent, attributes)
+    else:
+        span = Span(name, trace_id or secrets.token_hex(16), parent_id, None, attributes)
+
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.attributes.setdefault("error", repr(e)[:200])
+        raise
+    finally:
+        _current.reset(token)
+        span.end_ns = time.time_ns()
+        span.finished.append(span)
+        if span.is_local_root:
+            export(span.finished)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Child span of the current one. Outside a trace (or with tracing off) a no-op
+    that yields None.
+    """
+    if _current.get() is None or not enabled():
+        yield None
+        return
+    with _open(name, **attributes) as opened:
+        yield opened
+
+
+def traced(name: str, ids=()):
+    """
+    Decorator: runs the function in span(name). `ids` names arguments whose .pk is
+    recorded, e.g. traced("receipt.render", ids=("payment", "bill")) -> payment_id, bill_id.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None or not enabled():
+                return fn(*args, **kwargs)
+            bound = signature.bind_partial(*args, **kwargs).arguments
+            attributes = {f"{n}_id": getattr(bound.get(n), "pk", None) for n in ids}
+            with _open(name, **{k: v for k, v in attributes.items() if v is not None}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_span_ids(**objects):
+    """
+    set_span_ids(payment=payment, bill=bill) -> payment_id / bill_id on the current span
+    (and every span started under it from now on).
+    """
+    current = _current.get()
+    if current is not None:
+        current.set(**{f"{name}_id": getattr(obj, "pk", None) for name, obj in objects.items()})
+
+
+def inject():
+    """
+    traceparent of the current span, to hand to a background job (None outside a trace).
+    """
+    current = _current.get()
+    return current.traceparent if current is not None else None
+
+
+@contextmanager
+def continue_trace(traceparent, name: str, **attributes):
+    """
+    Opens a local root span for a job or request, as a child of `traceparent` when it is
+    valid (otherwise a new trace). ORM queries inside become db.query spans.
+    """
+    if not enabled():
+        yield None
+        return
+
+    match = TRACEPARENT_RE.match((traceparent or "").strip().lower())
+    trace_id, parent_id = match.groups() if match else (None, None)
+    # run inline inside a trace (e.g. --workers 1): a plain child span, queries are already wrapped
+    nested = _current.get() is not None
+
+    with _open(name, trace_id=trace_id, parent_id=parent_id, **attributes) as root, \
+            (nullcontext() if nested else query_spans()):
+        yield root
+
+
+# ----------------------------
+# ORM QUERIES
+# ----------------------------
+def _query_wrapper(execute, sql, params, many, context):
+    with span("db.query", statement=sql[:MAX_STATEMENT_LENGTH], many=many):
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def query_spans():
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(_query_wrapper))
+        yield
+
+
+# ----------------------------
+# EXPORT
+# ----------------------------
+_write_lock = threading.Lock()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans) -> dict:
+    """
+    OTLP/HTTP JSON body (ExportTraceServiceRequest) for finished spans.
+    """
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": getattr(settings, "TRACING_SERVICE_NAME", "ccrsms")}},
+                {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "ccrsms.core.tracing"},
+                "spans": [
+                    {
+                        "traceId": s.trace_id,
+                        "spanId": s.span_id,
+                        "parentSpanId": s.parent_id or "",
+                        "name": s.name,
+                        "kind": 2 if s.is_local_root else 1,  # SERVER / INTERNAL
+                        "startTimeUnixNano": str(s.start_ns),
+                        "endTimeUnixNano": str(s.end_ns),
+                        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                        "status": {"code": 2 if s.status == "error" else 1},
+                    }
+                    for s in spans
+                ],
+            }],
+        }],
+    }
+
+
+def _from_otlp_value(value: dict):
+    if "intValue" in value:
+        return int(value["intValue"])
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    return None
+
+
+def spans_from_otlp(payload: dict) -> list:
+    """
+    The reverse of otlp_payload(): flat span dicts (the TRACING_FILE line format).
+    """
+    spans = []
+    for resource_spans in payload.get("resourceSpans", []):
+        resource = {a["key"]: _from_otlp_value(a["value"]) for a in resource_spans.get("resource", {}).get("attributes", [])}
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for s in scope_spans.get("spans", []):
+                start_ns, end_ns = int(s["startTimeUnixNano"]), int(s["endTimeUnixNano"])
+                spans.append({
+                    "trace_id": s["traceId"],
+                    "span_id": s["spanId"],
+                    "parent_id": s.get("parentSpanId") or None,
+                    "name": s["name"],
+                    "start_ns": start_ns,
+                    "end_ns": end_ns,
+                    "duration_ms": round((end_ns - start_ns) / 1e6, 3),
+                    "status": "error" if s.get("status", {}).get("code") == 2 else "ok",
+                    "attributes": {a["key"]: _from_otlp_value(a["value"]) for a in s.get("attributes", [])},
+                    "pid": resource.get("process.pid"),
+                })
+    return spans
+
+
+class OtlpBatchExporter:
+    """
+    Posts queued spans from a daemon thread (started again in a forked child). A batch
+    goes out once TRACING_OTLP_BATCH_SIZE spans wait or TRACING_OTLP_FLUSH_SECONDS after
+    its first span.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+    def _started(self) -> queue.Queue:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=int(getattr(settings, "TRACING_OTLP_QUEUE_SIZE", 2048)))
+                    threading.Thread(target=self._run, args=(self._queue,), name="otlp-exporter", daemon=True).start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def submit(self, spans):
+        """
+        Queues the spans without blocking; what does not fit is dropped.
+        """
+        pending = self._started()
+        dropped = 0
+        for finished in spans:
+            try:
+                pending.put_nowait(finished)
+            except queue.Full:
+                dropped += 1
+        if dropped:
+            print(f"[TRACING ERROR] export queue full, dropped {dropped} spans")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Waits up to `timeout` seconds for the queued spans to be sent. True if they were.
+        """
+        if self._pid != os.getpid():
+            return True
+        pending = self._queue
+        deadline = time.monotonic() + timeout
+        with pending.all_tasks_done:
+            while pending.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                pending.all_tasks_done.wait(remaining)
+        return True
+
+    def _run(self, pending: queue.Queue):
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + float(getattr(settings, "TRACING_OTLP_FLUSH_SECONDS", 1.0))
+            while len(batch) < int(getattr(settings, "TRACING_OTLP_BATCH_SIZE", 512)):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                _post_otlp(batch)
+            except Exception as e:
+                print("[TRACING ERROR] export failed:", e)
+            finally:
+                for _ in batch:
+                    pending.task_done()
+
+
+def _post_otlp(spans):
+    request = urllib.request.Request(
+        settings.TRACING_OTLP_ENDPOINT,
+        data=json.dumps(otlp_payload(spans), default=str).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=getattr(settings, "TRACING_OTLP_TIMEOUT", 2.0)):
+        pass
+
+
+otlp_exporter = OtlpBatchExporter()
+
+
+def flush_spans(timeout: float = 5.0) -> bool:
+    """
+    Sends the spans still queued for OTLP; call before a job's process exits.
+    """
+    return otlp_exporter.flush(timeout)
+
+
+atexit.register(flush_spans)
+
+
+def export(spans):
+    exporter = getattr(settings, "TRACING_EXPORTER", "")
+    try:
+        if exporter == "file":
+            lines = "".join(json.dumps(s.as_dict(), default=str) + "\n" for s in spans)
+            with _write_lock, open(settings.TRACING_FILE, "a", encoding="utf-8") as fh:
+                fh.write(lines)
+        elif exporter == "otlp":
+            otlp_exporter.submit(spans)
+    except Exception as e:
+        # tracing must never break the request or job it observes
+        print("[TRACING ERROR] export failed:", e)
+
+
+# ----------------------------
+# MIDDLEWARE
+# ----------------------------
+class TracingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not enabled():
+            return self.get_response(request)
+
+        name = f"{request.method} {request.path}"
+        with continue_trace(request.headers.get("traceparent"), name, method=request.method, path=request.path) as root:
+            response = self.get_response(request)
+            match = getattr(request, "resolver_match", None)
+            if match is not None:
+                root.set(view=match.view_name)
+            root.set(status_code=response.status_code)
+
+        response["X-Trace-Id"] = root.trace_id
+        return response
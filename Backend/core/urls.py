@@ -15,6 +15,7 @@ from .views import (
     AdminComplaintDetailView,
     AdminComplaintUpdateView,
     AdminComplaintDeleteView,
+    AdminComplaintExportView,
 
     StaffComplaintsGeoJSONView, 
     AdminComplaintsGeoJSONView,
@@ -45,6 +46,7 @@ urlpatterns = router.urls + [
 
     # Admin (all complaints)
     path("admin/complaints/", AdminComplaintListView.as_view(), name="admin_complaint_list"),
+    path("admin/complaints/export/", AdminComplaintExportView.as_view(), name="admin_complaint_export"),
     path("admin/complaints/<int:pk>/", AdminComplaintDetailView.as_view(), name="admin_complaint_detail"),
     path("admin/complaints/<int:pk>/update/", AdminComplaintUpdateView.as_view(), name="admin_complaint_update"),
     path("admin/complaints/<int:pk>/delete/", AdminComplaintDeleteView.as_view(), name="admin_complaint_delete"),
@@ -8,7 +8,7 @@ from django.views.generic import ListView, DetailView, UpdateView, DeleteView
 from rest_framework import viewsets, permissions
 from rest_framework.parsers import MultiPartParser, FormParser
 
-from accounts.mixins import KnoxSessionRequiredMixin, RoleRequiredMixin
+from accounts.mixins import KnoxSessionRequiredMixin, RoleRequiredMixin, SessionStaffUserMixin
 
 from .models import Complaint, ComplaintCategory
 from .serializers import ComplaintSerializer, ComplaintCategorySerializer
@@ -20,6 +20,9 @@ from .notifications import (
     notify_citizen_complaint_deleted
 )
 from .permissions import IsCitizen, IsOwnerCitizen, CitizenCanEditOnlyWhenSubmitted
+from .reference import ReferenceListMixin
+from .exports import export_response
+from .tracing import set_span_ids
 from .forms import StaffComplaintUpdateForm, AdminComplaintUpdateForm
 from django.db.models import Q
 from django.http import JsonResponse
@@ -67,6 +70,7 @@ class CitizenComplaintViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         # citizen is set from request.user (either here or inside serializer)
         complaint = serializer.save(citizen=self.request.user)
+        set_span_ids(complaint=complaint)
 
         # Notifications: citizen + staff in same ward
         try:
@@ -108,10 +112,11 @@ class CitizenComplaintViewSet(viewsets.ModelViewSet):
         return response
 
 
-class ComplaintCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class ComplaintCategoryViewSet(ReferenceListMixin, viewsets.ReadOnlyModelViewSet):
     """
-    Public categories (React dropdown)
+    Public categories (React dropdown). List is cached with ETag / Cache-Control.
     """
+    reference_name = "complaint_categories"
     queryset = ComplaintCategory.objects.all().order_by("category_name")
     serializer_class = ComplaintCategorySerializer
     permission_classes = [permissions.AllowAny]
@@ -121,29 +126,6 @@ class ComplaintCategoryViewSet(viewsets.ReadOnlyModelViewSet):
 # TEMPLATE (DJANGO UI) — STAFF / ADMIN
 # =========================================================
 
-class SessionStaffUserMixin:
-    """
-    Attaches the logged-in staff/admin user object to request.user
-    using session staff_user_id saved at login.
-
-    Requires in staff login view:
-        request.session["staff_user_id"] = data["user_id"]
-    """
-    def dispatch(self, request, *args, **kwargs):
-        staff_user_id = request.session.get("staff_user_id")
-        if not staff_user_id:
-            request.session.flush()
-            return redirect("staff_login")
-
-        user = User.objects.filter(id=staff_user_id).first()
-        if not user:
-            request.session.flush()
-            return redirect("staff_login")
-
-        request.user = user
-        return super().dispatch(request, *args, **kwargs)
-
-
 # -----------------------------
 # STAFF: LIST + DETAIL
 # -----------------------------
@@ -157,7 +139,7 @@ class StaffComplaintListView(
     paginate_by = 10  # ✅ pagination
 
     def get_queryset(self):
-        qs = Complaint.objects.filter(citizen__ward=self.request.user.ward).select_related("category", "citizen").order_by("-created_at")
+        qs = Complaint.objects.filter(citizen__ward_id=self.request.user.ward_id).select_related("category", "citizen").order_by("-created_at")
 
         q = self.request.GET.get("q", "").strip()
         status = self.request.GET.get("status", "").strip()
@@ -198,7 +180,9 @@ class StaffComplaintDetailView(
     required_role = "STAFF"
 
     def get_queryset(self):
-        return Complaint.objects.filter(citizen__ward=self.request.user.ward)
+        return Complaint.objects.filter(citizen__ward_id=self.request.user.ward_id).select_related(
+            "category", "citizen", "citizen__ward"
+        )
 
 class StaffComplaintUpdateView(
     SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, UpdateView):
@@ -209,7 +193,7 @@ class StaffComplaintUpdateView(
     form_class = StaffComplaintUpdateForm 
 
     def get_queryset(self):
-        return Complaint.objects.filter(citizen__ward=self.request.user.ward)
+        return Complaint.objects.filter(citizen__ward_id=self.request.user.ward_id)
 
     def form_valid(self, form):
         complaint = form.save()
@@ -238,21 +222,11 @@ class AdminComplaintListView(
 
     def get_queryset(self):
         qs = Complaint.objects.all().select_related("category", "citizen").order_by("-created_at")
+        qs = _apply_complaint_search(qs, self.request)
 
-        q = self.request.GET.get("q", "").strip()
         status = self.request.GET.get("status", "").strip()
         category = self.request.GET.get("category", "").strip()
 
-        if q:
-            qs = qs.filter(
-                Q(title__icontains=q) |
-                Q(description__icontains=q) |
-                Q(id__icontains=q) |
-                Q(citizen__first_name__icontains=q) |
-                Q(citizen__last_name__icontains=q) |
-                Q(citizen__email__icontains=q)
-            )
-
         if status:
             qs = qs.filter(status=status)
 
@@ -268,6 +242,49 @@ class AdminComplaintListView(
 
 
 
+def _apply_complaint_search(qs, request):
+    q = request.GET.get("q", "").strip()
+    if q:
+        qs = qs.filter(
+            Q(title__icontains=q) |
+            Q(description__icontains=q) |
+            Q(id__icontains=q) |
+            Q(citizen__first_name__icontains=q) |
+            Q(citizen__last_name__icontains=q) |
+            Q(citizen__email__icontains=q)
+        )
+    return qs
+
+
+COMPLAINT_EXPORT_COLUMNS = [
+    ("id", "Complaint ID"),
+    ("created_at", "Created"),
+    ("updated_at", "Updated"),
+    ("title", "Title"),
+    ("status", "Status"),
+    ("priority_level", "Priority"),
+    ("category__category_name", "Category"),
+    ("citizen__first_name", "First Name"),
+    ("citizen__last_name", "Last Name"),
+    ("citizen__email", "Email"),
+    ("citizen__ward__name", "Ward"),
+    ("street_name", "Street"),
+    ("district", "District"),
+]
+
+
+class AdminComplaintExportView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, View):
+    """
+    Complaints list search + filters, streamed as CSV (default) or ?output=xlsx.
+    """
+    required_role = "ADMIN"
+
+    def get(self, request, *args, **kwargs):
+        qs = _apply_complaint_search(Complaint.objects.order_by("-created_at"), request)
+        qs = apply_complaint_filters(qs, request, allow_admin_filters=True)
+        return export_response(request, qs, COMPLAINT_EXPORT_COLUMNS, "complaints")
+
+
 class AdminComplaintDetailView(
     SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, DetailView
 ):
@@ -276,6 +293,9 @@ class AdminComplaintDetailView(
     context_object_name = "complaint"
     required_role = "ADMIN"
 
+    def get_queryset(self):
+        return Complaint.objects.select_related("category", "citizen", "citizen__ward")
+
 
 class AdminComplaintUpdateView(
     SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, UpdateView
@@ -313,30 +333,40 @@ class AdminComplaintDeleteView(
         return super().delete(request, *args, **kwargs)
 
 
+def _complaints_geojson(qs):
+    """
+    FeatureCollection for the map. The queryset is evaluated once and the extra
+    properties come from the same rows (one query, whatever the number of features).
+    """
+    complaints = list(qs)
+    by_pk = {c.pk: c for c in complaints}
+
+    geojson = serialize(
+        "geojson",
+        complaints,
+        geometry_field="location",
+        fields=("title", "status", "priority_level", "created_at"),
+    )
+    data = json.loads(geojson)
+    for feat in data.get("features", []):
+        complaint = by_pk.get(feat["properties"].get("pk"))
+        if complaint:
+            feat["properties"]["complaint_id"] = complaint.pk
+            feat["properties"]["category"] = complaint.category.category_name if complaint.category else ""
+            feat["properties"]["citizen_name"] = f"{complaint.citizen.first_name} {complaint.citizen.last_name}".strip()
+    return data
+
+
 @method_decorator(never_cache, name="dispatch")
 class StaffComplaintsGeoJSONView(SessionStaffUserMixin, KnoxSessionRequiredMixin, RoleRequiredMixin, View):
     required_role = "STAFF"
 
     def get(self, request, *args, **kwargs):
-        qs = Complaint.objects.filter(citizen__ward=request.user.ward).select_related("citizen", "category")
+        qs = Complaint.objects.filter(citizen__ward_id=request.user.ward_id).select_related("citizen", "category")
 
         qs = apply_complaint_filters(qs, request, allow_admin_filters=False)
 
-        geojson = serialize(
-            "geojson",
-            qs,
-            geometry_field="location",
-            fields=("title", "status", "priority_level", "created_at"),
-        )
-        data = json.loads(geojson)
-        for feat in data.get("features", []):
-            pk = feat["properties"].get("pk")
-            complaint = qs.filter(pk=pk).first()
-            if complaint:
-                feat["properties"]["complaint_id"] = complaint.pk
-                feat["properties"]["category"] = complaint.category.category_name if complaint.category else ""
-                feat["properties"]["citizen_name"] = f"{complaint.citizen.first_name} {complaint.citizen.last_name}".strip()
-        return JsonResponse(data, safe=False)
+        return JsonResponse(_complaints_geojson(qs), safe=False)
 
 
 @method_decorator(never_cache, name="dispatch")
@@ -348,21 +378,7 @@ class AdminComplaintsGeoJSONView(SessionStaffUserMixin, KnoxSessionRequiredMixin
 
         qs = apply_complaint_filters(qs, request, allow_admin_filters=True)
 
-        geojson = serialize(
-            "geojson",
-            qs,
-            geometry_field="location",
-            fields=("title", "status", "priority_level", "created_at"),
-        )
-        data = json.loads(geojson)
-        for feat in data.get("features", []):
-            pk = feat["properties"].get("pk")
-            complaint = qs.filter(pk=pk).first()
-            if complaint:
-                feat["properties"]["complaint_id"] = complaint.pk
-                feat["properties"]["category"] = complaint.category.category_name if complaint.category else ""
-                feat["properties"]["citizen_name"] = f"{complaint.citizen.first_name} {complaint.citizen.last_name}".strip()
-        return JsonResponse(data, safe=False)
+        return JsonResponse(_complaints_geojson(qs), safe=False)
 
 
 def apply_complaint_filters(qs, request, allow_admin_filters: bool):